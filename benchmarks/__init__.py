@@ -0,0 +1,15 @@
+"""Benchmarks for the structural editing code in this package.
+
+Times the sexp, forms, indent, paredit, and expand selection operations at
+points spread across synthetic Clojure source code, using the headless View,
+and writes the results into a JSON report. To run every benchmark:
+
+    python -m benchmarks --output report.json
+
+To check the results against a previous report, and exit with a non-zero
+status if any case has become slower by more than the given factor:
+
+    python -m benchmarks --compare report.json --threshold 1.5
+
+Run from the root of this package. See python -m benchmarks --help for the
+other options."""
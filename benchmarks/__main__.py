@@ -0,0 +1,235 @@
+import argparse
+import fnmatch
+import json
+import math
+import platform
+import re
+import sys
+import time
+
+import headless
+
+headless.install()
+
+from Tutkain.src import selectors, sexp  # noqa: E402
+
+from . import corpus  # noqa: E402
+from .cases import CASES  # noqa: E402
+
+# Maps the name of a corpus to a function that takes a seed and returns the
+# source code of the corpus.
+CORPORA = {
+    "mixed-2k": lambda seed: corpus.mixed(2000, seed),
+    "mixed-20k": lambda seed: corpus.mixed(20000, seed),
+    "edn-10k": lambda seed: corpus.edn(10000, seed),
+    "untidy-2k": lambda seed: corpus.untidy(2000, seed),
+    "deep-200": lambda seed: corpus.deep(200, seed),
+    "chain-30": lambda seed: corpus.chains(30, 50, seed),
+    "docstrings-5k": lambda seed: corpus.long_docstrings(5000, seed),
+}
+
+SYMBOL_PATTERN = re.compile(r"[\w*+!?<>=-]+")
+
+
+def percentile(samples, p):
+    """Given a sequence of samples and a percentile (0–100), return the
+    nearest-rank percentile of the samples, or None if there are no samples."""
+    if samples:
+        ordered = sorted(samples)
+        rank = max(math.ceil(p / 100 * len(ordered)), 1)
+        return ordered[rank - 1]
+
+
+def sample_points(view, count):
+    """Return up to count points spread evenly across the View, each at the
+    beginning of a symbol inside an S-expression."""
+    text = view.substr(headless.Region(0, view.size()))
+    points = []
+
+    for n in range(count):
+        match = SYMBOL_PATTERN.search(text, n * len(text) // count)
+
+        while match and sexp.innermost(view, match.start(), edge=False) is None:
+            match = SYMBOL_PATTERN.search(text, match.end())
+
+        if match and match.start() not in points:
+            points.append(match.start())
+
+    return points
+
+
+def run_case(view, text, points, f, edits):
+    """Time a case at each of the given points, and return the statistics of
+    the durations.
+
+    The durations exclude the time spent in the methods of View that Sublime
+    Text implements natively, such as find_by_selector, since the headless
+    View is much slower at those than Sublime Text. The statistics report that
+    time separately, as native_ms."""
+    durations = []
+    native = []
+    errors = 0
+    selectors.reset_stats()
+
+    for point in points:
+        if edits and view.substr(headless.Region(0, view.size())) != text:
+            view.replace(None, headless.Region(0, view.size()), text)
+            # Lex the restored text outside the timed section.
+            view.scope_name(view.size())
+
+        view.sel().clear()
+        view.sel().add(headless.Region(point, point))
+
+        native_time = view.native_time
+        begin = time.perf_counter()
+
+        try:
+            f(view, point)
+        except Exception:
+            errors += 1
+
+        elapsed = time.perf_counter() - begin
+        native_elapsed = view.native_time - native_time
+        durations.append((elapsed - native_elapsed) * 1000)
+        native.append(native_elapsed * 1000)
+
+    return {
+        "samples": len(durations),
+        "errors": errors,
+        "mean_ms": sum(durations) / len(durations) if durations else None,
+        "p50_ms": percentile(durations, 50),
+        "p95_ms": percentile(durations, 95),
+        "max_ms": max(durations, default=None),
+        "native_ms": {
+            "p50": percentile(native, 50),
+            "p95": percentile(native, 95),
+        },
+        "selectors": selectors.stats.to_dict(),
+    }
+
+
+def run(corpora, cases, samples, seed, log):
+    report = {
+        "python": platform.python_version(),
+        "seed": seed,
+        "corpora": {},
+        "results": {},
+    }
+
+    for name in corpora:
+        text = CORPORA[name](seed)
+        begin = time.perf_counter()
+        view = headless.View(text)
+        sexp.delimiter_index(view)
+
+        report["corpora"][name] = {
+            "lines": text.count("\n"),
+            "characters": len(text),
+            "load_ms": (time.perf_counter() - begin) * 1000,
+        }
+
+        points = sample_points(view, samples)
+        results = report["results"][name] = {}
+
+        for case in cases:
+            f, edits = CASES[case]
+            results[case] = result = run_case(view, text, points, f, edits)
+
+            log(
+                f"{name:<14} {case:<42} p50 {result['p50_ms']:9.3f} ms"
+                f"  p95 {result['p95_ms']:9.3f} ms"
+                + (f"  ({result['errors']} errors)" if result["errors"] else "")
+            )
+
+    return report
+
+
+def compare(report, baseline, threshold, log):
+    """Log the cases whose median duration in the report exceeds that in the
+    baseline report by more than the given factor, and return their number."""
+    regressions = 0
+
+    for name, results in report["results"].items():
+        for case, result in results.items():
+            try:
+                before = baseline["results"][name][case]["p50_ms"]
+            except KeyError:
+                continue
+
+            if before and result["p50_ms"] > before * threshold:
+                regressions += 1
+                log(
+                    f"regression: {name} {case} p50 {before:.3f} ms → "
+                    f"{result['p50_ms']:.3f} ms"
+                )
+
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Time the structural editing operations on synthetic Clojure source code.",
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        choices=sorted(CORPORA),
+        help="the corpus to run the benchmarks on (default: all)",
+    )
+    parser.add_argument(
+        "--case",
+        action="append",
+        metavar="PATTERN",
+        help="a glob pattern for the cases to run (default: all)",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=10,
+        help="the number of points to time each case at (default: 10)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="the file to write the JSON report into")
+    parser.add_argument(
+        "--compare",
+        metavar="REPORT",
+        help="a previous JSON report to check the results against",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="the factor by which the median duration of a case may exceed "
+        "that in the previous report (default: 1.5)",
+    )
+    args = parser.parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    cases = [
+        case
+        for case in CASES
+        if not args.case
+        or any(fnmatch.fnmatchcase(case, pattern) for pattern in args.case)
+    ]
+
+    report = run(args.corpus or list(CORPORA), cases, args.samples, args.seed, log)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            if compare(report, json.load(file), args.threshold, log):
+                return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
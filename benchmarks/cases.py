@@ -0,0 +1,250 @@
+"""The operations the benchmarks time.
+
+Each case is a function that takes a View whose only selection is an empty
+region at some point, and the point. A case that modifies the text of the
+View is registered with edits=True, so that the runner restores the text of
+the View before timing the case at the next point.
+
+Commands run through View.run_command, so that, like in Sublime Text, the
+time a case takes includes updating the delimiter index after the command."""
+
+from sublime import Region
+
+from Tutkain.src import forms, indent, namespace, sexp
+
+# The repl package and the state module import each other; import state
+# first, like core does.
+from Tutkain.src import state  # noqa: F401
+from Tutkain.src.repl import formatter, spans
+from Tutkain.src.repl.keywords import ERR, OUT, TAG, VAL
+
+from . import corpus
+
+# Maps the name of a case to a (function, edits) tuple.
+CASES = {}
+
+
+def case(name, edits=False):
+    def register(f):
+        CASES[name] = (f, edits)
+        return f
+
+    return register
+
+
+def command_case(name, edits=True, args=None):
+    case(name, edits=edits)(lambda view, _: view.run_command(name, args))
+
+
+@case("sexp.innermost")
+def innermost(view, point):
+    sexp.innermost(view, point)
+
+
+@case("sexp.outermost")
+def outermost(view, point):
+    sexp.outermost(view, point)
+
+
+@case("forms.find_adjacent")
+def find_adjacent(view, point):
+    forms.find_adjacent(view, point)
+
+
+@case("namespace.name")
+def namespace_name(view, _):
+    namespace.name(view)
+
+
+@case("namespace.name_after_edit", edits=True)
+def namespace_name_after_edit(view, point):
+    view.run_command("insert", {"characters": " "})
+    namespace.name(view)
+
+
+@case("indent.indent_region", edits=True)
+def indent_region(view, point):
+    if outermost := sexp.outermost(view, point):
+        indent.indent_region(view, None, outermost.extent(), prune=True)
+
+
+@case("indent.whole_file", edits=True)
+def indent_whole_file(view, _):
+    view.sel().clear()
+    view.sel().add(Region(0, view.size()))
+    view.run_command("tutkain_indent_sexp", {"prune": True})
+
+
+# A few hundred lines of code without indentation, as if copied from
+# somewhere else.
+PASTED = "\n".join(line.lstrip() for line in corpus.mixed(300, seed=1).splitlines())
+
+
+@case("indent.indent_pasted", edits=True)
+def indent_pasted(view, _):
+    view.run_command("insert", {"characters": PASTED})
+    indent.indent_pasted(view, None, PASTED)
+
+
+@case("paredit.thread_chain", edits=True)
+def thread_chain(view, point):
+    """Thread the innermost argument of the function definition around the
+    point into every call around it, one call at a time, then unthread the
+    calls again."""
+    if outermost := sexp.outermost(view, point):
+        begin = outermost.open.region.begin()
+        argument = begin + view.substr(outermost.extent()).rfind(" x") + 1
+
+        if argument == begin:
+            return
+
+        view.sel().clear()
+        view.sel().add(Region(argument, argument))
+
+        for command in ["tutkain_paredit_thread_last", "tutkain_paredit_unthread"]:
+            change_count = None
+
+            while change_count != view.change_count():
+                change_count = view.change_count()
+                view.run_command(command)
+
+
+def on_first_element(view, point):
+    """Put the caret on the first element of the outermost S-expression
+    around the point, and return True, or return False if there is no
+    S-expression around the point."""
+    if outermost := sexp.outermost(view, point):
+        begin = outermost.open.region.end()
+        view.sel().clear()
+        view.sel().add(Region(begin, begin))
+        return True
+
+    return False
+
+
+def collection_case(name, command, args=None):
+    """Register a case that runs the command with the caret on the first
+    element of the outermost S-expression around the point."""
+
+    def run(view, point):
+        if on_first_element(view, point):
+            view.run_command(command, args)
+
+    case(name, edits=True)(run)
+
+
+collection_case(
+    "paredit.move_form_to_end", "tutkain_paredit_move_form_to", {"index": -1}
+)
+
+for name in [
+    "sort_collection",
+    "dedupe_collection",
+    "align_collection",
+    "convert_pairs",
+]:
+    collection_case(f"paredit.{name}", f"tutkain_paredit_{name}")
+
+
+@case("cleanup.zap_commas_by_line", edits=True)
+def zap_commas_by_line(view, _):
+    """Zap the commas in every line, with one selection per line."""
+    view.sel().clear()
+    view.sel().add_all(view.lines(Region(0, view.size())))
+    view.run_command("tutkain_zap_commas")
+
+
+command_case("tutkain_clean_up")
+command_case("tutkain_format_buffer")
+command_case("tutkain_expand_selection", edits=False)
+
+
+@case("tutkain_expand_selection.outermost")
+def expand_selection_outermost(view, point):
+    """Expand the selection until it spans the outermost S-expression around
+    the point."""
+    if outermost := sexp.outermost(view, point):
+        while not view.sel()[0].contains(outermost.extent()):
+            region = view.sel()[0]
+            view.run_command("tutkain_expand_selection")
+
+            if view.sel()[0] == region:
+                break
+
+
+command_case("tutkain_paredit_forward", edits=False)
+command_case("tutkain_paredit_backward", edits=False)
+command_case("tutkain_paredit_forward_up", edits=False)
+command_case("tutkain_paredit_forward_down", edits=False)
+command_case("tutkain_paredit_backward_up", edits=False)
+command_case("tutkain_paredit_backward_down", edits=False)
+
+for name in [
+    "tutkain_paredit_open_round",
+    "tutkain_paredit_close_round",
+    "tutkain_paredit_double_quote",
+    "tutkain_paredit_forward_slurp",
+    "tutkain_paredit_backward_slurp",
+    "tutkain_paredit_forward_barf",
+    "tutkain_paredit_backward_barf",
+    "tutkain_paredit_wrap_round",
+    "tutkain_paredit_forward_delete",
+    "tutkain_paredit_backward_delete",
+    "tutkain_paredit_raise_sexp",
+    "tutkain_paredit_splice_sexp",
+    "tutkain_paredit_comment_dwim",
+    "tutkain_paredit_semicolon",
+    "tutkain_paredit_splice_sexp_killing_forward",
+    "tutkain_paredit_splice_sexp_killing_backward",
+    "tutkain_paredit_forward_kill_form",
+    "tutkain_paredit_backward_kill_form",
+    "tutkain_paredit_backward_move_form",
+    "tutkain_paredit_forward_move_form",
+    "tutkain_paredit_thread_first",
+    "tutkain_paredit_thread_last",
+    "tutkain_paredit_unthread",
+    "tutkain_paredit_split_sexp",
+    "tutkain_paredit_join_sexps",
+    "tutkain_discard_undiscard_sexp",
+]:
+    command_case(name)
+
+
+# The number of chunks of stdout and stderr the REPL output cases print, and
+# the number of chunks the printer prints between two frames.
+OUTPUT_CHUNKS = 4000
+CHUNKS_PER_FRAME = 4
+
+
+def output_items(sentinels):
+    """Yield the formatted items of a long stream of stdout and stderr
+    output."""
+    for n in range(OUTPUT_CHUNKS):
+        item = {TAG: ERR if n % 3 == 0 else OUT, VAL: f"line {n}\n"}
+        yield formatter.format(item, sentinels=sentinels)
+
+
+@case("repl.output_sentinels", edits=True)
+def output_sentinels(view, _):
+    """Print a long stream of output, with sentinel characters around stdout
+    and stderr."""
+    for item in output_items(sentinels=True):
+        view.insert(None, view.size(), item[VAL])
+
+
+@case("repl.output_regions", edits=True)
+def output_regions(view, _):
+    """Print a long stream of output, and mark stdout and stderr with regions,
+    one frame at a time."""
+    spans.reset(view)
+    index = spans.get(view)
+
+    for n, item in enumerate(output_items(sentinels=False), 1):
+        begin = view.size()
+        view.insert(None, begin, item[VAL])
+        index.add(item[TAG], begin, view.size())
+
+        if n % CHUNKS_PER_FRAME == 0:
+            spans.flush(view)
+
+    spans.flush(view)
@@ -0,0 +1,232 @@
+"""Generators for synthetic Clojure source code.
+
+The generators take a seed, so that the same seed always yields the same
+source code, and benchmark results stay comparable between runs."""
+
+import random
+
+WORDS = [
+    "alpha",
+    "beta",
+    "gamma",
+    "delta",
+    "epsilon",
+    "zeta",
+    "theta",
+    "kappa",
+    "lambda",
+    "sigma",
+    "omega",
+    "node",
+    "value",
+    "state",
+    "index",
+    "result",
+]
+
+FUNCTIONS = [
+    "map",
+    "filter",
+    "reduce",
+    "assoc",
+    "update",
+    "get-in",
+    "str/join",
+    "into",
+    "conj",
+    "merge-with",
+    "swap!",
+    "select-keys",
+]
+
+
+def symbol(rng):
+    return "-".join(rng.sample(WORDS, rng.randint(1, 2)))
+
+
+def keyword(rng):
+    if rng.random() < 0.2:
+        return f"::{symbol(rng)}"
+
+    return f":{symbol(rng)}"
+
+
+def scalar(rng):
+    return rng.choice(
+        [
+            lambda: symbol(rng),
+            lambda: keyword(rng),
+            lambda: str(rng.randint(-1000, 1000)),
+            lambda: f"{rng.random() * 100:.2f}",
+            lambda: f'"{symbol(rng)} ({symbol(rng)})"',
+            lambda: rng.choice(["nil", "true", "false", "\\a", "\\space", "##Inf"]),
+            lambda: f'#"{symbol(rng)}[a-z]+(\\d+)"',
+        ]
+    )()
+
+
+def call(rng, depth, indent):
+    """Return a function call nested depth levels deep, spread over several
+    lines."""
+    if depth == 0:
+        return scalar(rng)
+
+    args = [call(rng, rng.randint(0, depth - 1), indent + 2) for _ in range(2)]
+    head = rng.choice(FUNCTIONS)
+
+    if rng.random() < 0.5:
+        return f"({head} {' '.join(args)})"
+
+    separator = "\n" + " " * (indent + 2)
+    return f"({head}{separator}{separator.join(args)})"
+
+
+def docstring(rng, lines):
+    return "\n".join(
+        f"  {' '.join(symbol(rng) for _ in range(8))} (see `{symbol(rng)}`)."
+        for _ in range(lines)
+    ).lstrip()
+
+
+def defn(rng):
+    """Return a function definition with a docstring, let bindings, a comment,
+    a discarded form, and nested function calls."""
+    bindings = "\n        ".join(
+        f"{symbol(rng)} {call(rng, rng.randint(0, 3), 8)}"
+        for _ in range(rng.randint(1, 4))
+    )
+
+    return f"""(defn {symbol(rng)}
+  "{docstring(rng, rng.randint(1, 6))}"
+  [{symbol(rng)} {{:keys [{symbol(rng)} {symbol(rng)}]}}]
+  ;; {' '.join(symbol(rng) for _ in range(6))} (
+  (let [{bindings}]
+    #_({symbol(rng)} [{scalar(rng)}])
+    {call(rng, rng.randint(1, 5), 4)}))"""
+
+
+def reader_conditional(rng):
+    return f"""#?(:clj
+   (defmethod {symbol(rng)} {keyword(rng)}
+     [{symbol(rng)}]
+     {call(rng, 2, 5)})
+   :cljs
+   (defn {symbol(rng)} [{symbol(rng)}]
+     #?@(:browser [{call(rng, 1, 5)}] :node [{scalar(rng)}])))"""
+
+
+def data(rng):
+    return (
+        f"(def {symbol(rng)}\n  "
+        + edn_map(rng, rng.randint(5, 40)).replace("\n", "\n  ")
+        + ")"
+    )
+
+
+def entry(rng, n):
+    tags = " ".join(sorted({keyword(rng) for _ in range(3)}))
+    values = " ".join(scalar(rng) for _ in range(rng.randint(0, 6)))
+
+    return (
+        f':{symbol(rng)}-{n} {{:id {n} :name "{symbol(rng)}"'
+        f" :tags #{{{tags}}} :values [{values}]"
+        f' :created #inst "2024-01-{n % 28 + 1:02}"}}'
+    )
+
+
+def edn_map(rng, entries):
+    """Return a map literal with one entry per line."""
+    return "{" + "\n ".join(entry(rng, n) for n in range(entries)) + "}"
+
+
+def namespace(rng):
+    requires = "\n            ".join(
+        f"[{symbol(rng).replace('-', '.')} :as {symbol(rng)}]" for _ in range(6)
+    )
+
+    return f"""(ns {symbol(rng)}.core
+  "{docstring(rng, 3)}"
+  (:require {requires})
+  (:import (java.util UUID Date)))"""
+
+
+def mixed(lines, seed=0):
+    """Return a namespace of at least the given number of lines made up of
+    function definitions, reader conditionals, and data definitions."""
+    rng = random.Random(seed)
+    forms = [namespace(rng)]
+    count = forms[0].count("\n") + 1
+
+    while count < lines:
+        form = rng.choices([defn, reader_conditional, data], [6, 1, 1])[0](rng)
+        forms.append(form)
+        count += form.count("\n") + 2
+
+    return "\n\n".join(forms) + "\n"
+
+
+def untidy(lines, seed=0):
+    """Return a namespace like the one mixed returns, with commas before
+    keywords, trailing whitespace, and three blank lines between top-level
+    forms."""
+    rng = random.Random(seed)
+    text = mixed(lines, seed).replace(" :", ", :").replace("\n\n", "\n\n\n\n")
+
+    return "\n".join(
+        line + rng.choice(["", "", " ", "  \t"]) for line in text.split("\n")
+    )
+
+
+def edn(entries, seed=0):
+    """Return a single map literal with the given number of entries."""
+    return edn_map(random.Random(seed), entries) + "\n"
+
+
+def deep(depth, seed=0):
+    """Return a single function definition whose body is a chain of function
+    calls nested depth levels deep, one level per line."""
+    rng = random.Random(seed)
+    lines = []
+
+    for level in range(depth):
+        lines.append(" " * (2 + level) + f"({rng.choice(FUNCTIONS)} {scalar(rng)}")
+
+    body = "\n".join(lines) + " x" + ")" * depth
+    return f"(defn {symbol(rng)}\n  [x]\n{body})\n"
+
+
+def chains(depth, count, seed=0):
+    """Return the given number of function definitions whose body is a chain
+    of function calls nested depth levels deep that ends in the argument of
+    the function, like the code the threading macros unthread into."""
+    rng = random.Random(seed)
+    forms = []
+
+    for _ in range(count):
+        lines = [
+            " " * (2 + level) + f"({rng.choice(FUNCTIONS)} {scalar(rng)}"
+            for level in range(depth)
+        ]
+
+        body = "\n".join(lines) + " x" + ")" * depth
+        forms.append(f"(defn {symbol(rng)}\n  [x]\n{body})")
+
+    return "\n\n".join(forms) + "\n"
+
+
+def long_docstrings(lines, seed=0):
+    """Return a namespace of function definitions with docstrings hundreds of
+    lines long."""
+    rng = random.Random(seed)
+    forms = []
+    count = 0
+
+    while count < lines:
+        form = f"""(defn {symbol(rng)}
+  "{docstring(rng, 200)}"
+  [x]
+  {call(rng, 3, 2)})"""
+        forms.append(form)
+        count += form.count("\n") + 2
+
+    return "\n\n".join(forms) + "\n"
@@ -0,0 +1,45 @@
+"""Run the structural editing code in this package outside Sublime Text.
+
+Provides View, a stand-in for sublime.View that keeps its text in memory and
+assigns scopes to the text by interpreting the syntax definitions in this
+package, so that the sexp, forms, selectors, indent, and paredit modules can
+run and be profiled under plain CPython:
+
+    import headless
+
+    headless.install()
+
+    from Tutkain.src import sexp
+
+    view = headless.View("(a (b) c)")
+    sexp.innermost(view, 4)
+
+Run from the root of this package, or put the root on sys.path."""
+
+import sys
+import types
+
+from .sublime import COMMANDS, Region, View
+from .syntax import ROOT
+
+__all__ = ["COMMANDS", "Region", "View", "install"]
+
+
+def install():
+    """Make this stand-in importable as the `sublime` module, and this
+    package importable as `Tutkain`.
+
+    Does nothing if the real `sublime` module is already available."""
+    if "sublime" in sys.modules:
+        return
+
+    from . import sublime
+
+    sys.modules["sublime"] = sublime
+
+    if "Tutkain" not in sys.modules:
+        package = types.ModuleType("Tutkain")
+        package.__path__ = [ROOT]
+        sys.modules["Tutkain"] = package
+
+    from . import commands  # noqa: F401
@@ -0,0 +1,182 @@
+"""Implementations of the commands the structural editing code in this
+package runs with View.run_command, of the paredit and expand selection
+commands, and of the text change listeners the structural editing code
+relies on."""
+
+from Tutkain.src import cleanup, indent, paredit, selectors, sexp
+
+from .sublime import COMMANDS, TEXT_CHANGE_LISTENERS, Region
+
+
+# Mirrors TutkainDelimiterIndexListener in src/core.py.
+TEXT_CHANGE_LISTENERS.append(sexp.update_delimiter_index)
+
+
+def command(name):
+    def register(f):
+        COMMANDS[name] = f
+        return f
+
+    return register
+
+
+@command("insert")
+def insert(view, edit, characters):
+    for region in reversed(view.sel()):
+        view.replace(edit, region, characters)
+
+
+@command("expand_selection")
+def expand_selection(view, edit, to):
+    # Approximates the built-in command: "brackets" selects the contents of
+    # the innermost enclosing S-expression, then the S-expression itself.
+    # "scope" selects the extent of the innermost scope.
+    for region in view.sel():
+        if to == "scope":
+            scope = view.scope_name(region.begin()).split()[-1]
+
+            if expanded := view.expand_to_scope(region.begin(), scope):
+                view.sel().add(expanded)
+        elif (
+            innermost := sexp.innermost(view, region.begin(), edge=False)
+        ) and innermost.close:
+            contents = Region(
+                innermost.open.region.end(), innermost.close.region.begin()
+            )
+
+            if contents.contains(region) and contents != region:
+                view.sel().add(contents)
+            else:
+                view.sel().add(innermost.extent())
+
+
+@command("tutkain_indent_sexp")
+def indent_sexp(view, edit, scope="outermost", prune=False):
+    # Mirrors TutkainIndentSexpCommand in src/core.py.
+    for region in view.sel():
+        if not region.empty():
+            target = region
+        elif scope == "innermost" and (
+            innermost := sexp.innermost(view, region.begin())
+        ):
+            target = innermost.extent()
+        elif outermost := sexp.outermost(view, region.begin()):
+            target = outermost.extent()
+        else:
+            continue
+
+        indent.indent_region(view, edit, target, prune=prune)
+
+
+@command("tutkain_format_buffer")
+def format_buffer(view, edit):
+    # Mirrors TutkainFormatBufferCommand in src/core.py, with the default
+    # settings.
+    indent.format_view(view, edit)
+
+
+@command("tutkain_zap_commas")
+def zap_commas(view, edit):
+    # Mirrors TutkainZapCommasCommand in src/core.py.
+    cleanup.clean_up(view, edit, kinds=[cleanup.COMMAS])
+
+
+@command("tutkain_clean_up")
+def clean_up(view, edit, kinds=cleanup.DEFAULT_KINDS):
+    # Mirrors TutkainCleanUpCommand in src/core.py.
+    cleanup.clean_up(view, edit, kinds=kinds)
+
+
+@command("tutkain_expand_selection")
+def tutkain_expand_selection(view, _):
+    # Mirrors TutkainExpandSelectionCommand in src/core.py.
+    regions = []
+
+    for region in view.sel():
+        if selectors.ignore(view, region.begin()):
+            view.run_command("expand_selection", {"to": "scope"})
+        else:
+            regions.append(region)
+
+    with selectors.pinned(view):
+        for region in regions:
+            paredit.expand_selection(view, region)
+
+
+@command("tutkain_paredit_forward")
+def paredit_forward(view, _, extend=False):
+    paredit.move(view, True, extend)
+
+
+@command("tutkain_paredit_backward")
+def paredit_backward(view, _, extend=False):
+    paredit.move(view, False, extend)
+
+
+@command("tutkain_paredit_thread_first")
+def paredit_thread_first(view, edit, join_on=" ", arrow="->"):
+    paredit.thread_first(view, edit, join_on=join_on, arrow=arrow)
+
+
+@command("tutkain_paredit_thread_last")
+def paredit_thread_last(view, edit, join_on=" ", arrow="->>"):
+    paredit.thread_last(view, edit, join_on=join_on, arrow=arrow)
+
+
+@command("tutkain_paredit_unthread")
+def paredit_unthread(view, edit, join_on=" "):
+    paredit.unthread(view, edit, join_on=join_on)
+
+
+def paredit_command(name, f, *args):
+    command(name)(lambda view, edit, **kwargs: f(view, edit, *args, **kwargs))
+
+
+# Mirrors the TutkainParedit*Command classes in src/core.py.
+for name, f, *args in [
+    ("tutkain_paredit_open_round", paredit.open_bracket, "("),
+    ("tutkain_paredit_close_round", paredit.close_bracket, ")"),
+    ("tutkain_paredit_open_square", paredit.open_bracket, "["),
+    ("tutkain_paredit_close_square", paredit.close_bracket, "]"),
+    ("tutkain_paredit_open_curly", paredit.open_bracket, "{"),
+    ("tutkain_paredit_close_curly", paredit.close_bracket, "}"),
+    ("tutkain_paredit_double_quote", paredit.double_quote),
+    ("tutkain_paredit_forward_slurp", paredit.forward_slurp),
+    ("tutkain_paredit_backward_slurp", paredit.backward_slurp),
+    ("tutkain_paredit_forward_barf", paredit.forward_barf),
+    ("tutkain_paredit_backward_barf", paredit.backward_barf),
+    ("tutkain_paredit_wrap_round", paredit.wrap_bracket, "("),
+    ("tutkain_paredit_wrap_square", paredit.wrap_bracket, "["),
+    ("tutkain_paredit_wrap_curly", paredit.wrap_bracket, "{"),
+    ("tutkain_paredit_forward_delete", paredit.forward_delete),
+    ("tutkain_paredit_backward_delete", paredit.backward_delete),
+    ("tutkain_paredit_raise_sexp", paredit.raise_sexp),
+    ("tutkain_paredit_splice_sexp", paredit.splice_sexp),
+    ("tutkain_paredit_comment_dwim", paredit.comment_dwim),
+    ("tutkain_paredit_semicolon", paredit.semicolon),
+    (
+        "tutkain_paredit_splice_sexp_killing_forward",
+        paredit.splice_sexp_killing_forward,
+    ),
+    (
+        "tutkain_paredit_splice_sexp_killing_backward",
+        paredit.splice_sexp_killing_backward,
+    ),
+    ("tutkain_paredit_forward_kill_form", paredit.kill_form, True),
+    ("tutkain_paredit_backward_kill_form", paredit.kill_form, False),
+    ("tutkain_paredit_backward_move_form", paredit.backward_move_form),
+    ("tutkain_paredit_forward_move_form", paredit.forward_move_form),
+    ("tutkain_paredit_move_form_to", paredit.move_form_to),
+    ("tutkain_paredit_sort_collection", paredit.sort_collection),
+    ("tutkain_paredit_dedupe_collection", paredit.dedupe_collection),
+    ("tutkain_paredit_align_collection", paredit.align_collection),
+    ("tutkain_paredit_convert_pairs", paredit.convert_pairs),
+    ("tutkain_paredit_forward_up", paredit.forward_up),
+    ("tutkain_paredit_forward_down", paredit.forward_down),
+    ("tutkain_paredit_backward_up", paredit.backward_up),
+    ("tutkain_paredit_backward_down", paredit.backward_down),
+    ("tutkain_paredit_split_sexp", paredit.split_sexp),
+    ("tutkain_paredit_join_sexps", paredit.join_sexps),
+    ("tutkain_discard_undiscard_sexp", paredit.discard_undiscard),
+]:
+    paredit_command(name, f, *args)
@@ -0,0 +1,826 @@
+"""A stand-in for the parts of the Sublime Text API that the structural editing
+code in this package uses.
+
+View keeps its text in memory and assigns scopes to the text with the
+sublime-syntax interpreter in the syntax module."""
+
+import functools
+import itertools
+import json
+import os
+import re
+import time
+
+from . import syntax as syntax_module
+
+DEFAULT_SYNTAX = "Packages/Tutkain/Clojure (Tutkain).sublime-syntax"
+DEFAULT_WORD_SEPARATORS = "./\\()\"'-:,.;<>~!@#$%^&*|+=[]{}`~?"
+
+CLASS_WORD_START = 1
+CLASS_WORD_END = 2
+CLASS_PUNCTUATION_START = 4
+CLASS_PUNCTUATION_END = 8
+CLASS_SUB_WORD_START = 16
+CLASS_SUB_WORD_END = 32
+CLASS_LINE_START = 64
+CLASS_LINE_END = 128
+CLASS_EMPTY_LINE = 256
+
+DRAW_NO_OUTLINE = 256
+
+LITERAL = 1
+IGNORECASE = 2
+
+
+def version():
+    return "4180"
+
+
+@functools.lru_cache(maxsize=65536)
+def score_selector(scope, selector):
+    from Tutkain.src import selectors
+
+    return 1 if selectors.compile_selector(selector).match(scope) else 0
+
+
+def set_timeout(f, delay=0):
+    f()
+
+
+def set_timeout_async(f, delay=0):
+    f()
+
+
+def active_window():
+    return None
+
+
+class Window:
+    """A stand-in for sublime.Window, which the REPL modules refer to at
+    import time. A View has no Window."""
+
+
+class Region:
+    def __init__(self, a, b=None, xpos=-1):
+        self.a = a
+        self.b = a if b is None else b
+        self.xpos = xpos
+
+    def __repr__(self):
+        return f"Region({self.a}, {self.b})"
+
+    def __str__(self):
+        return f"({self.a}, {self.b})"
+
+    def __len__(self):
+        return self.size()
+
+    def __eq__(self, other):
+        return (
+            hasattr(other, "a")
+            and hasattr(other, "b")
+            and self.a == other.a
+            and self.b == other.b
+        )
+
+    def __hash__(self):
+        return hash((self.a, self.b))
+
+    def __lt__(self, other):
+        return self.begin() < other.begin()
+
+    def __iter__(self):
+        return iter((self.a, self.b))
+
+    def __contains__(self, x):
+        return self.contains(x)
+
+    def to_tuple(self):
+        return (self.a, self.b)
+
+    def empty(self):
+        return self.a == self.b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+    def size(self):
+        return abs(self.a - self.b)
+
+    def contains(self, x):
+        if isinstance(x, int):
+            return self.begin() <= x <= self.end()
+
+        return self.begin() <= x.begin() and x.end() <= self.end()
+
+    def cover(self, region):
+        if self.a > self.b:
+            return Region(max(self.a, region.end()), min(self.b, region.begin()))
+
+        return Region(min(self.a, region.begin()), max(self.b, region.end()))
+
+    def intersection(self, region):
+        if self.end() <= region.begin() or region.end() <= self.begin():
+            return Region(0, 0)
+
+        return Region(max(self.begin(), region.begin()), min(self.end(), region.end()))
+
+    def intersects(self, region):
+        return (
+            self.contains(region)
+            or region.contains(self)
+            or (region.begin() < self.end() and self.begin() < region.end())
+        )
+
+
+class Selection:
+    """The selections of a View, kept sorted, with overlapping selections
+    merged."""
+
+    def __init__(self):
+        self.regions = []
+
+    def __repr__(self):
+        return f"Selection({self.regions!r})"
+
+    def __len__(self):
+        return len(self.regions)
+
+    def __getitem__(self, index):
+        return self.regions[index]
+
+    def __delitem__(self, index):
+        del self.regions[index]
+
+    def __iter__(self):
+        # Like sublime.Selection, read each selection as the iteration reaches
+        # it, so that edits made during the iteration are reflected.
+        for index in range(len(self.regions)):
+            if index < len(self.regions):
+                yield self.regions[index]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def is_valid(self):
+        return True
+
+    def clear(self):
+        self.regions = []
+
+    def add(self, x):
+        region = Region(x, x) if isinstance(x, int) else Region(x.a, x.b)
+        self.regions = merge(self.regions + [region])
+
+    def add_all(self, regions):
+        self.regions = merge(
+            self.regions
+            + [
+                Region(x, x) if isinstance(x, int) else Region(x.a, x.b)
+                for x in regions
+            ]
+        )
+
+    def subtract(self, region):
+        regions = []
+
+        for r in self.regions:
+            if not r.intersects(region) or r.empty():
+                regions.append(r)
+            else:
+                if r.begin() < region.begin():
+                    regions.append(Region(r.begin(), region.begin()))
+                if region.end() < r.end():
+                    regions.append(Region(region.end(), r.end()))
+
+        self.regions = merge(regions)
+
+    def contains(self, region):
+        return any(r.contains(region) for r in self.regions)
+
+    def shift(self, begin, end, length):
+        """Update the selections after the text between two points is
+        replaced with text of a given length."""
+
+        def move(point, sticky=False):
+            if begin == end:
+                # Text inserted at the end of a non-empty selection does not
+                # extend it.
+                return (
+                    point + length
+                    if point > begin or (point == begin and not sticky)
+                    else point
+                )
+            elif point <= begin:
+                return point
+            elif point >= end:
+                return point + length - (end - begin)
+            else:
+                return min(point, begin + length)
+
+        self.regions = merge(
+            [
+                Region(
+                    move(r.a, r.a == r.end() > r.begin()),
+                    move(r.b, r.b == r.end() > r.begin()),
+                )
+                for r in self.regions
+            ]
+        )
+
+
+def merge(regions):
+    merged = []
+
+    for region in sorted(regions, key=lambda region: (region.begin(), region.end())):
+        if merged and (
+            region.begin() < merged[-1].end()
+            or (
+                region.begin() == merged[-1].end()
+                and (region.empty() or merged[-1].empty())
+            )
+        ):
+            merged[-1] = merged[-1].cover(region)
+        else:
+            merged.append(region)
+
+    return merged
+
+
+def common_prefix_length(a, b):
+    """Return the length of the longest common prefix of two strings."""
+    low, high = 0, min(len(a), len(b))
+
+    # Compare slices instead of characters: a binary search over slice
+    # comparisons is much faster than a character-by-character loop on large
+    # buffers.
+    while low < high:
+        middle = (low + high + 1) // 2
+
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+
+    return low
+
+
+class Settings:
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+        self.callbacks = {}
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        self.values[key] = value
+        self.changed()
+
+    def has(self, key):
+        return key in self.values
+
+    def erase(self, key):
+        self.values.pop(key, None)
+        self.changed()
+
+    def add_on_change(self, tag, callback):
+        self.callbacks.setdefault(tag, []).append(callback)
+
+    def clear_on_change(self, tag):
+        self.callbacks.pop(tag, None)
+
+    def changed(self):
+        for callbacks in list(self.callbacks.values()):
+            for callback in callbacks:
+                callback()
+
+    def to_dict(self):
+        return dict(self.values)
+
+
+class Syntax:
+    def __init__(self, path, name, hidden, scope):
+        self.path = path
+        self.name = name
+        self.hidden = hidden
+        self.scope = scope
+
+    def __repr__(self):
+        return f"Syntax({self.path!r}, {self.name!r}, {self.hidden!r}, {self.scope!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Syntax) and self.path == other.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+def load_syntax_settings(name):
+    """Given the name of a syntax, return the settings in the
+    .sublime-settings file of the same name in this package, if any."""
+    path = os.path.join(syntax_module.ROOT, f"{name}.sublime-settings")
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, encoding="utf-8") as file:
+        text = re.sub(r"^\s*//.*$", "", file.read(), flags=re.MULTILINE)
+
+    return json.loads(re.sub(r",(\s*[}\]])", r"\1", text))
+
+
+class HistoricPosition:
+    def __init__(self, pt, row, col):
+        self.pt = pt
+        self.row = row
+        self.col = col
+
+
+class TextChange:
+    def __init__(self, a, b, text):
+        self.a = a
+        self.b = b
+        self.str = text
+        self.len_utf8 = len(text.encode("utf-8"))
+        self.len_utf16 = len(text.encode("utf-16-le")) // 2
+
+
+# The functions to call after the text of a View changes. Each function takes
+# a View and a list of TextChange objects, like
+# sublime_plugin.TextChangeListener.on_text_changed. Like Sublime Text, View
+# calls them once per command, with every change the command made.
+TEXT_CHANGE_LISTENERS = []
+
+
+def native(method):
+    """Decorate a method of View that Sublime Text implements natively, so
+    that the time spent in the method counts toward View.native_time."""
+
+    @functools.wraps(method)
+    def timed(self, *args, **kwargs):
+        if self.native_depth:
+            return method(self, *args, **kwargs)
+
+        self.native_depth = 1
+        begin = time.perf_counter()
+
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.native_time += time.perf_counter() - begin
+            self.native_depth = 0
+
+    return timed
+
+
+# The commands View.run_command can run. Maps the name of a command to a
+# function that takes a View, an edit token, and the arguments of the command.
+COMMANDS = {}
+
+view_ids = itertools.count(1)
+
+
+class View:
+    """A view on a buffer of text whose scopes come from a syntax definition in
+    this package.
+
+    Edits take effect immediately; the `edit` argument of the methods that
+    modify the text is ignored."""
+
+    def __init__(self, text="", syntax=DEFAULT_SYNTAX):
+        self.view_id = next(view_ids)
+        self.buffer = None
+        self.text = text
+        self.changes = 0
+        self.view_name = ""
+        self.selection = Selection()
+        self.view_settings = Settings()
+        self.pending_changes = []
+        self.command_depth = 0
+        self.regions_by_key = {}
+        # The time, in seconds, spent in the methods Sublime Text implements
+        # natively. Lexing happens lazily, in these methods.
+        self.native_time = 0.0
+        self.native_depth = 0
+        self.assign_syntax(syntax)
+
+    def __repr__(self):
+        return f"View({self.view_id})"
+
+    def __bool__(self):
+        return self.is_valid()
+
+    def __eq__(self, other):
+        return isinstance(other, View) and self.view_id == other.view_id
+
+    def __hash__(self):
+        return self.view_id
+
+    def id(self):
+        return self.view_id
+
+    def buffer_id(self):
+        return self.view_id
+
+    def is_valid(self):
+        return True
+
+    def is_loading(self):
+        return False
+
+    def is_read_only(self):
+        return False
+
+    def is_scratch(self):
+        return True
+
+    def set_scratch(self, scratch):
+        pass
+
+    def element(self):
+        return None
+
+    def window(self):
+        return None
+
+    def file_name(self):
+        return None
+
+    def name(self):
+        return self.view_name
+
+    def set_name(self, name):
+        self.view_name = name
+
+    def settings(self):
+        return self.view_settings
+
+    def syntax(self):
+        return Syntax(
+            self.buffer.syntax.path,
+            self.buffer.syntax.name,
+            False,
+            self.buffer.syntax.scope,
+        )
+
+    def assign_syntax(self, syntax):
+        """Given the resource path or the file name of a syntax definition in
+        this package, or a Syntax, assign the syntax to this View."""
+        path = syntax.path if isinstance(syntax, Syntax) else syntax
+        definition = syntax_module.load(path)
+        self.buffer = syntax_module.Buffer(definition, self.text)
+        self.view_settings.values.update(load_syntax_settings(definition.name))
+        self.view_settings.set("syntax", path)
+
+    def change_count(self):
+        return self.changes
+
+    def size(self):
+        return len(self.text)
+
+    @native
+    def substr(self, x):
+        if isinstance(x, int):
+            return self.text[x] if 0 <= x < len(self.text) else "\x00"
+
+        return self.text[max(0, x.begin()) : x.end()]
+
+    def sel(self):
+        return self.selection
+
+    def show(self, x, show_surrounds=True, keep_to_left=False, animate=True):
+        pass
+
+    def show_at_center(self, x, animate=True):
+        pass
+
+    # Editing
+
+    def replace_text(self, begin, end, text):
+        change = TextChange(
+            HistoricPosition(begin, *self.rowcol(begin)),
+            HistoricPosition(end, *self.rowcol(end)),
+            text,
+        )
+
+        self.text = self.text[:begin] + text + self.text[end:]
+        self.buffer.replace(begin, end, text)
+        self.selection.shift(begin, end, len(text))
+        self.changes += 1
+        self.pending_changes.append(change)
+
+        if not self.command_depth:
+            self.notify()
+
+    def notify(self):
+        """Pass the changes since the last call to the text change
+        listeners."""
+        changes, self.pending_changes = self.pending_changes, []
+
+        if changes:
+            for listener in TEXT_CHANGE_LISTENERS:
+                listener(self, changes)
+
+    def insert(self, edit, point, text):
+        point = max(0, min(point, self.size()))
+        self.replace_text(point, point, text)
+        return len(text)
+
+    def erase(self, edit, region):
+        begin = max(0, region.begin())
+        end = min(region.end(), self.size())
+
+        if begin < end:
+            self.replace_text(begin, end, "")
+
+    def replace(self, edit, region, text):
+        begin = max(0, region.begin())
+        end = min(region.end(), self.size())
+        old = self.text[begin:end]
+
+        # Like Sublime Text, only replace the part of the text that changes,
+        # so that the selections outside of it stay where they are.
+        prefix = common_prefix_length(old, text)
+        suffix = common_prefix_length(old[prefix:][::-1], text[prefix:][::-1])
+
+        if prefix + suffix < max(len(old), len(text)):
+            self.replace_text(
+                begin + prefix, end - suffix, text[prefix : len(text) - suffix]
+            )
+
+    def run_command(self, cmd, args=None):
+        if (command := COMMANDS.get(cmd)) is None:
+            raise ValueError(f"Unknown command: {cmd}")
+
+        self.command_depth += 1
+
+        try:
+            command(self, None, **(args or {}))
+        finally:
+            self.command_depth -= 1
+
+        if not self.command_depth:
+            self.notify()
+
+    # Scopes
+
+    def clip(self, point):
+        return max(0, min(point, self.size()))
+
+    @native
+    def scope_name(self, point):
+        return self.buffer.scope_at(self.clip(point))
+
+    @native
+    def match_selector(self, point, selector):
+        return score_selector(self.scope_name(point), selector) > 0
+
+    @native
+    def score_selector(self, point, selector):
+        return score_selector(self.scope_name(point), selector)
+
+    @native
+    def extract_tokens_with_scopes(self, region):
+        return [
+            (Region(begin, end), scope)
+            for begin, end, scope in self.buffer.iter_tokens(
+                self.clip(region.begin()), self.clip(region.end())
+            )
+        ]
+
+    @native
+    def find_by_selector(self, selector):
+        regions = []
+
+        for begin, end, scope in self.buffer.iter_tokens():
+            if score_selector(scope, selector):
+                if regions and regions[-1].end() == begin:
+                    regions[-1] = Region(regions[-1].begin(), end)
+                else:
+                    regions.append(Region(begin, end))
+
+        return regions
+
+    @native
+    def expand_to_scope(self, point, selector):
+        token = self.buffer.token_at(self.clip(point))
+
+        if token is None or not score_selector(token[2], selector):
+            return None
+
+        begin, end, _ = token
+
+        for token_begin, _, scope in self.buffer.iter_tokens_backward(begin):
+            if not score_selector(scope, selector):
+                break
+
+            begin = token_begin
+
+        for token_begin, token_end, scope in self.buffer.iter_tokens(end):
+            if token_begin < end:
+                continue
+            elif not score_selector(scope, selector):
+                break
+
+            end = token_end
+
+        return Region(begin, end)
+
+    # Lines
+
+    @native
+    def rowcol(self, point):
+        point = self.clip(point)
+        row = self.buffer.line_index(point)
+        return row, point - self.buffer.offsets[row]
+
+    @native
+    def text_point(self, row, col):
+        row = max(0, min(row, len(self.buffer.offsets) - 1))
+        return self.clip(self.buffer.offsets[row] + col)
+
+    @native
+    def line(self, x):
+        if isinstance(x, int):
+            row, _ = self.rowcol(x)
+            begin = self.buffer.offsets[row]
+            return Region(begin, begin + len(self.buffer.lines[row].rstrip("\n")))
+
+        return Region(self.line(x.begin()).begin(), self.line(x.end()).end())
+
+    @native
+    def full_line(self, x):
+        if isinstance(x, int):
+            row, _ = self.rowcol(x)
+            begin = self.buffer.offsets[row]
+            return Region(begin, begin + len(self.buffer.lines[row]))
+
+        return Region(self.full_line(x.begin()).begin(), self.full_line(x.end()).end())
+
+    @native
+    def lines(self, region):
+        first, _ = self.rowcol(region.begin())
+        last, _ = self.rowcol(region.end())
+        return [self.line(self.text_point(row, 0)) for row in range(first, last + 1)]
+
+    @native
+    def split_by_newlines(self, region):
+        return [
+            line.intersection(region) if not region.empty() else region
+            for line in self.lines(region)
+        ]
+
+    # Searching
+
+    def compile(self, pattern, flags):
+        if flags & LITERAL:
+            pattern = re.escape(pattern)
+
+        return re.compile(
+            pattern, re.MULTILINE | (re.IGNORECASE if flags & IGNORECASE else 0)
+        )
+
+    @native
+    def find(self, pattern, start_pt, flags=0):
+        if match := self.compile(pattern, flags).search(self.text, self.clip(start_pt)):
+            return Region(match.start(), match.end())
+
+        return Region(-1, -1)
+
+    @native
+    def find_all(self, pattern, flags=0, fmt=None, extractions=None):
+        regions = []
+
+        for match in self.compile(pattern, flags).finditer(self.text):
+            regions.append(Region(match.start(), match.end()))
+
+            if fmt is not None and extractions is not None:
+                extractions.append(match.expand(fmt))
+
+        return regions
+
+    # Regions
+
+    @native
+    def add_regions(self, key, regions, scope="", icon="", flags=0):
+        # Unlike in Sublime Text, the regions don't move along with edits.
+        self.regions_by_key[key] = list(regions)
+
+    @native
+    def get_regions(self, key):
+        return list(self.regions_by_key.get(key, ()))
+
+    @native
+    def erase_regions(self, key):
+        self.regions_by_key.pop(key, None)
+
+    # Classes
+
+    def char_class(self, point):
+        """Return the class of the character at the point: "word",
+        "punctuation", "whitespace", or None at the edges of the View."""
+        if not 0 <= point < self.size():
+            return None
+
+        char = self.text[point]
+
+        if char.isspace():
+            return "whitespace"
+        elif char in self.view_settings.get("word_separators", DEFAULT_WORD_SEPARATORS):
+            return "punctuation"
+
+        return "word"
+
+    @native
+    def classify(self, point):
+        before = self.char_class(point - 1)
+        after = self.char_class(point)
+        classes = 0
+
+        if after == "word" and before != "word":
+            classes |= CLASS_WORD_START | CLASS_SUB_WORD_START
+        if before == "word" and after != "word":
+            classes |= CLASS_WORD_END | CLASS_SUB_WORD_END
+        if after == "punctuation" and before != "punctuation":
+            classes |= CLASS_PUNCTUATION_START
+        if before == "punctuation" and after != "punctuation":
+            classes |= CLASS_PUNCTUATION_END
+        if before == "word" and after == "word":
+            sub_word_separators = self.view_settings.get("sub_word_separators", "")
+
+            if self.text[point - 1] in sub_word_separators:
+                classes |= CLASS_SUB_WORD_START
+            if self.text[point] in sub_word_separators:
+                classes |= CLASS_SUB_WORD_END
+
+        line_start = point == 0 or self.text[point - 1] == "\n"
+        line_end = point == self.size() or self.text[point] == "\n"
+
+        if line_start:
+            classes |= CLASS_LINE_START
+        if line_end:
+            classes |= CLASS_LINE_END
+        if line_start and line_end:
+            classes |= CLASS_EMPTY_LINE
+
+        return classes
+
+    @native
+    def find_by_class(self, point, forward, classes, separators=""):
+        if forward:
+            for candidate in range(point + 1, self.size()):
+                if self.classify(candidate) & classes:
+                    return candidate
+
+            return self.size()
+        else:
+            for candidate in range(point - 1, 0, -1):
+                if self.classify(candidate) & classes:
+                    return candidate
+
+            return 0
+
+    @native
+    def expand_by_class(self, x, classes, separators=""):
+        region = Region(x, x) if isinstance(x, int) else x
+        return Region(
+            self.find_by_class(region.begin(), False, classes, separators),
+            self.find_by_class(region.end(), True, classes, separators),
+        )
+
+    @native
+    def word(self, x):
+        """Return the word that contains the point, or the run of characters
+        of the same class that contains the point if the point is not next to
+        a word."""
+        if not isinstance(x, int):
+            return Region(self.word(x.begin()).begin(), self.word(x.end()).end())
+
+        point = self.clip(x)
+
+        if self.char_class(point) == "word" or self.char_class(point - 1) == "word":
+            kind = "word"
+        else:
+            kind = self.char_class(point) or self.char_class(point - 1)
+
+        begin = end = point
+
+        while (
+            begin > 0
+            and self.char_class(begin - 1) == kind
+            and self.text[begin - 1] != "\n"
+        ):
+            begin -= 1
+
+        while (
+            end < self.size()
+            and self.char_class(end) == kind
+            and self.text[end] != "\n"
+        ):
+            end += 1
+
+        return Region(begin, end)
@@ -0,0 +1,774 @@
+"""A sublime-syntax interpreter.
+
+Loads the syntax definitions in this package and assigns scopes to source
+text the way Sublime Text does: one line at a time, trying the patterns of the
+context on top of the context stack and taking the leftmost match.
+
+Supports the parts of the sublime-syntax format the syntax definitions in this
+package use: variables, `extends`, the `prototype` context, `include`,
+`push`, `set`, `pop`, `captures`, `meta_scope`, `meta_content_scope`, and
+`meta_include_prototype`. Translates the Oniguruma regular expressions in the
+syntax definitions into Python regular expressions.
+
+Uses only the Python standard library, so it runs both in and outside Sublime
+Text."""
+
+import itertools
+import os
+import re
+from bisect import bisect_right
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_PREFIX = "Packages/Tutkain/"
+
+# The number of consecutive zero-width matches at the same position after
+# which the lexer gives up and consumes a character.
+MAX_ZERO_WIDTH_MATCHES = 64
+
+
+def resolve(path):
+    """Given the resource path or the file name of a syntax definition in this
+    package, return the path of the file."""
+    if path.startswith(PACKAGE_PREFIX):
+        path = path[len(PACKAGE_PREFIX) :]
+
+    return os.path.join(ROOT, path)
+
+
+# YAML
+
+
+KEY_PATTERN = re.compile(r"([\w.-]+):(?:\s+(.*))?$")
+
+
+def strip_comment(text):
+    """Given a plain YAML scalar, remove the comment that follows it, if
+    any."""
+    if (index := text.find(" #")) != -1:
+        text = text[:index]
+
+    return text.strip()
+
+
+def parse_scalar(text):
+    if text.startswith("'"):
+        end = 1
+
+        while (end := text.index("'", end)) + 1 < len(text) and text[end + 1] == "'":
+            end += 2
+
+        return text[1:end].replace("''", "'")
+    elif text.startswith('"'):
+        return re.match(r'"((?:[^"\\]|\\.)*)"', text).group(1).replace('\\"', '"')
+
+    text = strip_comment(text)
+
+    if text.startswith("[") and text.endswith("]"):
+        return [parse_scalar(item.strip()) for item in text[1:-1].split(",")]
+    elif text in {"true", "false"}:
+        return text == "true"
+    elif re.fullmatch(r"-?\d+", text):
+        return int(text)
+
+    return text
+
+
+def is_sequence_item(content):
+    return content == "-" or content.startswith("- ")
+
+
+def parse_node(lines, i, indent):
+    if is_sequence_item(lines[i][1]):
+        return parse_sequence(lines, i, indent)
+    else:
+        return parse_mapping(lines, i, indent)
+
+
+def parse_sequence(lines, i, indent):
+    items = []
+
+    while i < len(lines) and lines[i][0] == indent and is_sequence_item(lines[i][1]):
+        content = lines[i][1][1:]
+        offset = len(content) - len(content.lstrip()) + 1
+        # Parse the rest of the line as if it were a line of its own, indented
+        # to the column where its content starts.
+        lines[i] = (indent + offset, content.lstrip())
+        item, i = parse_node(lines, i, indent + offset)
+        items.append(item)
+
+    return items, i
+
+
+def parse_mapping(lines, i, indent):
+    mapping = {}
+
+    while (
+        i < len(lines) and lines[i][0] == indent and not is_sequence_item(lines[i][1])
+    ):
+        key, value = KEY_PATTERN.match(lines[i][1]).groups()
+        i += 1
+
+        if value:
+            mapping[key] = parse_scalar(value)
+        elif i < len(lines) and (
+            lines[i][0] > indent
+            or (lines[i][0] == indent and is_sequence_item(lines[i][1]))
+        ):
+            mapping[key], i = parse_node(lines, i, lines[i][0])
+        else:
+            mapping[key] = None
+
+    return mapping, i
+
+
+def parse_yaml(text):
+    """Given the text of a sublime-syntax file, return the mapping it
+    describes.
+
+    Only supports the subset of YAML that sublime-syntax files in this package
+    use: block mappings and sequences, plain and quoted scalars, and flow
+    sequences of plain scalars."""
+    lines = []
+
+    for line in text.splitlines():
+        content = line.strip()
+
+        if content and not content.startswith(("#", "%", "---")):
+            lines.append((len(line) - len(line.lstrip()), content))
+
+    mapping, _ = parse_mapping(lines, 0, 0)
+    return mapping
+
+
+# Regular expressions
+
+
+def translate_class(pattern, i):
+    """Given an Oniguruma regular expression and the index of the opening
+    bracket of a character class in it, return a tuple of the equivalent
+    Python regular expression and the index after the character class.
+
+    Python does not support nested character classes, so translates classes
+    that contain them into alternations."""
+    i += 1
+    negated = pattern[i] == "^"
+
+    if negated:
+        i += 1
+
+    members = []
+    nested = []
+
+    # A closing bracket right after the opening bracket is a literal.
+    if pattern[i] == "]":
+        members.append(r"\]")
+        i += 1
+
+    while pattern[i] != "]":
+        char = pattern[i]
+
+        if char == "\\":
+            escape = pattern[i : i + 2]
+            members.append("0-9a-fA-F" if escape == r"\h" else escape)
+            i += 2
+        elif char == "[":
+            translated, i = translate_class(pattern, i)
+            nested.append(translated)
+        else:
+            members.append(char)
+            i += 1
+
+    i += 1
+    own = f"[{''.join(members)}]" if members else None
+
+    if not nested:
+        return f"[{'^' if negated else ''}{''.join(members)}]", i
+
+    alternatives = "|".join(([own] if own else []) + nested)
+
+    if negated:
+        return f"(?:(?!{alternatives})[\\s\\S])", i
+
+    return f"(?:{alternatives})", i
+
+
+def split_alternatives(pattern):
+    """Given a regular expression, split it into its top-level
+    alternatives."""
+    alternatives = []
+    depth = 0
+    start = 0
+    i = 0
+
+    while i < len(pattern):
+        char = pattern[i]
+
+        if char == "\\":
+            i += 1
+        elif char == "[":
+            _, i = translate_class(pattern, i)
+            continue
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            alternatives.append(pattern[start:i])
+            start = i + 1
+
+        i += 1
+
+    alternatives.append(pattern[start:])
+    return alternatives
+
+
+def find_group_end(pattern, i):
+    """Given a regular expression and the index of an open parenthesis in it,
+    return the index of the parenthesis that closes it."""
+    depth = 0
+
+    while True:
+        char = pattern[i]
+
+        if char == "\\":
+            i += 1
+        elif char == "[":
+            _, i = translate_class(pattern, i)
+            continue
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+
+            if depth == 0:
+                return i
+
+        i += 1
+
+
+def translate(pattern):
+    """Given an Oniguruma regular expression, return the equivalent Python
+    regular expression."""
+    output = []
+    i = 0
+
+    while i < len(pattern):
+        char = pattern[i]
+
+        if char == "\\":
+            escape = pattern[i : i + 2]
+
+            if escape == r"\h":
+                output.append("[0-9a-fA-F]")
+            elif escape == r"\N":
+                # Sublime Text treats \N as a literal N.
+                output.append("N")
+            elif escape == r"\z":
+                output.append("\\Z")
+            else:
+                output.append(escape)
+
+            i += 2
+        elif char == "[":
+            translated, i = translate_class(pattern, i)
+            output.append(translated)
+        elif pattern.startswith(("(?<=", "(?<!"), i):
+            # Python only supports fixed-width lookbehinds, so split a
+            # lookbehind with alternatives of different widths into one
+            # lookbehind per alternative.
+            end = find_group_end(pattern, i)
+            operator = pattern[i : i + 4]
+            alternatives = [
+                f"{operator}{translate(alternative)})"
+                for alternative in split_alternatives(pattern[i + 4 : end])
+            ]
+
+            if operator == "(?<=":
+                output.append(f"(?:{'|'.join(alternatives)})")
+            else:
+                output.append("".join(alternatives))
+
+            i = end + 1
+        else:
+            output.append(char)
+            i += 1
+
+    return "".join(output)
+
+
+# Syntax definitions
+
+
+class Rule:
+    """A match pattern in a context."""
+
+    def __init__(self, syntax, definition):
+        self.regex = re.compile(translate(syntax.expand(definition["match"])))
+        self.scope = definition.get("scope")
+        self.captures = sorted(
+            (int(group), scope)
+            for group, scope in definition.get("captures", {}).items()
+        )
+        self.pop = 0
+        self.push = None
+        self.set = None
+
+        if pop := definition.get("pop"):
+            self.pop = 1 if pop is True else pop
+
+        if (push := definition.get("push")) is not None:
+            self.push = syntax.targets(push)
+
+        if (target := definition.get("set")) is not None:
+            self.set = syntax.targets(target)
+
+
+class Context:
+    """A context in a syntax definition."""
+
+    def __init__(self, syntax, name, definition):
+        self.syntax = syntax
+        self.name = name
+        self.definition = definition
+        self.meta_scope = ""
+        self.meta_content_scope = ""
+        self.include_prototype = True
+        self.__rules = None
+
+        for item in definition:
+            if "meta_scope" in item:
+                self.meta_scope = item["meta_scope"]
+            elif "meta_content_scope" in item:
+                self.meta_content_scope = item["meta_content_scope"]
+            elif "meta_include_prototype" in item:
+                self.include_prototype = item["meta_include_prototype"]
+
+    def __repr__(self):
+        return f"Context({self.name!r})"
+
+    def own_rules(self, seen):
+        if self.name in seen:
+            return []
+
+        seen = seen | {self.name}
+        rules = []
+
+        for item in self.definition:
+            if "match" in item:
+                rules.append(self.syntax.rule(item))
+            elif "include" in item:
+                rules.extend(self.syntax.context(item["include"]).own_rules(seen))
+
+        return rules
+
+    @property
+    def rules(self):
+        """The match patterns of this context, with the includes and the
+        prototype resolved."""
+        if self.__rules is None:
+            rules = []
+
+            if (
+                self.include_prototype
+                and self.name != "prototype"
+                and "prototype" in self.syntax.contexts
+            ):
+                rules.extend(self.syntax.context("prototype").own_rules(set()))
+
+            self.__rules = rules + self.own_rules(set())
+
+        return self.__rules
+
+
+class Syntax:
+    """A syntax definition.
+
+    Do not initialize directly; use load instead."""
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(resolve(path), encoding="utf-8") as file:
+            definition = parse_yaml(file.read())
+
+        self.name = definition.get("name")
+        self.scope = definition["scope"]
+        self.variables = {}
+        self.contexts = {}
+
+        if base := definition.get("extends"):
+            parent = load(base)
+            self.variables.update(parent.variables)
+            self.contexts.update(parent.contexts)
+
+        self.variables.update(definition.get("variables") or {})
+        self.contexts.update(definition.get("contexts") or {})
+        self.__contexts = {}
+        self.__rules = {}
+        self.__anonymous = 0
+
+    def __repr__(self):
+        return f"Syntax({self.path!r})"
+
+    def expand(self, pattern):
+        """Given a regular expression, replace the variables in it with their
+        values."""
+        while "{{" in pattern:
+            pattern = re.sub(
+                r"\{\{(\w+)\}\}", lambda match: self.variables[match.group(1)], pattern
+            )
+
+        return pattern
+
+    def context(self, name):
+        if (context := self.__contexts.get(name)) is None:
+            context = Context(self, name, self.contexts[name])
+            self.__contexts[name] = context
+
+        return context
+
+    def rule(self, definition):
+        key = id(definition)
+
+        if (rule := self.__rules.get(key)) is None:
+            rule = Rule(self, definition)
+            self.__rules[key] = rule
+
+        return rule
+
+    def targets(self, value):
+        """Given the value of a push or a set, return a list of the Contexts it
+        refers to."""
+        if isinstance(value, str):
+            return [self.context(value)]
+        elif all(isinstance(item, str) for item in value):
+            return [self.context(name) for name in value]
+        else:
+            self.__anonymous += 1
+            return [Context(self, f"#anonymous-{self.__anonymous}", value)]
+
+    def initial_stack(self):
+        return (self.context("main"),)
+
+
+__syntaxes = {}
+
+
+def load(path):
+    """Given the resource path or the file name of a syntax definition in this
+    package, return the Syntax it defines."""
+    path = PACKAGE_PREFIX + os.path.basename(resolve(path))
+
+    if (syntax := __syntaxes.get(path)) is None:
+        syntax = Syntax(path)
+        __syntaxes[path] = syntax
+
+    return syntax
+
+
+# Lexing
+
+
+def split_lines(text):
+    """Given a string, split it into lines that retain their newlines. The
+    last line never has a newline and might be empty."""
+    lines = text.split("\n")
+    return [line + "\n" for line in lines[:-1]] + [lines[-1]]
+
+
+class Lexer:
+    """Assigns scopes to the lines of a string according to a Syntax."""
+
+    def __init__(self, syntax):
+        self.syntax = syntax
+        self.__scopes = {}
+
+    def scope(self, stack, popped=0):
+        """Given a context stack, return the scope of the text the context on
+        top of the stack matches.
+
+        If `popped` is greater than zero, return the scope of the text that
+        pops that many contexts off the stack instead."""
+        key = (stack, popped)
+
+        if (scope := self.__scopes.get(key)) is None:
+            names = [self.syntax.scope]
+
+            for n, context in enumerate(stack):
+                names.append(context.meta_scope)
+
+                if n < len(stack) - popped:
+                    names.append(context.meta_content_scope)
+
+            scope = " ".join(name for name in names if name) + " "
+            self.__scopes[key] = scope
+
+        return scope
+
+    def match_scope(self, stack, rule):
+        """Given a context stack and the Rule that matches some text, return
+        the scope of the text."""
+        if rule.pop:
+            scope = self.scope(stack, rule.pop)
+        else:
+            # Text that sets the context gets the meta scope of both the
+            # context it pops and the contexts it pushes.
+            scope = self.scope(stack, 1 if rule.set else 0)
+
+            for context in rule.push or rule.set or ():
+                if context.meta_scope:
+                    scope += context.meta_scope + " "
+
+        if rule.scope:
+            scope += rule.scope + " "
+
+        return scope
+
+    def lex(self, line, stack):
+        """Given a line and the context stack at the start of the line, return
+        a tuple of the tokens in the line and the context stack at the end of
+        the line.
+
+        A token is a tuple of the begin and end offset of the token in the line
+        and the scope of the token."""
+        tokens = []
+        pos = 0
+        zero_width = 0
+
+        def add(begin, end, scope):
+            if begin < end:
+                if tokens and tokens[-1][2] == scope and tokens[-1][1] == begin:
+                    tokens[-1] = (tokens[-1][0], end, scope)
+                else:
+                    tokens.append((begin, end, scope))
+
+        while pos < len(line):
+            best = None
+            best_rule = None
+            rules = stack[-1].rules
+
+            # Try the rules at one position at a time instead of searching
+            # the rest of the line: a search with a pattern like (?:.+?/)?
+            # scans the rest of the line from every position it tries, which
+            # is quadratic in the length of the line.
+            for point in range(pos, len(line) + 1):
+                for rule in rules:
+                    if (match := rule.regex.match(line, point)) is not None:
+                        best = match
+                        best_rule = rule
+                        break
+
+                if best is not None:
+                    break
+
+            if best is None:
+                add(pos, len(line), self.scope(stack))
+                break
+
+            begin, end = best.span()
+            add(pos, begin, self.scope(stack))
+            scope = self.match_scope(stack, best_rule)
+
+            if best_rule.captures:
+                self.add_captures(add, best, scope, best_rule.captures)
+            else:
+                add(begin, end, scope)
+
+            if best_rule.pop:
+                stack = stack[: max(1, len(stack) - best_rule.pop)]
+            elif best_rule.push:
+                stack = stack + tuple(best_rule.push)
+            elif best_rule.set:
+                stack = stack[: max(1, len(stack) - 1)] + tuple(best_rule.set)
+
+            if begin == end:
+                zero_width += 1
+
+                # A zero-width match that changes nothing, or one too many
+                # zero-width matches in a row: consume a character.
+                if zero_width > MAX_ZERO_WIDTH_MATCHES or not (
+                    best_rule.pop or best_rule.push or best_rule.set
+                ):
+                    add(pos, pos + 1, self.scope(stack))
+                    end = pos + 1
+                    zero_width = 0
+            else:
+                zero_width = 0
+
+            pos = end
+
+        return tokens, stack
+
+    def add_captures(self, add, match, scope, captures):
+        spans = [
+            (match.start(group), match.end(group), capture)
+            for group, capture in captures
+            if group <= match.re.groups and match.start(group) != -1
+        ]
+
+        points = sorted(
+            {match.start(), match.end()}
+            | {begin for begin, _, _ in spans}
+            | {end for _, end, _ in spans}
+        )
+
+        for begin, end in zip(points, points[1:]):
+            names = [capture for (b, e, capture) in spans if b <= begin and end <= e]
+            add(begin, end, scope + "".join(name + " " for name in names))
+
+
+class Buffer:
+    """The text of a View and the scopes of the text, kept up to date as the
+    text changes.
+
+    Lexes lazily: a change only marks the lines it touches as stale. The first
+    time the scopes of a stale line are needed, re-lexes the stale lines up to
+    that line, and the lines that follow them until the context stack at the
+    start of a line is the same as before the change."""
+
+    def __init__(self, syntax, text=""):
+        self.syntax = syntax
+        self.lexer = Lexer(syntax)
+        self.lines = [""]
+        # The context stack at the start of each line.
+        self.stacks = [syntax.initial_stack()]
+        self.tokens = [[]]
+        self.end_stack = syntax.initial_stack()
+        self.offsets = [0]
+        # The index of the first line whose tokens may be out of date.
+        self.valid = 1
+        # The index of the last line that has changed since the tokens of
+        # every line were last up to date.
+        self.changed = -1
+        self.replace(0, 0, text)
+
+    def text(self):
+        return "".join(self.lines)
+
+    def size(self):
+        return self.offsets[-1] + len(self.lines[-1])
+
+    def line_index(self, point):
+        return bisect_right(self.offsets, point) - 1
+
+    def replace(self, begin, end, text):
+        """Replace the text between two points with a string."""
+        first = self.line_index(begin)
+        last = self.line_index(end)
+        chunk = (
+            self.lines[first][: begin - self.offsets[first]]
+            + text
+            + self.lines[last][end - self.offsets[last] :]
+        )
+
+        new_lines = split_lines(chunk)
+
+        if last < len(self.lines) - 1:
+            # The chunk ends with the newline of the last line it replaces.
+            new_lines.pop()
+
+        delta = len(new_lines) - (last - first + 1)
+
+        self.lines[first : last + 1] = new_lines
+        self.stacks[first : last + 1] = [self.stacks[first]] + [None] * (
+            len(new_lines) - 1
+        )
+        self.tokens[first : last + 1] = [None] * len(new_lines)
+        self.offsets[first:] = itertools.accumulate(
+            map(len, self.lines[first:-1]), initial=self.offsets[first]
+        )
+
+        if self.valid < len(self.lines) - delta:
+            self.changed = max(
+                self.changed + delta if self.changed > last else self.changed,
+                first + len(new_lines) - 1,
+            )
+        else:
+            self.changed = first + len(new_lines) - 1
+
+        self.valid = min(self.valid, first)
+
+    def lex(self, index):
+        """Bring the tokens of the lines up to the one at the given index up
+        to date."""
+        while self.valid <= index:
+            tokens, stack = self.lexer.lex(
+                self.lines[self.valid], self.stacks[self.valid]
+            )
+            self.tokens[self.valid] = tokens
+            self.valid += 1
+
+            if self.valid == len(self.lines):
+                self.end_stack = stack
+            elif self.valid > self.changed and self.stacks[self.valid] == stack:
+                # The lines that follow have not changed, and start with the
+                # same context stack as before, so their tokens are still
+                # up to date.
+                self.valid = len(self.lines)
+            else:
+                self.stacks[self.valid] = stack
+
+        # The line at which lexing stopped now has a context stack its tokens
+        # do not reflect.
+        if self.valid < len(self.lines):
+            self.changed = max(self.changed, self.valid)
+
+    def token_at(self, point):
+        """Given a point, return the (begin, end, scope) tuple of the token that
+        contains the point, or None if there is no such token."""
+        index = self.line_index(point)
+        self.lex(index)
+        offset = self.offsets[index]
+        tokens = self.tokens[index]
+        n = bisect_right(tokens, (point - offset, float("inf"))) - 1
+
+        if n != -1 and point - offset < tokens[n][1]:
+            begin, end, scope = tokens[n]
+            return begin + offset, end + offset, scope
+
+    def scope_at(self, point):
+        if token := self.token_at(point):
+            return token[2]
+        elif point >= self.size():
+            # Like Sublime Text, extend the last token to the end of the
+            # buffer.
+            if point > 0 and (token := self.token_at(self.size() - 1)):
+                return token[2]
+
+            self.lex(len(self.lines) - 1)
+            return self.lexer.scope(self.end_stack)
+        else:
+            # token_at has brought the line up to date.
+            return self.lexer.scope(self.stacks[self.line_index(point)])
+
+    def iter_tokens(self, begin=0, end=None):
+        """Yield the (begin, end, scope) tuples of the tokens that intersect the
+        region between two points."""
+        end = self.size() if end is None else end
+
+        for index in range(self.line_index(begin), len(self.lines)):
+            offset = self.offsets[index]
+
+            if offset > end or (offset == end and end != begin):
+                break
+
+            self.lex(index)
+
+            for token_begin, token_end, scope in self.tokens[index]:
+                token_begin += offset
+                token_end += offset
+
+                if token_end > begin and (token_begin < end or token_begin == begin):
+                    yield token_begin, token_end, scope
+
+    def iter_tokens_backward(self, point):
+        """Yield the (begin, end, scope) tuples of the tokens that end at or
+        before the point, from right to left."""
+        self.lex(self.line_index(point))
+
+        for index in range(self.line_index(point), -1, -1):
+            offset = self.offsets[index]
+
+            for token_begin, token_end, scope in reversed(self.tokens[index]):
+                if token_end + offset <= point:
+                    yield token_begin + offset, token_end + offset, scope
@@ -0,0 +1,312 @@
+"""Bulk cleanup of Clojure source: commas, trailing whitespace, redundant
+blank lines, and discarded forms.
+
+Reads the source once, with the token pattern of the reader module, and
+collects every change as a (begin, end, string) tuple. Only reads the forms
+of the source if it must remove discarded forms."""
+
+import re
+
+from sublime import Region
+
+from . import reader
+
+COMMAS = "commas"
+TRAILING_WHITESPACE = "trailing_whitespace"
+BLANK_LINES = "blank_lines"
+DISCARDS = "discards"
+
+# Removing discarded forms removes code, so it only happens on request.
+DEFAULT_KINDS = (COMMAS, TRAILING_WHITESPACE, BLANK_LINES)
+
+SPACES = " \t"
+
+COMMA_PATTERN = re.compile(",+")
+
+
+def whitespace_edits(text, begin, end, kinds):
+    """Given a string of Clojure source, the beginning and the end of a run
+    of whitespace in the source, and the kinds of cleanup to do, return the
+    edits that clean up the whitespace.
+
+    Commas are whitespace in Clojure, so if the cleanup removes commas, the
+    run includes the commas in it.
+
+    Keeps at most one blank line between two lines, and none at the end of
+    the source."""
+    edits = []
+    newlines = []
+    point = text.find("\n", begin, end)
+
+    while point != -1:
+        newlines.append(point)
+        point = text.find("\n", point + 1, end)
+
+    if not newlines:
+        return comma_edits(text, begin, end, edits) if COMMAS in kinds else edits
+
+    # The newlines whose lines the edits remove as a whole.
+    removed = range(0)
+
+    if BLANK_LINES in kinds:
+        if end == len(text):
+            removed = range(1, len(newlines))
+
+            if newlines[0] + 1 < end:
+                edits.append((newlines[0] + 1, end, ""))
+        elif len(newlines) > 2:
+            removed = range(1, len(newlines) - 1)
+            edits.append((newlines[0] + 1, newlines[-2] + 1, ""))
+
+    if TRAILING_WHITESPACE in kinds:
+        for n, newline in enumerate(newlines):
+            if n in removed:
+                continue
+
+            line_begin = begin if n == 0 else newlines[n - 1] + 1
+
+            if line_begin < newline:
+                edits.append((line_begin, newline, ""))
+
+    if COMMAS in kinds:
+        edits.extend(comma_edits(text, begin, end, edits))
+        edits.sort()
+
+    return edits
+
+
+def comma_edits(text, begin, end, edits):
+    """Given a string of Clojure source, the beginning and the end of a run
+    of whitespace in the source, and the edits that clean up the whitespace
+    in the run, return the edits that remove the rest of the commas in the
+    run.
+
+    Replaces the commas with a space if there's nothing else between the
+    forms around them."""
+    if text[begin:end].strip(",") == "":
+        before = text[begin - 1] if begin > 0 else " "
+        after = text[end] if end < len(text) else " "
+
+        if not (
+            before.isspace() or after.isspace() or before in "([{" or after in ")]}"
+        ):
+            return [(begin, end, " ")]
+
+    return [
+        (match.start(), match.end(), "")
+        for match in COMMA_PATTERN.finditer(text, begin, end)
+        if not any(
+            edit[0] <= match.start() and match.end() <= edit[1] for edit in edits
+        )
+    ]
+
+
+def discard_edits(text):
+    """Given a string of Clojure source, return the edits that remove every
+    discarded form in the source, along with the discard macros and the
+    whitespace around them.
+
+    Removes the line of a discarded form if there's nothing else on it."""
+    edits = []
+    document = reader.Document(text)
+    stack = [document.forms]
+
+    while stack:
+        children = stack.pop()
+        n = 0
+
+        while n < len(children):
+            child = children[n]
+
+            if not child.discarded:
+                if child.children:
+                    stack.append(child.children)
+
+                n += 1
+                continue
+
+            # The reader marks every form a run of discard macros discards;
+            # remove them together, up to the next discard macro.
+            last = n
+
+            while (
+                last + 1 < len(children)
+                and children[last + 1].discarded
+                and not any(
+                    prefix.text == "#_" for prefix in children[last + 1].prefixes
+                )
+            ):
+                last += 1
+
+            edits.append(removal(text, child.begin, children[last].end))
+            n = last + 1
+
+    return edits
+
+
+def removal(text, begin, end):
+    """Given a string of Clojure source, and the beginning and the end of a
+    span of the source, return an edit that removes the span and the spaces
+    on one side of it."""
+    after = end
+
+    while after < len(text) and text[after] in SPACES:
+        after += 1
+
+    if after < len(text) and text[after] not in "\n)]}":
+        return (begin, after, "")
+
+    before = begin
+
+    while before > 0 and text[before - 1] in SPACES:
+        before -= 1
+
+    if (before == 0 or text[before - 1] == "\n") and after < len(text):
+        # Nothing else is on the line; remove the line.
+        return (before, after + 1, "") if text[after] == "\n" else (begin, end, "")
+
+    return (before, end, "")
+
+
+def edits(text, kinds=DEFAULT_KINDS):
+    """Given a string of Clojure source and the kinds of cleanup to do (see
+    DEFAULT_KINDS and DISCARDS), return a sorted list of non-overlapping
+    (begin, end, string) tuples, each of which replaces the text between
+    begin and end with the string to clean up the source."""
+    result = []
+    # The beginning and the end of the current run of whitespace.
+    run = None
+
+    for match in reader.TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+
+        if kind == reader.WHITESPACE or (kind == reader.COMMA and COMMAS in kinds):
+            run = (run[0] if run else match.start(), match.end())
+            continue
+        elif run:
+            result.extend(whitespace_edits(text, *run, kinds))
+            run = None
+
+        if kind == reader.COMMENT and TRAILING_WHITESPACE in kinds:
+            token = match.group()
+
+            if (length := len(token.rstrip())) < len(token):
+                result.append((match.start() + length, match.end(), ""))
+
+    if run:
+        result.extend(whitespace_edits(text, *run, kinds))
+
+    if DISCARDS in kinds:
+        result.extend(discard_edits(text))
+
+    # Drop the edits that overlap an edit that begins before them or spans
+    # more.
+    result.sort(key=lambda edit: (edit[0], -edit[1]))
+    changes = []
+
+    for edit in result:
+        if not changes or edit[0] >= changes[-1][1]:
+            changes.append(edit)
+
+    return changes
+
+
+def within(edits, regions):
+    """Given a sorted list of non-overlapping edits and a sorted list of
+    non-overlapping (begin, end) tuples, return the edits that lie inside
+    one of the regions.
+
+    Sweeps both lists once."""
+    result = []
+    n = 0
+
+    for edit in edits:
+        while n < len(regions) and regions[n][1] < edit[1]:
+            n += 1
+
+        if n == len(regions):
+            break
+        elif regions[n][0] <= edit[0]:
+            result.append(edit)
+
+    return result
+
+
+def batch(text, edits):
+    """Given a string and a sorted list of non-overlapping edits to the
+    string, return a list of (begin, end, string) tuples, one for each group
+    of edits on adjacent lines, that span the lines of the group and make
+    every edit in the group."""
+    batches = []
+    chunks = []
+    begin = end = point = None
+
+    for edit_begin, edit_end, string in edits:
+        line_begin = text.rfind("\n", 0, edit_begin) + 1
+
+        if end is not None and line_begin > end + 1:
+            chunks.append(text[point:end])
+            batches.append((begin, end, "".join(chunks)))
+            end = None
+
+        if end is None:
+            begin = point = line_begin
+            chunks = []
+
+        chunks.append(text[point:edit_begin])
+        chunks.append(string)
+        point = edit_end
+
+        if (end := text.find("\n", edit_end)) == -1:
+            end = len(text)
+
+    if end is not None:
+        chunks.append(text[point:end])
+        batches.append((begin, end, "".join(chunks)))
+
+    return batches
+
+
+def shift(point, edits):
+    """Given a point and a sorted list of edits, return the position of the
+    point after the edits."""
+    delta = 0
+
+    for begin, end, string in edits:
+        if end <= point:
+            delta += len(string) - (end - begin)
+        elif begin < point:
+            return begin + delta
+        else:
+            break
+
+    return point + delta
+
+
+def clean_up(view, edit, kinds=DEFAULT_KINDS):
+    """Clean up the View (see edits).
+
+    If the View has one empty selection, clean up the whole View. Otherwise,
+    clean up inside the selections only."""
+    text = view.substr(Region(0, view.size()))
+    changes = edits(text, kinds)
+    selections = view.sel()
+    whole = len(selections) == 1 and selections[0].empty()
+
+    if not whole:
+        changes = within(
+            changes, [(region.begin(), region.end()) for region in selections]
+        )
+
+    if not changes:
+        return
+
+    if whole:
+        point = shift(selections[0].begin(), changes)
+
+    for begin, end, string in reversed(batch(text, changes)):
+        view.replace(edit, Region(begin, end), string)
+
+    if whole:
+        selections.clear()
+        selections.add(Region(point, point))
@@ -116,10 +116,16 @@ def handler(completion_list, response, flags):
 
 
 def intuit_outermost(view, point):
+    """Given a View and a point, return the outermost S-expression around the
+    point to analyze for completions, or None if there is no balanced one,
+    like when the user is still typing it."""
     if view.match_selector(point, "meta.comment.clojure"):
-        return sexp.outermost(view, point, ignore={"comment"})
+        outermost = sexp.outermost(view, point, ignore={"comment"})
     else:
-        return sexp.crude_outermost(view, point)
+        outermost = sexp.outermost(view, point)
+
+    if outermost and outermost.close:
+        return outermost
 
 
 def get_completions(view, prefix, point):
@@ -1,5 +1,6 @@
 import json
 import os
+import re
 import textwrap
 import uuid
 from functools import partial
@@ -8,6 +9,7 @@ import sublime
 from sublime_plugin import (
     EventListener,
     ListInputHandler,
+    TextChangeListener,
     TextCommand,
     TextInputHandler,
     ViewEventListener,
@@ -17,6 +19,7 @@ from sublime_plugin import (
 from ..api import edn
 from . import (
     base64,
+    cleanup,
     clojuredocs,
     completions,
     dialects,
@@ -35,14 +38,14 @@ from . import (
     test,
 )
 from .log import start_logging, stop_logging
-from .repl import history, info, ports, query
+from .repl import history, info, ports, query, sink, spans, taps
 
 import Default.history_list as history_list
 
 
 def make_color_scheme(cache_dir):
     """
-    Add the tutkain.repl.stderr scope into the current color scheme.
+    Add the tutkain.repl.stderr and tutkain.repl.stdout scopes into the current color scheme.
 
     We want stderr messages in the same REPL output view as evaluation results, but we don't
     want them to use syntax highlighting. We therefore have to resort to this awful hack where
@@ -62,28 +65,37 @@ def make_color_scheme(cache_dir):
 
             scheme_path = os.path.join(cache_dir, f"{scheme_name}.sublime-color-scheme")
 
-            if not os.path.isfile(scheme_path):
-                with open(scheme_path, "w") as scheme_file:
-                    scheme_file.write(
-                        json.dumps(
-                            {
-                                "rules": [
-                                    {
-                                        "name": "Tutkain REPL Standard Error",
-                                        "scope": "tutkain.repl.stderr",
-                                        "background": "rgba(0, 0, 0, 0.01)",
-                                        "foreground": view.style().get(
-                                            "redish", "crimson"
-                                        ),
-                                    },
-                                ]
-                            }
-                        )
-                    )
+            scheme = json.dumps(
+                {
+                    "rules": [
+                        {
+                            "name": "Tutkain REPL Standard Error",
+                            "scope": "tutkain.repl.stderr",
+                            "background": "rgba(0, 0, 0, 0.01)",
+                            "foreground": view.style().get("redish", "crimson"),
+                        },
+                        {
+                            "name": "Tutkain REPL Standard Output",
+                            "scope": "tutkain.repl.stdout",
+                            "background": "rgba(0, 0, 0, 0.01)",
+                            "foreground": view.style().get("foreground", "black"),
+                        },
+                    ]
+                }
+            )
+
+            if os.path.isfile(scheme_path):
+                with open(scheme_path) as scheme_file:
+                    if scheme_file.read() == scheme:
+                        return
+
+            with open(scheme_path, "w") as scheme_file:
+                scheme_file.write(scheme)
 
 
 def plugin_loaded():
     start_logging(settings.load().get("debug", False))
+    sink.prune_logs(settings.load().get("output_sink", {}).get("keep_logs", 10))
     preferences = sublime.load_settings("Preferences.sublime-settings")
     cache_dir = os.path.join(sublime.cache_path(), "Tutkain")
     make_color_scheme(cache_dir)
@@ -161,6 +173,9 @@ class TutkainClearOutputViewCommand(WindowCommand):
             view.set_read_only(True)
             inline.clear(self.window.active_view())
             state.reset_gutter_markers(view)
+            spans.reset(view)
+            taps.reset(view)
+            view.erase_phantoms("tutkain/output_log")
 
     def run(self, views=["tap", "repl"]):
         for view_name in views:
@@ -864,13 +879,31 @@ class TutkainConnectCommand(WindowCommand):
             )
 
     def connect(
-        self, dialect, host, port, view, output, backchannel, build_id, init, mode
+        self,
+        dialect,
+        host,
+        port,
+        view,
+        output,
+        backchannel,
+        build_id,
+        init,
+        mode,
+        output_sink,
     ):
         backchannel_options = repl.backchannel_options(
             self.window.project_data(), dialect, backchannel
         )
 
         tap_panel = settings.load().get("tap_panel", False)
+        tap_buffer_size = settings.load().get("tap_buffer_size", 1000)
+        tap_rate_limit = settings.load().get("tap_rate_limit", 20)
+        server_timing = settings.load().get("server_timing", False)
+        output_scopes = settings.load().get("output_scopes", "sentinel")
+        output_sink = {
+            **settings.load().get("output_sink", {}),
+            **(output_sink or {}),
+        }
 
         if dialect == edn.Keyword("cljs"):
             client = repl.JSClient(
@@ -882,6 +915,11 @@ class TutkainConnectCommand(WindowCommand):
                         view, ids, on_done
                     ),
                     "add_tap": tap_panel,
+                    "tap_buffer_size": tap_buffer_size,
+                    "tap_rate_limit": tap_rate_limit,
+                    "server_timing": server_timing,
+                    "output_scopes": output_scopes,
+                    "output_sink": output_sink,
                 },
             )
 
@@ -896,6 +934,11 @@ class TutkainConnectCommand(WindowCommand):
                     "init": init,
                     "backchannel": backchannel_options,
                     "add_tap": tap_panel,
+                    "tap_buffer_size": tap_buffer_size,
+                    "tap_rate_limit": tap_rate_limit,
+                    "server_timing": server_timing,
+                    "output_scopes": output_scopes,
+                    "output_sink": output_sink,
                 },
             )
 
@@ -910,6 +953,11 @@ class TutkainConnectCommand(WindowCommand):
                     "init": init,
                     "backchannel": backchannel_options,
                     "add_tap": tap_panel,
+                    "tap_buffer_size": tap_buffer_size,
+                    "tap_rate_limit": tap_rate_limit,
+                    "server_timing": server_timing,
+                    "output_scopes": output_scopes,
+                    "output_sink": output_sink,
                 },
             )
 
@@ -927,6 +975,7 @@ class TutkainConnectCommand(WindowCommand):
         build_id=None,
         init=None,
         mode=None,
+        output_sink=None,
     ):
         mode = mode or settings.load().get("default_connection_mode")
         active_view = self.window.active_view()
@@ -945,6 +994,7 @@ class TutkainConnectCommand(WindowCommand):
                     edn.Keyword(build_id) if build_id else None,
                     init,
                     mode,
+                    output_sink,
                 )
             except ConnectionRefusedError:
                 output_view.close()
@@ -1145,6 +1195,30 @@ def symbol_at_point(view, point):
         return selectors.expand_by_selector(view, point, "meta.symbol")
 
 
+class TutkainDelimiterIndexListener(TextChangeListener):
+    """Keep the delimiter index of Clojure buffers up to date as they change,
+    instead of rebuilding it from scratch after every change."""
+
+    @classmethod
+    def is_applicable(cls, buffer):
+        return (view := buffer.primary_view()) is not None and view.match_selector(
+            0, "source.clojure | source.edn"
+        )
+
+    def on_text_changed(self, changes):
+        if view := self.buffer.primary_view():
+            sexp.update_delimiter_index(view, changes)
+
+    def on_reload(self):
+        if view := self.buffer.primary_view():
+            sexp.forget(view)
+            selectors.forget(view)
+            namespace.forget(view)
+
+    def on_revert(self):
+        self.on_reload()
+
+
 class TutkainEventListener(EventListener):
     def on_init(self, views):
         reconnect(views)
@@ -1182,6 +1256,10 @@ class TutkainEventListener(EventListener):
             lookup(view, form, lambda response: info.show_popup(view, point, response))
 
     def on_close(self, view):
+        sexp.forget(view)
+        selectors.forget(view)
+        namespace.forget(view)
+
         if view.settings().get("tutkain_repl_view_dialect"):
             window = sublime.active_window()
             num_groups = window.num_groups()
@@ -1203,11 +1281,39 @@ class TutkainEventListener(EventListener):
     def on_pre_close_project(self, window):
         repl.stop(window)
 
+    def on_pre_save(self, view):
+        if settings.load().get("format", {}).get("on_save") and view.match_selector(
+            0, "source.clojure | source.edn"
+        ):
+            view.run_command("tutkain_format_buffer")
+
     def on_post_text_command(self, view, command_name, _):
         if view.settings().has("tutkain_repl_client_id"):
             if command_name == "copy":
                 text = str(sublime.get_clipboard()).replace("\u2063", "")
                 sublime.set_clipboard(text)
+        elif (
+            command_name == "paste"
+            and settings.load().get("indent_on_paste")
+            and view.match_selector(0, "source.clojure | source.edn")
+        ):
+            view.run_command("tutkain_indent_pasted")
+
+
+class TutkainExpandTapCommand(ConnectedTextCommand):
+    """Replace the summary of the tapped value under each caret in the tap
+    panel with the full, pretty-printed value."""
+
+    def run(self, _):
+        for region in self.view.sel():
+            if tap := taps.find(self.view, region.begin()):
+                client_id, tap_id, _ = tap
+
+                if connection := state.get_connection_by_id(client_id):
+                    connection.client.send_op(
+                        taps.value_op(tap_id),
+                        partial(taps.expand, self.view, client_id, tap_id),
+                    )
 
 
 class TutkainGotoPointImplCommand(TextCommand):
@@ -1232,153 +1338,32 @@ class TutkainExpandSelectionImplCommand(TextCommand):
     def is_visible(self):
         return False
 
-    def run(self, _, region=None):
-        region = sublime.Region(region[0], region[1])
-        self.expand(region)
-
-    def expand(self, region):
-        if region == sublime.Region(0, self.view.size()):
-            pass
-        elif not region.empty() and self.view.match_selector(
-            region.end(), "-meta.sexp"
-        ):
-            self.view.sel().add(sublime.Region(0, self.view.size()))
-        elif (
-            region.empty()
-            and self.view.match_selector(
-                region.begin(), "meta.tagged-element.element meta.tagged-element.tag"
-            )
-            and (element := forms.find_next(self.view, region.begin()))
-        ):
-            tag = selectors.expand_by_selector(
-                self.view, region.begin(), "meta.tagged-element.tag"
-            )
-            self.view.sel().add(sublime.Region(tag.begin(), element.end() - 1))
-        elif (
-            region.empty()
-            and self.view.match_selector(region.begin(), "meta.tagged-element.element")
-            and (form := forms.find_adjacent(self.view, region.begin()))
-        ):
-            self.view.sel().add(form)
-        elif (
-            region.empty()
-            and self.view.match_selector(region.begin(), "meta.tagged-element.tag")
-            and (form := forms.find_adjacent(self.view, region.begin()))
-        ):
-            self.view.sel().add(form)
-        elif region.empty() and (
-            form := forms.find_adjacent(self.view, region.begin())
-        ):
-            self.view.sel().add(form)
-        elif region.empty() and not forms.find_adjacent(self.view, region.begin()):
-            self.view.run_command("expand_selection", {"to": "brackets"})
-        elif (
-            not region.empty()
-            and self.view.match_selector(region.begin(), "meta.mapping.key")
-        ) and (
-            not region.empty()
-            and self.view.match_selector(region.end() - 1, "meta.mapping.value")
-        ):
-            self.view.run_command("expand_selection", {"to": "brackets"})
-        elif (
-            not region.empty()
-            and self.view.match_selector(region.begin(), "meta.mapping.key")
-            and self.view.match_selector(region.end() - 1, "meta.mapping.key")
-            and not self.view.match_selector(
-                region.begin(), "meta.mapping.key meta.sexp"
-            )
-            and not self.view.match_selector(region.begin(), sexp.BEGIN_SELECTORS)
-            and not self.view.match_selector(region.end() - 1, sexp.END_SELECTORS)
-        ):
-            value_begin = selectors.find(
-                self.view,
-                region.end(),
-                "meta.mapping.value",
-                forward=True,
-                stop_at=sexp.END_SELECTORS,
-            )
-
-            if not value_begin and (
-                innermost := sexp.innermost(self.view, region.begin())
-            ):
-                self.view.sel().add(innermost.extent())
-            elif self.view.match_selector(
-                value_begin, "meta.reader-form | keyword.operator.macro"
-            ):
-                form = forms.find_next(self.view, value_begin)
-                self.view.sel().add(sublime.Region(region.begin(), form.end()))
-            elif self.view.match_selector(value_begin, "meta.mapping.value meta.sexp"):
-                end = sexp.innermost(self.view, value_begin).close.region.end()
-                self.view.sel().add(sublime.Region(region.begin(), end))
-        elif (
-            not region.empty()
-            and self.view.match_selector(region.begin(), sexp.BEGIN_SELECTORS)
-            and self.view.match_selector(region.end() - 1, sexp.END_SELECTORS)
-        ):
-            self.view.run_command("expand_selection", {"to": "brackets"})
-
-            for region in self.view.sel():
-                if begin := selectors.find(
-                    self.view,
-                    region.begin(),
-                    f"- ({sexp.ABSORB_SELECTOR})",
-                    forward=False,
-                    stop_at=sexp.BEGIN_SELECTORS,
-                ):
-                    self.view.sel().add(sublime.Region(begin + 1, region.end()))
-        elif (
-            not region.empty()
-            and self.view.match_selector(region.begin() - 1, sexp.BEGIN_SELECTORS)
-            and self.view.match_selector(region.end(), sexp.END_SELECTORS)
-        ):
-            innermost = sexp.innermost(self.view, region.begin(), edge=False)
-            self.view.sel().add(innermost.extent())
-        elif (
-            not region.empty()
-            and not self.view.match_selector(region.begin(), sexp.BEGIN_SELECTORS)
-            and not self.view.match_selector(region.end() - 1, sexp.END_SELECTORS)
-        ):
-            if innermost := sexp.innermost(self.view, region.begin(), edge=False):
-                if innermost.open and innermost.close:
-                    self.view.sel().add(
-                        sublime.Region(
-                            innermost.open.region.end(), innermost.close.region.begin()
-                        )
-                    )
-        elif (
-            self.view.match_selector(region.begin(), "meta.tagged-element")
-            and self.view.match_selector(region.end() - 1, "meta.tagged-element")
-            and not self.view.match_selector(region.begin() - 1, "meta.tagged-element")
-            and not self.view.match_selector(region.end(), "meta.tagged-element")
-        ):
-            if innermost := sexp.innermost(self.view, region.begin(), edge=False):
-                if innermost.open and innermost.close:
-                    self.view.sel().add(
-                        sublime.Region(
-                            innermost.open.region.end(), innermost.close.region.begin()
-                        )
-                    )
-        elif innermost := sexp.innermost(self.view, region.begin(), edge=False):
-            self.view.sel().add(innermost.extent())
-        else:
-            self.view.run_command("expand_selection", {"to": "brackets"})
+    def run(self, _, regions=None):
+        with selectors.pinned(self.view):
+            for begin, end in regions:
+                paredit.expand_selection(self.view, sublime.Region(begin, end))
 
 
 class TutkainExpandSelectionCommand(TextCommand):
     def run(self, _):
         view = self.view
 
+        regions = []
+
         for region in view.sel():
             if selectors.ignore(view, region.begin()):
                 view.run_command("expand_selection", {"to": "scope"})
             else:
-                sublime.set_timeout(
-                    lambda: view.run_command(
-                        "tutkain_expand_selection_impl",
-                        {"region": region.to_tuple()},
-                    ),
-                    0,
-                )
+                regions.append(region.to_tuple())
+
+        # Expand every selection in the same tick.
+        if regions:
+            sublime.set_timeout(
+                lambda: view.run_command(
+                    "tutkain_expand_selection_impl", {"regions": regions}
+                ),
+                0,
+            )
 
 
 class TutkainInterruptEvaluationCommand(ConnectedWindowCommand):
@@ -1417,6 +1402,51 @@ class TutkainIndentSexpCommand(TextCommand):
                 indent.indent_region(self.view, edit, target, prune=prune)
 
 
+class TutkainIndentPastedCommand(TextCommand):
+    def run(self, edit):
+        indent.indent_pasted(self.view, edit, sublime.get_clipboard())
+
+
+class TutkainFormatBufferCommand(TextCommand):
+    def format_in_background(self, text, change_count, options):
+        edits = indent.format_edits(text, options)
+
+        sublime.set_timeout(
+            lambda: self.view.run_command(
+                "tutkain_apply_edits", {"edits": edits, "change_count": change_count}
+            )
+        )
+
+    def run(self, edit, background=False):
+        options = settings.load().get("format", {})
+
+        if background:
+            # Format a snapshot of the view on the worker thread so that
+            # formatting a large view doesn't block the UI thread.
+            text = self.view.substr(sublime.Region(0, self.view.size()))
+            change_count = self.view.change_count()
+
+            sublime.set_timeout_async(
+                lambda: self.format_in_background(text, change_count, options)
+            )
+        else:
+            indent.format_view(self.view, edit, options)
+
+
+class TutkainApplyEditsCommand(TextCommand):
+    """Apply a list of [begin, end, string] edits computed from the view as it
+    was at the given change count, unless the view has changed since."""
+
+    def is_visible(self):
+        return False
+
+    def run(self, edit, edits, change_count):
+        if self.view.change_count() == change_count:
+            indent.apply_edits(self.view, edit, edits)
+        elif window := self.view.window():
+            window.status_message("⚠ The view changed while formatting; try again.")
+
+
 class TutkainPareditForwardCommand(TextCommand):
     def run(self, _, extend=False):
         paredit.move(self.view, True, extend)
@@ -1557,14 +1587,58 @@ class TutkainPareditForwardMoveFormCommand(TextCommand):
         paredit.forward_move_form(self.view, edit)
 
 
+class TutkainPareditMoveFormToCommand(TextCommand):
+    def run(self, edit, index):
+        paredit.move_form_to(self.view, edit, int(index))
+
+    def input(self, args):
+        if "index" in args:
+            return None
+        else:
+            return IndexInputHandler()
+
+
+class IndexInputHandler(TextInputHandler):
+    def name(self):
+        return "index"
+
+    def placeholder(self):
+        return "Index (a negative index counts from the end)"
+
+    def validate(self, text):
+        return re.fullmatch(r"-?\d+", text) is not None
+
+
+class TutkainPareditSortCollectionCommand(TextCommand):
+    def run(self, edit):
+        paredit.sort_collection(self.view, edit)
+
+
+class TutkainPareditDedupeCollectionCommand(TextCommand):
+    def run(self, edit):
+        paredit.dedupe_collection(self.view, edit)
+
+
+class TutkainPareditAlignCollectionCommand(TextCommand):
+    def run(self, edit):
+        paredit.align_collection(self.view, edit)
+
+
+class TutkainPareditConvertPairsCommand(TextCommand):
+    def run(self, edit):
+        paredit.convert_pairs(self.view, edit)
+
+
 class TutkainPareditThreadFirstCommand(TextCommand):
-    def run(self, edit, join_on=" "):
-        paredit.thread_first(self.view, edit, join_on=join_on)
+    def run(self, edit, join_on=" ", arrow="->"):
+        assert arrow in paredit.THREAD_FIRST_MACROS
+        paredit.thread_first(self.view, edit, join_on=join_on, arrow=arrow)
 
 
 class TutkainPareditThreadLastCommand(TextCommand):
-    def run(self, edit, join_on=" "):
-        paredit.thread_last(self.view, edit, join_on=join_on)
+    def run(self, edit, join_on=" ", arrow="->>"):
+        assert arrow in paredit.THREAD_LAST_MACROS
+        paredit.thread_last(self.view, edit, join_on=join_on, arrow=arrow)
 
 
 class TutkainPareditUnthreadCommand(TextCommand):
@@ -2060,20 +2134,144 @@ class TutkainShowClojuredocsExamplesCommand(ConnectedTextCommand):
         clojuredocs.show_examples(self.view)
 
 
-class TutkainZapCommasCommand(TextCommand):
-    def find_commas(self):
-        return reversed(self.view.find_by_selector("comment.punctuation.comma"))
+def active_output_log_path(window):
+    view = window.active_view()
+    dialect = (view and dialects.for_view(view)) or edn.Keyword("clj")
 
-    def run(self, edit):
-        if len(self.view.sel()) == 1 and self.view.sel()[0].empty():
-            for comma in self.find_commas():
-                self.view.erase(edit, comma)
+    if connection := state.get_active_connection(window, dialect):
+        return sink.log_path(connection.client.id)
+
+
+class TutkainOpenOutputLogCommand(WindowCommand):
+    def run(self, path=None, line=None):
+        path = path or active_output_log_path(self.window)
+
+        if path and os.path.isfile(path):
+            if line:
+                self.window.open_file(f"{path}:{line}", flags=sublime.ENCODED_POSITION)
+            else:
+                self.window.open_file(path)
         else:
-            for sel in self.view.sel():
-                for comma in filter(
-                    lambda comma: sel.contains(comma), self.find_commas()
-                ):
-                    self.view.erase(edit, comma)
+            self.window.status_message("⚠ No output log.")
+
+
+class TutkainSearchOutputLogCommand(WindowCommand):
+    def goto(self, path, results, index):
+        if index != -1:
+            self.window.run_command(
+                "tutkain_open_output_log", {"path": path, "line": results[index][0]}
+            )
+
+    def search(self, path, pattern):
+        try:
+            results = sink.search(path, pattern)
+        except re.error as error:
+            self.window.status_message(f"⚠ Invalid regular expression: {error}")
+            return
+
+        if results:
+            items = [
+                sublime.QuickPanelItem(line.strip(), annotation=f"line {line_number}")
+                for line_number, line in results
+            ]
+
+            self.window.show_quick_panel(
+                items,
+                lambda index: self.goto(path, results, index),
+                placeholder="Choose a line to open",
+            )
+        else:
+            self.window.status_message("No matches in output log.")
+
+    def run(self, path=None, pattern=None):
+        path = path or active_output_log_path(self.window)
+
+        if not path or not os.path.isfile(path):
+            self.window.status_message("⚠ No output log.")
+        elif pattern:
+            sublime.set_timeout_async(lambda: self.search(path, pattern), 0)
+        else:
+            panel = self.window.show_input_panel(
+                "Search output log",
+                "",
+                lambda pattern: sublime.set_timeout_async(
+                    lambda: self.search(path, pattern), 0
+                ),
+                lambda _: None,
+                lambda: None,
+            )
+
+            panel.assign_syntax("Packages/Regular Expressions/RegExp.sublime-syntax")
+
+
+def active_client(window):
+    view = window.active_view()
+    dialect = (view and dialects.for_view(view)) or edn.Keyword("clj")
+
+    if connection := state.get_active_connection(window, dialect):
+        return connection.client
+
+
+def format_ms(ms):
+    return "–" if ms is None else f"{ms:.1f} ms"
+
+
+class TutkainShowMetricsCommand(ConnectedWindowCommand):
+    def run(self):
+        if not (client := active_client(self.window)):
+            return
+
+        if not (snapshot := client.metrics.snapshot()):
+            self.window.status_message("No metrics yet.")
+            return
+
+        items = [
+            sublime.QuickPanelItem(
+                op,
+                details=[
+                    " · ".join(
+                        f"{p} {format_ms(stats['total_ms'][p])}"
+                        for p in ("p50", "p95", "p99")
+                    ),
+                    f"queue wait p95 {format_ms(stats['queue_wait_ms']['p95'])} · handler p95 {format_ms(stats['handler_ms']['p95'])}",
+                    f"server p95 {format_ms(stats['server_handle_ms']['p95'])} · print p95 {format_ms(stats['server_print_ms']['p95'])} · network p95 {format_ms(stats['network_ms']['p95'])}",
+                ],
+                annotation=f"{stats['count']} × · ↑ {stats['bytes_sent']} B · ↓ {stats['bytes_received']} B",
+            )
+            for op, stats in snapshot.items()
+        ]
+
+        self.window.show_quick_panel(items, lambda _: None, placeholder="Op metrics")
+
+
+class TutkainExportMetricsCommand(ConnectedWindowCommand):
+    def run(self, path=None):
+        if not (client := active_client(self.window)):
+            return
+
+        content = json.dumps(client.metrics.snapshot(), indent=2)
+
+        if path:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(content)
+
+            self.window.status_message(f"Wrote metrics into {path}.")
+        else:
+            view = self.window.new_file()
+            view.set_scratch(True)
+            view.set_name(f"*metrics* ({client.name})")
+            view.assign_syntax("Packages/JSON/JSON.sublime-syntax")
+            view.run_command("append", {"characters": content})
+
+
+class TutkainZapCommasCommand(TextCommand):
+    def run(self, edit):
+        cleanup.clean_up(self.view, edit, kinds=[cleanup.COMMAS])
+
+
+class TutkainCleanUpCommand(TextCommand):
+    def run(self, edit, kinds=cleanup.DEFAULT_KINDS):
+        cleanup.clean_up(self.view, edit, kinds=kinds)
 
 
 class TutkainMarkFormCommand(TextCommand):
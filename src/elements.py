@@ -0,0 +1,438 @@
+"""Operations on the elements of a collection in Clojure source.
+
+An element is a child form of a collection, or, in a map or a binding vector,
+a key-value pair of child forms. The functions here take the text that the
+reader module read a collection Form from and the Elements of the Form, and
+return a Rewrite of the text of the collection, so that the caller can change
+the collection in one edit.
+
+Does not depend on the Sublime Text API."""
+
+import re
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import List, Optional
+
+from . import reader
+
+# The forms whose first argument is a vector of bindings.
+BINDING_FORMS = {
+    "binding",
+    "doseq",
+    "dotimes",
+    "for",
+    "if-let",
+    "if-some",
+    "let",
+    "loop",
+    "when-first",
+    "when-let",
+    "when-some",
+    "with-local-vars",
+    "with-open",
+    "with-redefs",
+}
+
+
+@dataclass(eq=False)
+class Element:
+    """An element of a collection: one child form, or a key-value pair of
+    child forms.
+
+    `begin` and `end` span the forms of the element, including anything
+    between the key and the value of a pair."""
+
+    begin: int
+    end: int
+    forms: List[reader.Form]
+
+
+@dataclass(eq=False)
+class Rewrite:
+    """A change to the text of a collection: replace the text between `begin`
+    and `end` with `string`.
+
+    `begins` has one item for each Element of the collection: the position of
+    the Element after the change, or None if the change removes the
+    Element."""
+
+    begin: int
+    end: int
+    string: str
+    begins: List[Optional[int]]
+
+
+def children(collection):
+    """Given a collection Form, return a list of (begin, Form) tuples, one for
+    each child form of the collection that isn't discarded or metadata.
+
+    `begin` is where the metadata of the child form begins, if it has any."""
+    result = []
+    begin = None
+
+    for child in collection.children:
+        if child.discarded:
+            continue
+        elif child.prefixes and child.prefixes[-1].text in reader.METADATA_PREFIXES:
+            begin = child.begin if begin is None else begin
+        else:
+            result.append((child.begin if begin is None else begin, child))
+            begin = None
+
+    return result
+
+
+def is_pairwise(text, collection):
+    """Given the text a collection Form was read from and the Form, return
+    True if the children of the collection are key-value pairs."""
+    if collection.kind == reader.MAP:
+        return True
+    elif collection.kind == reader.VECTOR and (parent := collection.parent):
+        forms = [form for _, form in children(parent)]
+
+        return (
+            parent.kind == reader.LIST
+            and len(forms) > 1
+            and forms[1] is collection
+            and text[forms[0].begin : forms[0].end].rsplit("/", 1)[-1] in BINDING_FORMS
+        )
+
+    return False
+
+
+def elements(text, collection):
+    """Given the text a collection Form was read from and the Form, return
+    the Elements of the collection, in order.
+
+    Discarded forms don't belong to any element; they stay between the
+    elements around them. Metadata belongs to the element of the form it's
+    on."""
+    forms = children(collection)
+
+    if is_pairwise(text, collection):
+        return [
+            Element(pair[0][0], pair[-1][1].end, [form for _, form in pair])
+            for pair in (forms[n : n + 2] for n in range(0, len(forms), 2))
+        ]
+    else:
+        return [Element(begin, form.end, [form]) for begin, form in forms]
+
+
+def element_at(elements, point):
+    """Given a list of Elements and a point, return the index of the Element
+    that contains the point, or, if no Element contains it, the index of the
+    first Element after the point. Return None if there is no such Element."""
+    for index, element in enumerate(elements):
+        if point <= element.end:
+            return index
+
+
+def moved(count, index, target):
+    """Given a number of Elements, the index of an Element, and the index to
+    move the Element to, return the indices of the Elements in their new
+    order.
+
+    A negative target counts from the end, like a negative index in Python.
+    A target beyond either end moves the Element to that end."""
+    if target < 0:
+        target += count
+
+    order = list(range(count))
+    order.insert(max(0, min(target, count - 1)), order.pop(index))
+    return order
+
+
+# A number in an arbitrary radix, like 2r101 or 36rZZ.
+RADIX_PATTERN = re.compile(r"(\d{1,2})[rR]([0-9a-zA-Z]+)")
+
+
+def number_value(string):
+    """Given the text of a Clojure number, return the value of the number, or
+    None if the text isn't a valid number.
+
+    Reads decimal, hexadecimal (0x10), octal (010), and radix (2r10) integers,
+    ratios (1/2), and floating-point numbers, with or without the N and M
+    suffixes."""
+    sign = -1 if string[0] == "-" else 1
+    digits = string.lstrip("+-")
+
+    try:
+        if match := RADIX_PATTERN.fullmatch(digits):
+            return sign * int(match.group(2), int(match.group(1)))
+
+        digits = digits.rstrip("MN")
+
+        if digits[:2] in ("0x", "0X"):
+            return sign * int(digits[2:], 16)
+        elif "/" in digits:
+            return sign * Fraction(digits)
+        elif len(digits) > 1 and digits[0] == "0" and digits.isdigit():
+            return sign * int(digits, 8)
+        else:
+            return sign * float(digits)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def sort_key(text, element):
+    """Return the key to sort an Element by: the value or the text of its
+    first form. Numbers sort before everything else, by value (see
+    number_value)."""
+    form = element.forms[0]
+    string = text[form.begin : form.end]
+
+    if form.kind == reader.NUMBER and (value := number_value(string)) is not None:
+        return (0, value, string)
+
+    return (1, 0, string)
+
+
+def sorted_order(text, elements):
+    """Given the text some Elements were read from and the Elements, return
+    the indices of the Elements in sorted order (see sort_key).
+
+    The sort is stable."""
+    return sorted(range(len(elements)), key=lambda n: sort_key(text, elements[n]))
+
+
+def reorder(text, elements, order):
+    """Given the text some Elements were read from, the Elements, and a list
+    of the indices of the Elements in their new order, return a Rewrite that
+    reorders the Elements, or None if the order doesn't change.
+
+    Whatever is between two Elements (whitespace, commas, comments, and
+    discarded forms) stays where it is, so the text keeps its length and its
+    layout. The Rewrite spans the Elements between the first and the last one
+    that move only."""
+    if order == list(range(len(elements))):
+        return None
+
+    first = next(n for n, index in enumerate(order) if n != index)
+    last = next(n for n in reversed(range(len(order))) if n != order[n])
+    begins = [element.begin for element in elements]
+    chunks = []
+    point = elements[first].begin
+
+    for position in range(first, last + 1):
+        if position > first:
+            separator = text[elements[position - 1].end : elements[position].begin]
+            chunks.append(separator)
+            point += len(separator)
+
+        element = elements[order[position]]
+        begins[order[position]] = point
+        chunks.append(text[element.begin : element.end])
+        point += element.end - element.begin
+
+    return Rewrite(elements[first].begin, elements[last].end, "".join(chunks), begins)
+
+
+def separator_length(separator):
+    """Given the text between two Elements, return the length of the part of
+    the text to keep if the Element after it goes away: everything up to the
+    whitespace and commas at the end, and the newline that ends a comment."""
+    tokens = [
+        token
+        for token in reader.tokenize(separator)
+        if token.kind not in (reader.WHITESPACE, reader.COMMA)
+    ]
+
+    if not tokens:
+        return 0
+    elif tokens[-1].kind == reader.COMMENT:
+        return separator.find("\n", tokens[-1].end) + 1
+    else:
+        return tokens[-1].end
+
+
+def deduplicate(text, elements):
+    """Given the text some Elements were read from and the Elements, return a
+    Rewrite that removes every Element whose text is the same as that of an
+    Element before it, or None if there are no such Elements.
+
+    Removes the whitespace and commas before a removed Element along with the
+    Element, but keeps the comments and discarded forms around it."""
+    seen = set()
+    keep = []
+
+    for element in elements:
+        string = text[element.begin : element.end]
+        keep.append(string not in seen)
+        seen.add(string)
+
+    if all(keep):
+        return None
+
+    chunks = []
+    begins = []
+    point = elements[0].begin
+
+    for n, element in enumerate(elements):
+        if n > 0:
+            separator = text[elements[n - 1].end : element.begin]
+
+            if not keep[n]:
+                separator = separator[: separator_length(separator)]
+
+            chunks.append(separator)
+            point += len(separator)
+
+        if keep[n]:
+            begins.append(point)
+            chunks.append(text[element.begin : element.end])
+            point += element.end - element.begin
+        else:
+            begins.append(None)
+
+    return Rewrite(elements[0].begin, elements[-1].end, "".join(chunks), begins)
+
+
+# The whitespace between the key and the value of a pair.
+GAP_PATTERN = re.compile(r"[^\S\n]+")
+
+
+def align(text, elements):
+    """Given the text some Elements were read from and the Elements, return a
+    Rewrite that aligns the values of the key-value pairs that begin a line
+    into a column, or None if the values are already aligned.
+
+    The text must begin at the beginning of a line.
+
+    Leaves the pairs whose key and value aren't on the same line as they
+    are."""
+    # The key-value pairs to align, the whitespace between their keys and
+    # values, and the column of the end of their keys.
+    pairs = []
+
+    for n, element in enumerate(elements):
+        if len(element.forms) != 2 or (
+            n > 0 and "\n" not in text[elements[n - 1].end : element.begin]
+        ):
+            continue
+
+        key = element.forms[0]
+        gap = GAP_PATTERN.match(text, key.end)
+
+        if gap and text[gap.end()] not in ",;\n":
+            end = key.end - text.rfind("\n", 0, key.end) - 1
+            pairs.append((n, gap, end))
+
+    if len(pairs) < 2:
+        return None
+
+    width = max(end for _, _, end in pairs) + 1
+    gaps = {n: (gap, " " * (width - end)) for n, gap, end in pairs}
+    chunks = []
+    begins = []
+    point = elements[0].begin
+
+    for n, element in enumerate(elements):
+        if n:
+            separator = text[elements[n - 1].end : element.begin]
+            chunks.append(separator)
+            point += len(separator)
+
+        begins.append(point)
+
+        if n in gaps:
+            gap, spaces = gaps[n]
+            string = (
+                text[element.begin : gap.start()]
+                + spaces
+                + text[gap.end() : element.end]
+            )
+        else:
+            string = text[element.begin : element.end]
+
+        chunks.append(string)
+        point += len(string)
+
+    string = "".join(chunks)
+
+    if string == text[elements[0].begin : elements[-1].end]:
+        return None
+
+    return Rewrite(elements[0].begin, elements[-1].end, string, begins)
+
+
+def map_to_pairs(text, collection, elements):
+    """Given the text a map Form was read from, the Form, and its Elements,
+    return a Rewrite that turns the map into a vector of key-value vectors,
+    or None if the map is namespaced or has a key without a value."""
+    if any(prefix.text.startswith("#:") for prefix in collection.prefixes) or any(
+        len(element.forms) != 2 for element in elements
+    ):
+        return None
+
+    chunks = ["["]
+    begins = []
+    point = collection.open + 1
+    end = collection.open + 1
+
+    for element in elements:
+        separator = text[end : element.begin]
+        chunks.append(separator)
+        point += len(separator)
+        begins.append(point)
+        string = f"[{text[element.begin : element.end]}]"
+        chunks.append(string)
+        point += len(string)
+        end = element.end
+
+    chunks.append(text[end : collection.close])
+    chunks.append("]")
+    return Rewrite(collection.open, collection.close + 1, "".join(chunks), begins)
+
+
+def pairs_to_map(text, collection, elements):
+    """Given the text a vector Form was read from, the Form, and its
+    Elements, return a Rewrite that turns a vector of key-value vectors into
+    a map, or None if an Element isn't a vector of two forms."""
+    pairs = []
+
+    for element in elements:
+        form = element.forms[0]
+
+        if (
+            len(element.forms) != 1
+            or form.kind != reader.VECTOR
+            or form.prefixes
+            or form.close is None
+        ):
+            return None
+
+        form.children = reader.read_level(text, form.open + 1, form.close)
+
+        if len(forms := children(form)) != 2:
+            return None
+
+        pairs.append((forms[0][0], forms[1][1].end))
+
+    chunks = ["{"]
+    begins = []
+    point = collection.open + 1
+    end = collection.open + 1
+
+    for element, (key, value) in zip(elements, pairs):
+        separator = text[end : element.begin]
+        chunks.append(separator)
+        point += len(separator)
+        begins.append(point)
+        chunks.append(text[key:value])
+        point += value - key
+        end = element.end
+
+    chunks.append(text[end : collection.close])
+    chunks.append("}")
+    return Rewrite(collection.open, collection.close + 1, "".join(chunks), begins)
+
+
+def convert_pairs(text, collection, elements):
+    """Given the text a collection Form was read from, the Form, and its
+    Elements, return a Rewrite that turns a map into a vector of key-value
+    vectors or a vector of key-value vectors into a map, or None if the
+    collection is neither."""
+    if collection.kind == reader.MAP:
+        return map_to_pairs(text, collection, elements)
+    elif collection.kind == reader.VECTOR and not is_pairwise(text, collection):
+        return pairs_to_map(text, collection, elements)
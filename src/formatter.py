@@ -0,0 +1,338 @@
+"""A Clojure source formatter that follows the indentation rules of cljfmt.
+
+Formats the whitespace between tokens only: it never adds, removes, or
+changes any other token. It reads the source into tokens with the reader
+module, and walks the tokens once, keeping a stack of the collections that
+are open at each token.
+
+Does not depend on the Sublime Text API, so it works on any thread and outside
+Sublime Text."""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from . import reader
+
+BLOCK = "block"
+INNER = "inner"
+
+# The default indentation rules, by symbol, as in cljfmt's :indents.
+#
+# A rule is a list of [kind, depth] or [kind, depth, index] lists. A
+# [block, n] rule indents the arguments of a form by two spaces if the
+# argument at index n is the first argument on its line. An [inner, depth]
+# rule indents the forms depth levels inside the form by two spaces. An
+# [inner, depth, index] rule only applies to the argument at the given index
+# of the form.
+DEFAULT_INDENTS = {
+    "alt!": [[BLOCK, 0]],
+    "alt!!": [[BLOCK, 0]],
+    "are": [[BLOCK, 2]],
+    "as->": [[BLOCK, 2]],
+    "binding": [[BLOCK, 1]],
+    "bound-fn": [[INNER, 0]],
+    "case": [[BLOCK, 1]],
+    "catch": [[BLOCK, 2]],
+    "comment": [[BLOCK, 0]],
+    "cond": [[BLOCK, 0]],
+    "cond->": [[BLOCK, 1]],
+    "cond->>": [[BLOCK, 1]],
+    "condp": [[BLOCK, 2]],
+    "def": [[INNER, 0]],
+    "defmacro": [[INNER, 0]],
+    "defmethod": [[INNER, 0]],
+    "defmulti": [[INNER, 0]],
+    "defn": [[INNER, 0]],
+    "defn-": [[INNER, 0]],
+    "defonce": [[INNER, 0]],
+    "defprotocol": [[BLOCK, 1], [INNER, 1]],
+    "defrecord": [[BLOCK, 2], [INNER, 1]],
+    "defstruct": [[BLOCK, 1]],
+    "deftest": [[INNER, 0]],
+    "deftype": [[BLOCK, 2], [INNER, 1]],
+    "do": [[BLOCK, 0]],
+    "doseq": [[BLOCK, 1]],
+    "dotimes": [[BLOCK, 1]],
+    "doto": [[BLOCK, 1]],
+    "extend": [[BLOCK, 1]],
+    "extend-protocol": [[BLOCK, 1], [INNER, 1]],
+    "extend-type": [[BLOCK, 1], [INNER, 1]],
+    "fdef": [[INNER, 0]],
+    "finally": [[BLOCK, 0]],
+    "fn": [[INNER, 0]],
+    "for": [[BLOCK, 1]],
+    "future": [[BLOCK, 0]],
+    "go": [[BLOCK, 0]],
+    "go-loop": [[BLOCK, 1]],
+    "if": [[BLOCK, 1]],
+    "if-let": [[BLOCK, 1]],
+    "if-not": [[BLOCK, 1]],
+    "if-some": [[BLOCK, 1]],
+    "let": [[BLOCK, 1]],
+    "letfn": [[BLOCK, 1], [INNER, 2, 0]],
+    "locking": [[BLOCK, 1]],
+    "loop": [[BLOCK, 1]],
+    "match": [[BLOCK, 1]],
+    "ns": [[BLOCK, 1]],
+    "proxy": [[BLOCK, 2], [INNER, 1]],
+    "reify": [[INNER, 0], [INNER, 1]],
+    "struct-map": [[BLOCK, 1]],
+    "testing": [[BLOCK, 1]],
+    "thread": [[BLOCK, 0]],
+    "try": [[BLOCK, 0]],
+    "use-fixtures": [[INNER, 0]],
+    "when": [[BLOCK, 1]],
+    "when-first": [[BLOCK, 1]],
+    "when-let": [[BLOCK, 1]],
+    "when-not": [[BLOCK, 1]],
+    "when-some": [[BLOCK, 1]],
+    "while": [[BLOCK, 1]],
+    "with-local-vars": [[BLOCK, 1]],
+    "with-open": [[BLOCK, 1]],
+    "with-out-str": [[BLOCK, 0]],
+    "with-precision": [[BLOCK, 1]],
+    "with-redefs": [[BLOCK, 1]],
+}
+
+# The prefixes that make the collection they precede begin at the prefix
+# instead of the open delimiter, and the ones of those that make a list
+# indent like a vector.
+DISPATCH_PREFIXES = {"#", "#?", "#?@"}
+READER_CONDITIONAL_PREFIXES = {"#?", "#?@"}
+
+# The kinds of tokens that can span more than one line.
+MULTILINE_KINDS = {reader.STRING, reader.REGEX}
+
+INDENT_WIDTH = 2
+
+
+@dataclass(eq=False)
+class Frame:
+    """A collection that is open at a point in the source.
+
+    `margin` is the column where the collection begins in the formatted
+    source, and `column` the column after its open delimiter. `call` is True
+    if the collection is a list that indents like a function call.
+
+    `lines` has one item for each child form of the collection: True if the
+    child is the first form on its line, False otherwise."""
+
+    delimiter: str
+    margin: int
+    column: int
+    index: int
+    call: bool = False
+    head: Optional[str] = None
+    second: Optional[int] = None
+    lines: List[bool] = field(default_factory=list)
+    parent: Optional["Frame"] = None
+
+
+def rules_for(indents, symbol):
+    if symbol is None:
+        return ()
+    elif (rules := indents.get(symbol)) is not None:
+        return rules
+    elif "/" in symbol[1:]:
+        return indents.get(symbol.rsplit("/", 1)[1], ())
+    else:
+        return ()
+
+
+def indentation(frame, index, indents, max_depth):
+    """Given the innermost collection that is open at the beginning of a line,
+    the index of the child of the collection the line begins with, the
+    indentation rules, and the greatest depth of any rule, return the column
+    the line begins at."""
+    if frame.parent is None:
+        return 0
+    elif not frame.call:
+        return frame.column
+
+    for kind, depth, *_ in rules_for(indents, frame.head):
+        if kind == BLOCK and index > depth:
+            if index == depth + 1 or frame.lines[depth + 1]:
+                return frame.margin + INDENT_WIDTH
+        elif kind == INNER and depth == 0:
+            return frame.margin + INDENT_WIDTH
+
+    # An inner rule with a depth of n belongs to the collection n levels
+    # around the frame.
+    child = frame
+    ancestor = frame.parent
+
+    for depth in range(1, max_depth + 1):
+        if ancestor is None or ancestor.parent is None:
+            break
+
+        if ancestor.call:
+            for kind, rule_depth, *argument in rules_for(indents, ancestor.head):
+                if (
+                    kind == INNER
+                    and rule_depth == depth
+                    and (not argument or child.index == argument[0] + 1)
+                ):
+                    return frame.margin + INDENT_WIDTH
+
+        child = ancestor
+        ancestor = ancestor.parent
+
+    if index > 1 and frame.second is not None:
+        return frame.second
+    else:
+        return frame.column
+
+
+def format_edits(text, indents=DEFAULT_INDENTS, prune=True, blank_lines=1):
+    """Given a string of Clojure source, return a list of (begin, end, string)
+    tuples, in order, each of which replaces the whitespace between begin and
+    end in the source with the string to format the source.
+
+    Indents each line according to the indentation rules (see
+    DEFAULT_INDENTS), removes trailing whitespace, and keeps at most the
+    given number of consecutive blank lines. If prune is True, also collapses
+    the spaces between the forms on a line into one space, and removes the
+    spaces after an open delimiter and before a close delimiter.
+
+    Leaves the lines that begin inside a string as they are."""
+    edits = []
+    max_depth = max(
+        (rule[1] for rules in indents.values() for rule in rules), default=0
+    )
+    frame = Frame("", 0, 0, 0)
+    column = 0
+    # The whitespace before the current token, if any.
+    space = None
+    # The kind, the end, and the text of the previous token.
+    previous = None
+    previous_end = 0
+    previous_text = ""
+    # True if the child form the last prefix belongs to hasn't begun yet.
+    prefixed = False
+
+    # Walk the matches of the token pattern instead of reader.tokenize to
+    # avoid making a Token for every token.
+    for match in reader.TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+
+        if kind == reader.WHITESPACE:
+            space = match
+            continue
+
+        begin = match.start()
+        token = match.group()
+        newlines = space.group().count("\n") if space else 0
+
+        if (
+            prune
+            and previous is not None
+            and (previous == reader.OPEN or kind == reader.CLOSE)
+            and reader.COMMENT != previous
+            and reader.COMMENT != kind
+        ):
+            # Join the first and the last form of a collection to its
+            # delimiters.
+            newlines = 0
+
+        begins_line = newlines > 0 or previous is None
+
+        # The index of the child form the token belongs to, or the index of the
+        # next child form if the token doesn't belong to one.
+        index = len(frame.lines) - 1 if prefixed else len(frame.lines)
+
+        if begins_line:
+            width = indentation(frame, index, indents, max_depth)
+            string = "\n" * min(newlines, blank_lines + 1) + " " * width
+            column = width
+        elif space is None:
+            string = ""
+        elif prune and kind != reader.COMMENT:
+            if previous == reader.OPEN or kind == reader.CLOSE:
+                string = ""
+            else:
+                string = " "
+
+            column += len(string)
+        else:
+            string = space.group()
+            column += len(string)
+
+        if space is None:
+            if string:
+                edits.append((begin, begin, string))
+        elif string != space.group():
+            edits.append((space.start(), space.end(), string))
+
+        if kind == reader.COMMENT and (length := len(token.rstrip())) < len(token):
+            edits.append((begin + length, match.end(), ""))
+
+        if kind == reader.CLOSE:
+            if frame.parent is not None and reader.PAIRS[frame.delimiter] == token:
+                frame = frame.parent
+        elif kind not in reader.TRIVIA:
+            if not prefixed:
+                frame.lines.append(begins_line)
+
+                if len(frame.lines) == 2:
+                    frame.second = column
+                elif (
+                    len(frame.lines) == 1
+                    and frame.call
+                    and kind == "atom"
+                    and token[0] != ":"
+                    and not reader.NUMBER_PATTERN.match(token)
+                ):
+                    frame.head = token
+
+            prefixed = kind in reader.PREFIXES
+
+            if kind == reader.OPEN:
+                dispatch = previous_end == begin and previous_text in DISPATCH_PREFIXES
+
+                frame = Frame(
+                    token,
+                    column - len(previous_text) if dispatch else column,
+                    column + 1,
+                    len(frame.lines) - 1,
+                    call=token == "("
+                    and not (dispatch and previous_text in READER_CONDITIONAL_PREFIXES),
+                    parent=frame,
+                )
+
+        if kind in MULTILINE_KINDS and "\n" in token:
+            column = len(token) - token.rindex("\n") - 1
+        else:
+            column += len(token)
+
+        previous = kind
+        previous_end = match.end()
+        previous_text = token
+        space = None
+
+    if space is not None:
+        string = "\n" if "\n" in space.group() else ""
+
+        if string != space.group():
+            edits.append((space.start(), space.end(), string))
+
+    return edits
+
+
+def format_code(text, indents=DEFAULT_INDENTS, prune=True, blank_lines=1):
+    """Given a string of Clojure source, return the source formatted (see
+    format_edits)."""
+    chunks = []
+    end = 0
+
+    for begin, edit_end, string in format_edits(text, indents, prune, blank_lines):
+        chunks.append(text[end:begin])
+        chunks.append(string)
+        end = edit_end
+
+    chunks.append(text[end:])
+    return "".join(chunks)
+
+
+def indents(overrides=None):
+    """Return the default indentation rules, updated with the given rules."""
+    return {**DEFAULT_INDENTS, **(overrides or {})}
@@ -26,7 +26,7 @@ def find_adjacent(view, point):
     If there is a Clojure form both to the left and to the right of the point,
     return the one to the left. If there is no form adjacent to the point,
     return None."""
-    if view.match_selector(point, "comment.line"):
+    if selectors.match_selector(view, point, "comment.line"):
         return None
 
     direction = adjacent_direction(view, point)
@@ -44,38 +44,41 @@ def find_next(view, point):
     the point."""
     max_point = view.size()
 
-    if view.match_selector(point, "comment.line"):
+    if selectors.match_selector(view, point, "comment.line"):
         return view.word(view.find_by_class(point, True, CLASS_WORD_END))
     else:
         while point < max_point:
-            if view.match_selector(point, "meta.tagged-element.tag"):
+            if selectors.match_selector(view, point, "meta.tagged-element.tag"):
                 return selectors.expand_by_selector(view, point, "meta.tagged-element")
-            elif view.match_selector(
+            elif selectors.match_selector(
+                view,
                 point,
                 "punctuation.section.parens.end | punctuation.section.brackets.end | punctuation.section.braces.end",
             ):
                 return None
-            elif view.match_selector(point, selectors.SEXP_BEGIN):
+            elif selectors.match_selector(view, point, selectors.SEXP_BEGIN):
                 return sexp.innermost(view, point, edge="forward").extent()
             elif (
-                view.match_selector(point, "keyword.operator.macro")
+                selectors.match_selector(view, point, "keyword.operator.macro")
                 and view.substr(point) != "^"
-                and view.match_selector(point + 1, "punctuation.definition.keyword")
+                and selectors.match_selector(
+                    view, point + 1, "punctuation.definition.keyword"
+                )
             ):
                 begin = selectors.find(view, point, selectors.SEXP_BEGIN)
                 return sexp.innermost(view, begin).extent().cover(Region(point, point))
-            elif view.match_selector(point, "keyword.operator.macro"):
+            elif selectors.match_selector(view, point, "keyword.operator.macro"):
                 begin = selectors.find(
                     view, point, selectors.SEXP_BEGIN + " | meta.reader-form"
                 )
 
-                if view.match_selector(begin, selectors.SEXP_BEGIN):
+                if selectors.match_selector(view, begin, selectors.SEXP_BEGIN):
                     return sexp.innermost(view, begin).extent()
                 else:
                     dispatch = Region(point, point + 1)
                     form = selectors.expand_by_selector(view, begin, "meta.reader-form")
                     return form.cover(dispatch)
-            elif view.match_selector(point, "meta.reader-form"):
+            elif selectors.match_selector(view, point, "meta.reader-form"):
                 return selectors.expand_by_selector(
                     view, point, "meta.reader-form | keyword.operator.macro"
                 )
@@ -89,7 +92,7 @@ def absorb_macro_characters(view, region):
 
     A macro character is a character that matches the `keyword.operator.macro`
     scope."""
-    if view.match_selector(region.begin() - 1, "keyword.operator.macro"):
+    if selectors.match_selector(view, region.begin() - 1, "keyword.operator.macro"):
         keywords = selectors.expand_by_selector(
             view, region.begin() - 1, "keyword.operator.macro"
         )
@@ -101,24 +104,27 @@ def absorb_macro_characters(view, region):
 def find_previous(view, point):
     """Given a View and a point, return the previous Clojure form to the left
     of the point."""
-    if view.match_selector(point, "comment.line"):
+    if selectors.match_selector(view, point, "comment.line"):
         return view.word(view.find_by_class(point, False, CLASS_WORD_START))
     else:
         while point > 0:
-            if view.match_selector(
+            if selectors.match_selector(
+                view,
                 point - 1,
                 "punctuation.section.parens.begin | punctuation.section.brackets.begin | punctuation.section.braces.begin",
             ):
                 return None
-            elif view.match_selector(point - 1, selectors.SEXP_END):
+            elif selectors.match_selector(view, point - 1, selectors.SEXP_END):
                 innermost = sexp.innermost(view, point, edge="backward").extent()
                 return absorb_macro_characters(view, innermost)
-            elif view.match_selector(point - 1, "meta.reader-form"):
+            elif selectors.match_selector(view, point - 1, "meta.reader-form"):
                 form = selectors.expand_by_selector(view, point - 1, "meta.reader-form")
                 return absorb_macro_characters(view, form)
-            elif not view.match_selector(
-                point, "meta.tagged-element.element"
-            ) and view.match_selector(point - 1, "meta.tagged-element.element"):
+            elif not selectors.match_selector(
+                view, point, "meta.tagged-element.element"
+            ) and selectors.match_selector(
+                view, point - 1, "meta.tagged-element.element"
+            ):
                 return selectors.expand_by_selector(
                     view, point - 1, "meta.tagged-element"
                 )
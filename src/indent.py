@@ -1,16 +1,20 @@
 import re
 import textwrap
-from itertools import groupby
 
 from sublime import Region
 
-from . import selectors, sexp
+from . import formatter, selectors, sexp
 
 
-def determine_indentation(view, open_bracket):
+def determine_indentation(view, open_bracket, column=None):
+    """Given a View and an open bracket, return the indentation of the lines
+    inside the S-expression the bracket opens.
+
+    If column is given, it is the column the point after the open bracket
+    will be in once the line of the bracket is reindented."""
     end = open_bracket.region.end()
     line = view.line(end)
-    indentation = " " * (end - line.begin())
+    indentation = " " * (end - line.begin() if column is None else column)
     region = view.find(r"\S", open_bracket.region.end())
     point = region.begin()
 
@@ -82,36 +86,36 @@ def prune_string(string):
     )
 
 
-def fuse(lst):
-    ranges = []
-
-    # https://docs.python.org/2.6/library/itertools.html#examples
-    for prune, g in groupby(lst, lambda x: x[0]):
-        # Err...
-        group = list(g)
+def classify_region(view, region):
+    """Given a region, return a list of pairs where the first item of the pair indicates whether
+    the region in the other item should be pruned.
 
-        # Ehhh... sorry.
-        begin = group[0][1][0]
-        end = group[-1][1][1]
+    Walks the scoped tokens of the View in the region instead of the points, so that the
+    number of pairs depends on the number of strings and comments in the region, not the
+    number of characters."""
+    ranges = []
+    begin = region.begin()
+    end = region.end()
+    run_begin = begin
+    run_prune = None
 
-        ranges.append((prune, Region(begin, end)))
+    for token_begin, _, scope in selectors.tokens(view).forward(view, begin):
+        if token_begin >= end:
+            break
 
-    return ranges
+        prune = not selectors.matches(scope, "string | comment")
 
+        if prune != run_prune:
+            if run_prune is not None:
+                ranges.append((run_prune, Region(run_begin, token_begin)))
 
-def classify_region(view, region):
-    """Given a region, return a list of pairs where the first item of the pair indicates whether
-    the region in the other item should be pruned."""
-    points = []
-    point = region.begin()
-    end = region.end()
+            run_begin = max(token_begin, begin)
+            run_prune = prune
 
-    while point <= end:
-        prune = not view.match_selector(point, "string | comment")
-        points.append((prune, (point, min(point + 1, end))))
-        point += 1
+    if run_prune is not None:
+        ranges.append((run_prune, Region(run_begin, end)))
 
-    return fuse(points)
+    return ranges
 
 
 def prune_region(view, region):
@@ -141,26 +145,169 @@ def get_indented_string(view, open_bracket, region, prune=False):
 IGNORE_SELECTORS = "punctuation.definition.string | string | comment.line"
 
 
+def indent_lines(view, region, prune=False):
+    """Given a View and a Region, return a list of (Region, string) pairs, one
+    for each line in the region the indentation of which (or, if prune is
+    True, the whitespace of which) needs to change. The Region is the line, and
+    the string is the new content of the line.
+
+    Computes the new content of every line from the View as it is, in one
+    pass. Keeps the indentation of every open bracket the lines in the region
+    refer to, so that each is only determined once, taking into account the
+    new indentation of the line of the bracket."""
+    changes = []
+    # The open bracket of each line processed so far, by the point where the
+    # line begins.
+    line_brackets = {}
+    # The indentation of the lines inside each open bracket, by the point of
+    # the bracket.
+    indentations = {}
+
+    def indentation_of(line_begin):
+        open_bracket = line_brackets.get(line_begin)
+        return open_bracket and indentations[open_bracket.region.begin()]
+
+    def column(point):
+        # The column the given point will be in once the line is reindented.
+        line = view.line(point)
+
+        if line.begin() not in line_brackets or view.match_selector(
+            line.begin(), "string"
+        ):
+            return point - line.begin()
+
+        prefix = Region(line.begin(), point)
+        string = prune_region(view, prefix) if prune else view.substr(prefix)
+
+        if indentation := indentation_of(line.begin()):
+            return len(indentation + string.lstrip(" "))
+        else:
+            return len(string)
+
+    for line in view.lines(region):
+        open_bracket = sexp.find_open(view, line.begin())
+
+        if open_bracket and (key := open_bracket.region.begin()) not in indentations:
+            indentations[key] = determine_indentation(
+                view, open_bracket, column(open_bracket.region.end())
+            )
+
+        line_brackets[line.begin()] = open_bracket
+
+        if view.match_selector(line.begin(), "string"):
+            continue
+
+        string = prune_region(view, line) if prune else view.substr(line)
+
+        if open_bracket:
+            string = indentations[key] + string.lstrip(" ")
+
+        if string != view.substr(line):
+            changes.append((line, string))
+
+    return changes
+
+
 def indent_region(view, edit, region, prune=False):
     if region and not view.match_selector(region.begin(), IGNORE_SELECTORS):
-        new_lines = []
-
-        for line in view.lines(region):
-            replacee = line
-
-            if new_lines:
-                if previous := new_lines.pop():
-                    begin = previous.end()
-                    end = begin + line.size()
-                    replacee = Region(begin, end)
-
-            open_bracket = sexp.find_open(view, replacee.begin())
-            if replacer := get_indented_string(
-                view, open_bracket, replacee, prune=prune
-            ):
-                view.replace(edit, replacee, replacer)
-                new_lines.append(view.full_line(replacee.begin()))
-                restore_cursors(view)
+        changes = indent_lines(view, region, prune=prune)
+
+        # Replace the lines from last to first, so that replacing a line
+        # doesn't move the lines that remain to be replaced.
+        for line, string in reversed(changes):
+            view.replace(edit, line, string)
+
+        if changes:
+            restore_cursors(view)
+
+
+def replace_lines(view, edit, changes):
+    """Given a View and a list of (Region, string) pairs like the ones
+    indent_lines returns, replace each line with its string in one replace
+    that spans every line that changes."""
+    if changes:
+        begin = changes[0][0].begin()
+        strings = []
+        point = begin
+
+        for line, string in changes:
+            strings.append(view.substr(Region(point, line.begin())))
+            strings.append(string)
+            point = line.end()
+
+        view.replace(edit, Region(begin, point), "".join(strings))
+
+
+def indent_pasted(view, edit, text):
+    """Given a View and the text just pasted into it, reindent the lines of the
+    pasted text before each caret.
+
+    Replaces the lines of each pasted block at once, instead of once per
+    line."""
+    carets = [region.end() for region in view.sel()]
+    blocks = []
+
+    for caret in carets:
+        region = Region(caret - len(text), caret)
+
+        if (
+            "\n" in text
+            and view.substr(region) == text
+            and not view.match_selector(region.begin(), IGNORE_SELECTORS)
+        ):
+            blocks.append(region)
+
+    # The change in the length of each line that changes, by the point where
+    # the line begins.
+    shifts = []
+
+    for region in reversed(blocks):
+        lines = Region(view.line(region.begin()).begin(), region.end())
+        changes = indent_lines(view, lines)
+        replace_lines(view, edit, changes)
+
+        for line, string in changes:
+            shifts.append((line.begin(), len(string) - line.size()))
+
+    if shifts:
+        view.sel().clear()
+
+        for caret in carets:
+            view.sel().add(caret + sum(shift for b, shift in shifts if b < caret))
+
+
+def format_edits(text, options={}):
+    """Given a string of Clojure source and a dict of formatting options,
+    return the edits that format the source (see formatter.format_edits).
+
+    Options is a dict that may have the keys "indents" (indentation rules
+    that override the default ones), "prune", and "blank_lines".
+
+    Doesn't use the Sublime Text API, so it's safe to call on a worker
+    thread."""
+    return formatter.format_edits(
+        text,
+        indents=formatter.indents(options.get("indents")),
+        prune=options.get("prune", True),
+        blank_lines=options.get("blank_lines", 1),
+    )
+
+
+def apply_edits(view, edit, edits):
+    """Given a View and a list of (begin, end, string) edits in order, replace
+    the region between begin and end with the string for each edit.
+
+    Applies the edits last to first, so that applying an edit doesn't move
+    the regions of the edits that remain, and so that the selections outside
+    the edited regions stay where they are."""
+    for begin, end, string in reversed(edits):
+        view.replace(edit, Region(begin, end), string)
+
+
+def format_view(view, edit, options={}):
+    """Format the Clojure source in the View with the formatter module (see
+    format_edits)."""
+    apply_edits(view, edit, format_edits(view.substr(Region(0, view.size())), options))
 
 
 def reindent(code, column):
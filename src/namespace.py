@@ -1,5 +1,10 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sublime import Region, View
+
 from ..api import edn
-from . import sexp
+from . import selectors, sexp
 
 
 def find_regions(view):
@@ -8,17 +13,66 @@ def find_regions(view):
     )
 
 
+@dataclass(eq=False)
+class Declaration:
+    """The namespace declaration of a View.
+
+    `name` is the name of the namespace the first top-level ns form of the
+    View declares, and `regions` has the Region of the name in every
+    top-level ns form.
+
+    `extents` has the Region of every top-level ns form. It's None until
+    something asks for it."""
+
+    name: Optional[str]
+    regions: List[Region]
+    extents: Optional[List[Region]] = None
+
+
+def read_declaration(view):
+    """Given a View, read the namespace declaration of the View (see
+    Declaration)."""
+    regions = find_regions(view)
+    return Declaration(view.substr(regions[0]) if regions else None, regions)
+
+
+__declarations = {}
+
+
+def declaration(view: View) -> Declaration:
+    """Given a View, return the namespace declaration of the View, reading it
+    first if the View or its syntax has changed since it was last read."""
+    key = view.id()
+    version = (view.change_count(), selectors.generation(view))
+    cached = __declarations.get(key)
+
+    if cached is None or cached[0] != version:
+        cached = (version, read_declaration(view))
+        __declarations[key] = cached
+
+    return cached[1]
+
+
+def forget(view: View):
+    """Given a View, discard the namespace declaration of the View."""
+    __declarations.pop(view.id(), None)
+
+
 def name(view):
-    if regions := find_regions(view):
-        return view.substr(regions[0])
+    return declaration(view).name
 
 
 def forms(view):
-    regions = find_regions(view)
+    ns = declaration(view)
+
+    if ns.extents is None:
+        ns.extents = [
+            outermost.extent()
+            for region in ns.regions
+            if (outermost := sexp.outermost(view, region.begin()))
+        ]
 
-    for region in regions:
-        if outermost := sexp.outermost(view, region.begin()):
-            yield outermost.extent()
+    return ns.extents
 
 
 def default(dialect):
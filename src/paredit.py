@@ -2,7 +2,7 @@ import re
 
 from sublime import CLASS_WORD_END, CLASS_WORD_START, Region
 
-from . import forms, indent, selectors, sexp
+from . import elements, forms, indent, reader, selectors, sexp
 
 
 def iterate(view):
@@ -23,46 +23,253 @@ def iterate(view):
             selections.add(region)
 
 
-def move(view, forward, extend):
-    for region, sel in iterate(view):
-        if forward:
-            point = region.end()
-            form_to = forms.find_next(view, point)
-        else:
-            point = region.begin()
-            form_to = forms.find_previous(view, point)
+def resolve_targets(view, resolve):
+    """Given a View and a function that resolves the target of a paredit
+    command for a selection, call the function on every selection in the View
+    and return the results.
 
-        cover_region = region
+    The function must return None if the command does nothing for the
+    selection, or a tuple whose first item is a Region that spans every point
+    the command edits for the selection.
 
-        if form := forms.find_adjacent(view, point):
-            if view.match_selector(
-                point - 1, "meta.reader-form"
-            ) and view.match_selector(point, "meta.reader-form"):
-                cover_region = region.cover(form)
+    Return None if the spans of two selections share a line: the edits for
+    one selection could then move the points the target of the other
+    selection refers to."""
+    targets = [resolve(region) for region in view.sel()]
+    lines = sorted(
+        (view.full_line(target[0]) for target in targets if target),
+        key=lambda line: line.begin(),
+    )
 
-        new_point = None
+    for previous, line in zip(lines, lines[1:]):
+        if previous.end() > line.begin():
+            return None
 
-        if form_to:
-            new_point = form_to.end() if forward else form_to.begin()
-        elif not extend:
-            innermost = sexp.innermost(view, point, edge=False)
+    return targets
 
-            if innermost:
-                new_point = (
-                    innermost.close.region.end()
-                    if forward
-                    else innermost.open.region.begin()
-                )
 
-        if new_point is not None:
-            if extend and forward:
-                sel.append(Region(point, new_point).cover(cover_region))
-            elif extend and not forward:
-                sel.append(cover_region.cover(Region(new_point, point)))
+def batch(view, edit, resolve, apply):
+    """Run a paredit command on every selection in the View in one pass.
+
+    First, resolve the structural targets of every selection against the
+    unmodified View (see resolve_targets), so that every selection shares the
+    same DelimiterIndex and token cache. Then, call apply(edit, *target) for
+    every target, in reverse document order, so that the edits for a
+    selection never move the points the targets of the preceding selections
+    refer to.
+
+    Sublime Text moves the selections along with the edits.
+
+    Return the list of targets, with None for every selection the command
+    does nothing for, or None if the targets couldn't be resolved in one pass,
+    in which case the caller must fall back to handling one selection at a
+    time."""
+    if len(view.sel()) < 2 or (targets := resolve_targets(view, resolve)) is None:
+        return None
+
+    for target in sorted(
+        filter(None, targets), key=lambda target: target[0].begin(), reverse=True
+    ):
+        apply(edit, *target)
+
+    return targets
+
+
+def keep_selections(view, keep):
+    """Given a View and a list of booleans, one for each selection in the
+    View, keep the selections whose boolean is True, unless none are."""
+    if any(keep):
+        regions = [region for region, k in zip(view.sel(), keep) if k]
+        view.sel().clear()
+        view.sel().add_all(regions)
+
+
+def move(view, forward, extend):
+    with selectors.pinned(view):
+        for region, sel in iterate(view):
+            if forward:
+                point = region.end()
+                form_to = forms.find_next(view, point)
             else:
-                sel.append(new_point)
+                point = region.begin()
+                form_to = forms.find_previous(view, point)
+
+            cover_region = region
+
+            if form := forms.find_adjacent(view, point):
+                if view.match_selector(
+                    point - 1, "meta.reader-form"
+                ) and view.match_selector(point, "meta.reader-form"):
+                    cover_region = region.cover(form)
 
-            view.show(new_point)
+            new_point = None
+
+            if form_to:
+                new_point = form_to.end() if forward else form_to.begin()
+            elif not extend:
+                innermost = sexp.innermost(view, point, edge=False)
+
+                if innermost:
+                    new_point = (
+                        innermost.close.region.end()
+                        if forward
+                        else innermost.open.region.begin()
+                    )
+
+            if new_point is not None:
+                if extend and forward:
+                    sel.append(Region(point, new_point).cover(cover_region))
+                elif extend and not forward:
+                    sel.append(cover_region.cover(Region(new_point, point)))
+                else:
+                    sel.append(new_point)
+
+                view.show(new_point)
+
+
+def expand_selection(view, region):
+    """Add the region that expanding the given region selects to the selections
+    of the View."""
+    if region == Region(0, view.size()):
+        pass
+    elif (
+        not region.empty()
+        and (form := sexp.from_open(view, region.begin()))
+        and form.close.region.end() == region.end()
+        and (parent := sexp.parent(view, form))
+    ):
+        # If the region is an S-expression with a balanced parent, move up
+        # to the contents of the parent in the DelimiterIndex, or, if the
+        # region already spans them, to the parent itself.
+        contents = Region(parent.open.region.end(), parent.close.region.begin())
+
+        if region == contents:
+            view.sel().add(parent.extent())
+        else:
+            view.sel().add(contents)
+    elif not region.empty() and selectors.match_selector(
+        view, region.end(), "-meta.sexp"
+    ):
+        view.sel().add(Region(0, view.size()))
+    elif (
+        region.empty()
+        and selectors.match_selector(
+            view, region.begin(), "meta.tagged-element.element meta.tagged-element.tag"
+        )
+        and (element := forms.find_next(view, region.begin()))
+    ):
+        tag = selectors.expand_by_selector(
+            view, region.begin(), "meta.tagged-element.tag"
+        )
+        view.sel().add(Region(tag.begin(), element.end() - 1))
+    elif (
+        region.empty()
+        and selectors.match_selector(
+            view, region.begin(), "meta.tagged-element.element"
+        )
+        and (form := forms.find_adjacent(view, region.begin()))
+    ):
+        view.sel().add(form)
+    elif (
+        region.empty()
+        and selectors.match_selector(view, region.begin(), "meta.tagged-element.tag")
+        and (form := forms.find_adjacent(view, region.begin()))
+    ):
+        view.sel().add(form)
+    elif region.empty() and (form := forms.find_adjacent(view, region.begin())):
+        view.sel().add(form)
+    elif region.empty() and not forms.find_adjacent(view, region.begin()):
+        view.run_command("expand_selection", {"to": "brackets"})
+    elif (
+        not region.empty()
+        and selectors.match_selector(view, region.begin(), "meta.mapping.key")
+    ) and (
+        not region.empty()
+        and selectors.match_selector(view, region.end() - 1, "meta.mapping.value")
+    ):
+        view.run_command("expand_selection", {"to": "brackets"})
+    elif (
+        not region.empty()
+        and selectors.match_selector(view, region.begin(), "meta.mapping.key")
+        and selectors.match_selector(view, region.end() - 1, "meta.mapping.key")
+        and not selectors.match_selector(
+            view, region.begin(), "meta.mapping.key meta.sexp"
+        )
+        and not selectors.match_selector(view, region.begin(), sexp.BEGIN_SELECTORS)
+        and not selectors.match_selector(view, region.end() - 1, sexp.END_SELECTORS)
+    ):
+        value_begin = selectors.find(
+            view,
+            region.end(),
+            "meta.mapping.value",
+            forward=True,
+            stop_at=sexp.END_SELECTORS,
+        )
+
+        if not value_begin and (innermost := sexp.innermost(view, region.begin())):
+            view.sel().add(innermost.extent())
+        elif selectors.match_selector(
+            view, value_begin, "meta.reader-form | keyword.operator.macro"
+        ):
+            form = forms.find_next(view, value_begin)
+            view.sel().add(Region(region.begin(), form.end()))
+        elif selectors.match_selector(
+            view, value_begin, "meta.mapping.value meta.sexp"
+        ):
+            end = sexp.innermost(view, value_begin).close.region.end()
+            view.sel().add(Region(region.begin(), end))
+    elif (
+        not region.empty()
+        and selectors.match_selector(view, region.begin(), sexp.BEGIN_SELECTORS)
+        and selectors.match_selector(view, region.end() - 1, sexp.END_SELECTORS)
+    ):
+        view.run_command("expand_selection", {"to": "brackets"})
+
+        for region in view.sel():
+            if begin := selectors.find(
+                view,
+                region.begin(),
+                f"- ({sexp.ABSORB_SELECTOR})",
+                forward=False,
+                stop_at=sexp.BEGIN_SELECTORS,
+            ):
+                view.sel().add(Region(begin + 1, region.end()))
+    elif (
+        not region.empty()
+        and selectors.match_selector(view, region.begin() - 1, sexp.BEGIN_SELECTORS)
+        and selectors.match_selector(view, region.end(), sexp.END_SELECTORS)
+    ):
+        if not (form := sexp.from_open(view, region.begin() - 1)):
+            form = sexp.innermost(view, region.begin(), edge=False)
+
+        view.sel().add(form.extent())
+    elif (
+        not region.empty()
+        and not selectors.match_selector(view, region.begin(), sexp.BEGIN_SELECTORS)
+        and not selectors.match_selector(view, region.end() - 1, sexp.END_SELECTORS)
+    ):
+        if innermost := sexp.innermost(view, region.begin(), edge=False):
+            if innermost.open and innermost.close:
+                view.sel().add(
+                    Region(innermost.open.region.end(), innermost.close.region.begin())
+                )
+    elif (
+        selectors.match_selector(view, region.begin(), "meta.tagged-element")
+        and selectors.match_selector(view, region.end() - 1, "meta.tagged-element")
+        and not selectors.match_selector(
+            view, region.begin() - 1, "meta.tagged-element"
+        )
+        and not selectors.match_selector(view, region.end(), "meta.tagged-element")
+    ):
+        if innermost := sexp.innermost(view, region.begin(), edge=False):
+            if innermost.open and innermost.close:
+                view.sel().add(
+                    Region(innermost.open.region.end(), innermost.close.region.begin())
+                )
+    elif innermost := sexp.innermost(view, region.begin(), edge=False):
+        view.sel().add(innermost.extent())
+    else:
+        view.run_command("expand_selection", {"to": "brackets"})
 
 
 def open_bracket(view, edit, open_bracket):
@@ -149,7 +356,35 @@ def find_slurp_barf_targets(view, point, finder):
     return form, innermost
 
 
+def resolve_forward_slurp(view, region):
+    form, innermost = find_slurp_barf_targets(
+        view, region.begin(), lambda s: forms.find_next(view, s.close.region.end())
+    )
+
+    if form:
+        return Region(innermost.extent().begin(), form.end()), innermost, form
+
+
+def apply_forward_slurp(view, edit, span, innermost, form):
+    view.insert(edit, form.end(), view.substr(innermost.close.region))
+    view.erase(edit, innermost.close.region)
+    # Moving the close char doesn't change the size of the span, so the span
+    # now covers the S-expression we slurped into.
+    indent.indent_region(view, edit, span, prune=True)
+
+
 def forward_slurp(view, edit):
+    if (
+        targets := batch(
+            view,
+            edit,
+            lambda region: resolve_forward_slurp(view, region),
+            lambda edit, *target: apply_forward_slurp(view, edit, *target),
+        )
+    ) is not None:
+        keep_selections(view, targets)
+        return
+
     for region, sel in iterate(view):
         form, innermost = find_slurp_barf_targets(
             view, region.begin(), lambda s: forms.find_next(view, s.close.region.end())
@@ -446,7 +681,34 @@ def splice_sexp_killing_backward(view, edit, forward=True):
             )
 
 
+def resolve_kill_form(view, region, forward):
+    point = region.begin()
+
+    if not region.empty():
+        return region, False
+    elif view.match_selector(
+        point, "string - punctuation.definition.string.begin | comment.line"
+    ):
+        if word := view.word(point):
+            return word, False
+    elif form := (
+        forms.find_next(view, point) if forward else forms.find_previous(view, point)
+    ):
+        return region.cover(form), forward
+
+
 def kill_form(view, edit, forward):
+    if (
+        targets := batch(
+            view,
+            edit,
+            lambda region: resolve_kill_form(view, region, forward),
+            lambda edit, span, _: view.erase(edit, span),
+        )
+    ) is not None:
+        keep_selections(view, [target and target[1] for target in targets])
+        return
+
     for region, sel in iterate(view):
         point = region.begin()
 
@@ -556,149 +818,390 @@ def forward_move_form(view, edit):
                 sel.append(Region(begin, end))
 
 
-# FIXME: This is awful. Also, it doesn't handle line breaks.
+def read_collection(view, point):
+    """Given a View and a point, return a tuple of the text from the
+    beginning of the line of the S-expression around the innermost collection
+    around the point to the end of the S-expression, the position of the text
+    in the View, and the collection Form read from the text, or None if
+    there's no collection around the point.
+
+    Reads only the children of the collection and of the S-expression around
+    it (see reader.read_level). The latter tell whether the collection is a
+    binding vector (see elements.is_pairwise)."""
+    if (innermost := sexp.innermost(view, point, edge=False)) and innermost.close:
+        outer = sexp.innermost(view, innermost.open.region.begin(), edge=False)
+
+        if outer is None or outer.close is None:
+            outer = innermost
+
+        origin = view.line(outer.open.region.begin()).begin()
+        text = view.substr(Region(origin, outer.close.region.end()))
+
+        # Read up to the open delimiter of the outer S-expression only: its
+        # close delimiter is at the end of the text.
+        forms = reader.read_level(
+            text,
+            outer.open.region.begin() - origin,
+            outer.open.region.end() - origin,
+        )
+
+        if forms and (collection := forms[0]).is_collection():
+            collection.close = len(text) - 1
+            collection.end = len(text)
+
+            if outer != innermost:
+                collection.children = reader.read_level(
+                    text, collection.open + 1, collection.close
+                )
+
+                open_point = innermost.open.region.end() - 1 - origin
+
+                for child in collection.children:
+                    if child.open == open_point:
+                        child.parent = collection
+                        collection = child
+                        break
+
+            collection.children = reader.read_level(
+                text, collection.open + 1, collection.close
+            )
+
+            return text, origin, collection
+
+
+def rewrite_collection(view, edit, rewrite, reindent=False):
+    """Given a View, an Edit, and a function that takes the text of a
+    collection, the collection Form, the Elements of the collection, and the
+    index of the Element at a caret (or None), and returns an
+    elements.Rewrite of the collection or None, rewrite the innermost
+    collection around each caret in one edit.
+
+    If reindent is True, also reindent the lines the Rewrite changes. The
+    selections move along with the Elements they're on.
+
+    Rewrites each collection once, for the first caret in it. The other
+    carets in the collection don't rewrite anything; they move along with
+    the Elements they're on, too."""
+    selections = view.sel()
+    new_regions = []
+    n = 0
+
+    while n < len(selections):
+        region = selections[n]
+        n += 1
+
+        if target := read_collection(view, region.begin()):
+            text, origin, collection = target
+            items = elements.elements(text, collection)
+            index = elements.element_at(items, region.begin() - origin)
+            change = rewrite(text, collection, items, index)
+        else:
+            change = None
+
+        if not change:
+            new_regions.append(region)
+            continue
+
+        # The selections in the collection, before the edit moves them.
+        regions = [region]
+
+        while n < len(selections) and selections[n].end() <= origin + collection.end:
+            regions.append(selections[n])
+            n += 1
+
+        view.replace(
+            edit,
+            Region(origin + change.begin, origin + change.end),
+            change.string,
+        )
+
+        def move(point):
+            relative = point - origin
+
+            if relative < change.begin:
+                return point
+            elif (
+                (index := elements.element_at(items, relative)) is not None
+                and items[index].begin <= relative
+                and change.begins[index] is not None
+            ):
+                return origin + change.begins[index] + relative - items[index].begin
+            elif relative >= change.end:
+                return point + len(change.string) - (change.end - change.begin)
+            else:
+                return origin + change.begin
+
+        points = [(move(region.a), move(region.b)) for region in regions]
+
+        if reindent:
+            begin = origin + change.begin
+            lines = Region(begin, begin + len(change.string))
+            changes = indent.indent_lines(view, lines)
+            indent.replace_lines(view, edit, changes)
+
+            def shift(point):
+                return point + sum(
+                    len(string) - line.size()
+                    for line, string in changes
+                    if line.begin() < point
+                )
+
+            points = [(shift(a), shift(b)) for a, b in points]
+
+        new_regions.extend(Region(a, b) for a, b in points)
+
+    selections.clear()
+
+    for region in new_regions:
+        selections.add(region)
+
+
+def move_form_to(view, edit, index):
+    """Move the form at each caret to the given index in the collection
+    around it. In maps and binding vectors, move the key-value pair at the
+    caret instead.
+
+    A negative index counts from the end of the collection."""
+
+    def rewrite(text, _, items, current):
+        if current is not None:
+            order = elements.moved(len(items), current, index)
+            return elements.reorder(text, items, order)
+
+    rewrite_collection(view, edit, rewrite)
+
+
+def sort_collection(view, edit):
+    """Sort the elements of the innermost collection around each caret. Sort
+    maps and binding vectors by key."""
+    rewrite_collection(
+        view,
+        edit,
+        lambda text, _, items, __: elements.reorder(
+            text, items, elements.sorted_order(text, items)
+        ),
+    )
+
+
+def dedupe_collection(view, edit):
+    """Remove the duplicate elements of the innermost set, vector, or map
+    around each caret.
+
+    Leaves binding vectors alone: rebinding a name is meaningful."""
+
+    def rewrite(text, collection, items, _):
+        if items and (
+            collection.kind == reader.MAP or not elements.is_pairwise(text, collection)
+        ):
+            return elements.deduplicate(text, items)
+
+    rewrite_collection(view, edit, rewrite)
+
+
+def align_collection(view, edit):
+    """Align the values of the innermost map or binding vector around each
+    caret into a column."""
+
+    def rewrite(text, collection, items, _):
+        if items and elements.is_pairwise(text, collection):
+            return elements.align(text, items)
+
+    rewrite_collection(view, edit, rewrite, reindent=True)
+
+
+def convert_pairs(view, edit):
+    """Turn the innermost map around each caret into a vector of key-value
+    vectors, or the innermost vector of key-value vectors around each caret
+    into a map."""
+    rewrite_collection(
+        view,
+        edit,
+        lambda text, collection, items, _: elements.convert_pairs(
+            text, collection, items
+        ),
+        reindent=True,
+    )
+
+
+# The threading macros thread_first and thread_last can thread forms into,
+# and the ones unthread can unthread.
+#
+# cond-> and cond->> take a test before each step; threading a form into them
+# adds the step behind a `true` test, so that the step always runs.
+#
+# some-> and some->> don't run the last step if the rest of the macro returns
+# nil; moving the step out of the macro would run it on nil.
+THREAD_FIRST_MACROS = {"->", "some->", "cond->"}
+THREAD_LAST_MACROS = {"->>", "some->>", "cond->>"}
+CONDITIONAL_THREADING_MACROS = {"cond->", "cond->>"}
+UNTHREADABLE_MACROS = {"->", "->>"}
+
+
+def read_sexp(view, s):
+    """Given a View and an S-expression, return the text of the S-expression
+    and the non-discarded child forms of the S-expression, as read by the
+    reader module.
+
+    The positions of the forms are relative to the beginning of the
+    S-expression."""
+    text = view.substr(s.extent())
+    document = reader.Document(text)
+
+    if document.forms and document.forms[0].is_collection():
+        return text, [
+            child for child in document.forms[0].children if not child.discarded
+        ]
+    else:
+        return text, []
+
+
 def thread(view, edit, arrow, join_on=" "):
+    """Thread the form after each caret (or the selected form) into the form
+    around it with the given threading macro.
+
+    If the form is already a call to the threading macro, add the rest of the
+    form around it as the last step of the macro instead.
+
+    Reads each S-expression once, and replaces it in one edit."""
+    conditional = f"true{join_on}" if arrow in CONDITIONAL_THREADING_MACROS else ""
+
     for region, sel in iterate(view):
         point = region.begin()
 
-        if not selectors.ignore(view, point):
+        if not selectors.ignore(view, point) and (
+            innermost := sexp.innermost(view, point, edge=False)
+        ):
+            origin = innermost.open.region.begin()
+            text, children = read_sexp(view, innermost)
+            begin = point - origin
+
             if region.empty():
-                form = forms.find_next(view, point)
+                form = next((child for child in children if child.end > begin), None)
             else:
-                form = region
+                end = region.end() - origin
+                form = next(
+                    (c for c in children if c.begin == begin and c.end == end),
+                    reader.Form(reader.SYMBOL, begin, end),
+                )
 
-            innermost = sexp.innermost(view, point, edge=False)
+            # If the form is the first form in the S-expression, abort.
+            if form is None or not children or children[0].begin >= begin:
+                continue
+
+            form_str = text[form.begin : form.end]
 
-            def thread_unthreaded():
-                head_form = forms.find_next(view, innermost.open.region.end())
-                left = view.substr(Region(head_form.begin(), form.begin()))
-                right = view.substr(Region(form.end(), innermost.close.region.begin()))
+            if (
+                form.is_collection()
+                and form.children
+                and form_str[form.open - form.begin] == "("
+                and text[form.children[0].begin : form.children[0].end] == arrow
+            ):
+                left = text[: form.begin].rstrip()
+                right = text[form.end :]
+                replacee = (
+                    f"{form_str[:-1]}{join_on}{conditional}{left}{right}{form_str[-1]}"
+                )
+            else:
                 open_delim = view.substr(innermost.open.region)
                 close_delim = view.substr(innermost.close.region)
-                replacee = f"""{open_delim}{arrow}{join_on}{view.substr(form)}{join_on}{open_delim}{left.rstrip()}{right}{close_delim}{close_delim}"""
-                view.replace(edit, innermost.extent(), replacee)
-
-                indent.indent_region(
-                    view,
-                    edit,
-                    sexp.innermost(view, innermost.open.region.begin()).extent(),
-                    prune=True,
-                )
-
-            # If the form is the first form in a sexp, abort.
-            if form and innermost and forms.find_previous(view, point):
-                sel.append(innermost.open.region.begin())
-
-                if view.match_selector(form.begin(), sexp.BEGIN_SELECTORS):
-                    head = forms.find_next(view, form.begin() + 1)
-
-                    if view.substr(head) == arrow:
-                        enclosing_sexp = sexp.innermost(view, form.begin(), edge=False)
-                        left = view.substr(
-                            Region(enclosing_sexp.open.region.begin(), form.begin())
-                        )
-                        right = view.substr(
-                            Region(form.end(), enclosing_sexp.close.region.end())
-                        )
-                        form_str = view.substr(form)
-                        replacee = f"""{form_str[:-1]}{join_on}{left.rstrip()}{right}{form_str[-1]}"""
-                        view.replace(edit, enclosing_sexp.extent(), replacee)
-
-                        indent.indent_region(
-                            view,
-                            edit,
-                            sexp.innermost(
-                                view, enclosing_sexp.open.region.begin()
-                            ).extent(),
-                            prune=True,
-                        )
-                    else:
-                        thread_unthreaded()
-                else:
-                    thread_unthreaded()
+                left = text[children[0].begin : form.begin].rstrip()
+                right = text[form.end : innermost.close.region.begin() - origin]
+                replacee = f"{open_delim}{arrow}{join_on}{form_str}{join_on}{conditional}{open_delim}{left}{right}{close_delim}{close_delim}"
+
+            view.replace(edit, innermost.extent(), replacee)
+            extent = Region(origin, origin + len(replacee))
+            indent.replace_lines(
+                view, edit, indent.indent_lines(view, extent, prune=True)
+            )
+            sel.append(origin)
 
 
-def thread_first(view, edit, join_on):
-    thread(view, edit, "->", join_on)
+def thread_first(view, edit, join_on, arrow="->"):
+    thread(view, edit, arrow, join_on)
 
 
-def thread_last(view, edit, join_on):
-    thread(view, edit, "->>", join_on)
+def thread_last(view, edit, join_on, arrow="->>"):
+    thread(view, edit, arrow, join_on)
 
 
 def unthread(view, edit, join_on=" "):
+    """Move the last step of each threading macro around a caret out of the
+    macro, so that the step wraps the rest of the macro.
+
+    Reads each S-expression once, and replaces it in one edit."""
     for region, sel in iterate(view):
-        if (
-            (enclosing_sexp := sexp.innermost(view, region.begin()))
-            and (head := forms.find_next(view, enclosing_sexp.open.region.end()))
-            and view.substr(head) in {"->", "->>"}
-        ):
-            threaded_form = forms.find_next(view, head.end())
-            last_form = forms.find_previous(view, enclosing_sexp.close.region.begin())
+        if enclosing_sexp := sexp.innermost(view, region.begin()):
+            text, children = read_sexp(view, enclosing_sexp)
 
-            if view.match_selector(last_form.end() - 1, sexp.END_SELECTORS):
-                innermost = sexp.innermost(view, enclosing_sexp.close.region.begin())
-                new_head = Region(
-                    innermost.open.region.end(), innermost.close.region.begin()
-                )
-            else:
-                new_head = last_form
+            if (
+                len(children) < 3
+                or (head := text[children[0].begin : children[0].end])
+                not in UNTHREADABLE_MACROS
+            ):
+                continue
 
-            # The form following the threaded form is the last form in the enclosing S-expression.
-            if threaded_form == forms.find_previous(view, last_form.begin()):
-                prefix = f"""{view.substr(enclosing_sexp.open.region)}{view.substr(new_head)}{join_on}"""
+            threaded_form = children[1]
+            last_form = children[-1]
 
-                view.replace(
-                    edit,
-                    enclosing_sexp.extent(),
-                    f"""{prefix}{view.substr(threaded_form)}{view.substr(enclosing_sexp.close.region)}""",
-                )
+            if last_form.is_collection() and last_form.close is not None:
+                new_head = text[last_form.open + 1 : last_form.close]
+            else:
+                new_head = text[last_form.begin : last_form.end]
+
+            open_delim = view.substr(enclosing_sexp.open.region)
+            close_delim = view.substr(enclosing_sexp.close.region)
+            prefix = f"{open_delim}{new_head}{join_on}"
 
-                sel.append(enclosing_sexp.open.region.end() + len(prefix) - 1)
+            # The form following the threaded form is the last form in the enclosing S-expression.
+            if len(children) == 3:
+                threaded = text[threaded_form.begin : threaded_form.end]
             else:
-                between = view.substr(Region(head.end(), last_form.begin())).rstrip()
-                new_threaded_content = f"""{view.substr(enclosing_sexp.open.region)}{view.substr(head)}{between}{view.substr(enclosing_sexp.close.region)}"""
-                prefix = f"""{view.substr(enclosing_sexp.open.region)}{view.substr(new_head)}{join_on}"""
-
-                view.replace(
-                    edit,
-                    enclosing_sexp.extent(),
-                    f"""{prefix}{new_threaded_content}{view.substr(enclosing_sexp.close.region)}""",
-                )
+                between = text[children[0].end : last_form.begin].rstrip()
+                threaded = f"{open_delim}{head}{between}{close_delim}"
+
+            view.replace(
+                edit, enclosing_sexp.extent(), f"{prefix}{threaded}{close_delim}"
+            )
 
-                sel.append(enclosing_sexp.open.region.end() + len(prefix) - 1)
+            sel.append(enclosing_sexp.open.region.end() + len(prefix) - 1)
 
 
 def forward_up(view, edit):
-    for region, sel in iterate(view):
-        innermost = sexp.innermost(view, region.begin(), edge=False)
+    with selectors.pinned(view):
+        for region, sel in iterate(view):
+            innermost = sexp.innermost(view, region.begin(), edge=False)
 
-        if innermost:
-            sel.append(innermost.close.region.end())
+            if innermost:
+                sel.append(innermost.close.region.end())
 
 
 def forward_down(view, edit):
-    for region, sel in iterate(view):
-        open_bracket = selectors.find(view, region.begin(), selectors.SEXP_BEGIN)
+    with selectors.pinned(view):
+        for region, sel in iterate(view):
+            open_bracket = selectors.find(view, region.begin(), selectors.SEXP_BEGIN)
 
-        if open_bracket != -1:
-            sel.append(open_bracket + 1)
+            if open_bracket != -1:
+                sel.append(open_bracket + 1)
 
 
 def backward_up(view, edit):
-    for region, sel in iterate(view):
-        innermost = sexp.innermost(view, region.begin(), edge=False)
+    with selectors.pinned(view):
+        for region, sel in iterate(view):
+            innermost = sexp.innermost(view, region.begin(), edge=False)
 
-        if innermost:
-            sel.append(innermost.open.region.begin())
+            if innermost:
+                sel.append(innermost.open.region.begin())
 
 
 def backward_down(view, edit):
-    for region, sel in iterate(view):
-        close_bracket = selectors.find(view, region.begin(), selectors.SEXP_END, False)
+    with selectors.pinned(view):
+        for region, sel in iterate(view):
+            close_bracket = selectors.find(
+                view, region.begin(), selectors.SEXP_END, False
+            )
 
-        if close_bracket != -1:
-            sel.append(close_bracket)
+            if close_bracket != -1:
+                sel.append(close_bracket)
 
 
 def discard_undiscard(view, edit, scope="innermost"):
@@ -0,0 +1,404 @@
+"""A scope-independent Clojure lexer and reader.
+
+Reads Clojure source into a token stream and a tree of forms with offsets,
+without consulting the scopes the syntax definition assigns to the source.
+Does not depend on the Sublime Text API, so it works on any thread and outside
+Sublime Text.
+
+The reader is lenient: it never raises on malformed source. Unbalanced open
+delimiters extend to the end of the source, and close delimiters that don't
+close anything are stray."""
+
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Token kinds
+WHITESPACE = "whitespace"
+COMMA = "comma"
+COMMENT = "comment"
+STRING = "string"
+REGEX = "regex"
+CHARACTER = "character"
+SYMBOLIC = "symbolic"
+MACRO = "macro"
+TAG = "tag"
+OPEN = "open"
+CLOSE = "close"
+KEYWORD = "keyword"
+NUMBER = "number"
+SYMBOL = "symbol"
+INVALID = "invalid"
+
+# Form kinds, in addition to the token kinds of atoms
+LIST = "list"
+VECTOR = "vector"
+MAP = "map"
+SET = "set"
+FN = "fn"
+
+TRIVIA = {WHITESPACE, COMMA, COMMENT}
+PREFIXES = {MACRO, TAG}
+
+PAIRS = {"(": ")", "[": "]", "{": "}"}
+
+# The prefixes whose form is metadata for the form after it.
+METADATA_PREFIXES = {"^", "#^"}
+
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<whitespace>[^\S,]+)
+    |(?P<comma>,+)
+    |(?P<comment>(?:;|\#!)[^\n]*)
+    |(?P<string>"(?:[^"\\]|\\.)*"?)
+    |(?P<regex>\#"(?:[^"\\]|\\.)*"?)
+    |(?P<character>\\.[^\s,"();@^`~\[\]{}\\]*)
+    |(?P<symbolic>\#\#[^\s,"();@^`~\[\]{}\\]*)
+    |(?P<macro>~@|[~'`@^]|\#[_'=^]|\#\?@?|\#(?=[({])|\#::?[^\s,"();@^`~\[\]{}\\]*)
+    |(?P<tag>\#[^\s,"();@^`~\[\]{}\\]+)
+    |(?P<open>[(\[{])
+    |(?P<close>[)\]}])
+    |(?P<atom>[^\s,"();@^`~\[\]{}\\\#][^\s,"();@^`~\[\]{}\\]*)
+    |(?P<invalid>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+NUMBER_PATTERN = re.compile(r"[+-]?\d")
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str
+    begin: int
+    end: int
+    text: str
+
+
+@dataclass(eq=False)
+class Form:
+    """A form in Clojure source.
+
+    `begin` and `end` include the prefix macro characters (quote, deref,
+    metadata, dispatch characters, tags, etc.) that precede the form.
+
+    For collections, `open` and `close` are the positions of the open and the
+    close delimiter. If the collection is unbalanced, `close` is None and the
+    collection extends to the end of the source."""
+
+    kind: str
+    begin: int
+    end: int
+    open: Optional[int] = None
+    close: Optional[int] = None
+    prefixes: List[Token] = field(default_factory=list)
+    children: List["Form"] = field(default_factory=list)
+    parent: Optional["Form"] = field(default=None, repr=False)
+    discarded: bool = False
+    _child_begins: Optional[List[int]] = field(default=None, repr=False)
+    _child_ends: Optional[List[int]] = field(default=None, repr=False)
+
+    def is_collection(self):
+        return self.open is not None
+
+    def contains(self, point):
+        """Return True if the point is inside the delimiters of this
+        collection."""
+        return (
+            self.open is not None
+            and self.open < point
+            and (self.close is None or point <= self.close)
+        )
+
+    def child_begins(self):
+        if self._child_begins is None:
+            self._child_begins = [child.begin for child in self.children]
+
+        return self._child_begins
+
+    def child_ends(self):
+        if self._child_ends is None:
+            self._child_ends = [child.end for child in self.children]
+
+        return self._child_ends
+
+
+def tokenize(text):
+    """Given a string of Clojure source, return a list of the Tokens in the
+    source."""
+    tokens = []
+
+    for match in TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        token_text = match.group()
+
+        if kind == "atom":
+            kind = atom_kind(token_text)
+
+        tokens.append(Token(kind, match.start(), match.end(), token_text))
+
+    return tokens
+
+
+def atom_kind(text):
+    """Given the text of an atom, return the kind of the atom: KEYWORD,
+    NUMBER, or SYMBOL."""
+    if text[0] == ":":
+        return KEYWORD
+    elif NUMBER_PATTERN.match(text):
+        return NUMBER
+    else:
+        return SYMBOL
+
+
+def collection_kind(token, prefixes):
+    char = token.text
+
+    if prefixes and prefixes[-1].text == "#":
+        return FN if char == "(" else SET
+
+    return {"(": LIST, "[": VECTOR, "{": MAP}[char]
+
+
+def discards(prefixes, count):
+    """Given the prefixes of a form and the number of forms that the discard
+    macros before the form have yet to discard, return a tuple of whether the
+    form is discarded and the number of forms left to discard after it.
+
+    Each discard macro discards one more form: #_ #_ a b discards both a and
+    b. Metadata belongs to the form after it, so it doesn't count."""
+    count += sum(prefix.text == "#_" for prefix in prefixes)
+
+    if not count:
+        return False, 0
+    elif prefixes and prefixes[-1].text in METADATA_PREFIXES:
+        return True, count
+    else:
+        return True, count - 1
+
+
+def read(text, tokens):
+    """Given a string of Clojure source and the Tokens in the source, return
+    a tuple of the top-level Forms in the source, every collection Form in the
+    source in the order of their open delimiters, and every stray close
+    delimiter Token."""
+    top_level = []
+    collections = []
+    stray = []
+    stack = []
+    prefixes = []
+    # The number of forms left to discard at each level of the stack.
+    counts = [0]
+
+    def add(form):
+        (stack[-1].children if stack else top_level).append(form)
+
+    for token in tokens:
+        kind = token.kind
+
+        if kind in TRIVIA:
+            continue
+        elif kind in PREFIXES:
+            prefixes.append(token)
+        elif kind == OPEN:
+            discarded, counts[-1] = discards(prefixes, counts[-1])
+
+            form = Form(
+                collection_kind(token, prefixes),
+                prefixes[0].begin if prefixes else token.begin,
+                len(text),
+                open=token.begin,
+                prefixes=prefixes,
+                parent=stack[-1] if stack else None,
+                discarded=discarded,
+            )
+
+            add(form)
+            collections.append(form)
+            stack.append(form)
+            counts.append(0)
+            prefixes = []
+        elif kind == CLOSE:
+            # Prefixes without a form to attach to are incomplete; drop them.
+            prefixes = []
+
+            if stack and PAIRS[text[stack[-1].open]] == token.text:
+                form = stack.pop()
+                counts.pop()
+                form.close = token.begin
+                form.end = token.end
+            else:
+                stray.append(token)
+        else:
+            discarded, counts[-1] = discards(prefixes, counts[-1])
+
+            add(
+                Form(
+                    kind,
+                    prefixes[0].begin if prefixes else token.begin,
+                    token.end,
+                    prefixes=prefixes,
+                    parent=stack[-1] if stack else None,
+                    discarded=discarded,
+                )
+            )
+
+            prefixes = []
+
+    return top_level, collections, stray
+
+
+def read_level(text, begin=0, end=None):
+    """Given a string of Clojure source, and, optionally, the positions to
+    begin and end reading at, return a list of the Forms at the top level of
+    the source between the positions.
+
+    Doesn't read the children of collections: it skips over them without
+    making a Token or a Form for anything inside them. That makes it much
+    faster than Document for reading one level of a large collection."""
+    if end is None:
+        end = len(text)
+
+    forms = []
+    prefixes = []
+    # The open delimiters of the collections that are open inside the
+    # current top-level collection.
+    stack = []
+    form = None
+    # The number of forms left to discard.
+    count = 0
+
+    for match in TOKEN_PATTERN.finditer(text, begin, end):
+        kind = match.lastgroup
+
+        if stack:
+            if kind == OPEN:
+                stack.append(match.group())
+            elif kind == CLOSE and PAIRS[stack[-1]] == match.group():
+                stack.pop()
+
+                if not stack:
+                    form.close = match.start()
+                    form.end = match.end()
+        elif kind in TRIVIA:
+            continue
+        elif kind in PREFIXES:
+            prefixes.append(Token(kind, match.start(), match.end(), match.group()))
+        elif kind == OPEN:
+            token = Token(kind, match.start(), match.end(), match.group())
+            discarded, count = discards(prefixes, count)
+
+            form = Form(
+                collection_kind(token, prefixes),
+                prefixes[0].begin if prefixes else token.begin,
+                end,
+                open=token.begin,
+                prefixes=prefixes,
+                discarded=discarded,
+            )
+
+            forms.append(form)
+            stack.append(token.text)
+            prefixes = []
+        elif kind == CLOSE:
+            # Prefixes without a form to attach to are incomplete; drop them.
+            prefixes = []
+        else:
+            token_text = match.group()
+            discarded, count = discards(prefixes, count)
+
+            forms.append(
+                Form(
+                    atom_kind(token_text) if kind == "atom" else kind,
+                    prefixes[0].begin if prefixes else match.start(),
+                    match.end(),
+                    prefixes=prefixes,
+                    discarded=discarded,
+                )
+            )
+
+            prefixes = []
+
+    return forms
+
+
+class Document:
+    """A string of Clojure source, read into tokens and forms.
+
+    Answers structural queries about the source by binary search."""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.token_begins = [token.begin for token in self.tokens]
+        self.forms, self.collections, self.stray = read(text, self.tokens)
+        self.opens = [form.open for form in self.collections]
+        self.root = Form("root", 0, len(text), children=self.forms)
+
+    def token_at(self, point):
+        """Return the Token that contains the point, or None if the point is
+        at the end of the source."""
+        if (index := bisect_right(self.token_begins, point) - 1) != -1:
+            token = self.tokens[index]
+
+            if point < token.end:
+                return token
+
+    def innermost(self, point):
+        """Return the innermost collection Form whose delimiters enclose the
+        point, or None if there is no such Form.
+
+        Like sexp.find_open, a point that's on the open delimiter of a
+        collection is not inside the collection, but a point that's on the
+        close delimiter is."""
+        index = bisect_left(self.opens, point) - 1
+        form = self.collections[index] if index != -1 else None
+
+        while form is not None:
+            if form.close is None or form.close >= point:
+                return form
+
+            form = form.parent
+
+    def outermost(self, point):
+        """Return the top-level collection Form whose delimiters enclose the
+        point, or None if there is no such Form."""
+        form = self.innermost(point)
+
+        while form is not None and form.parent is not None:
+            form = form.parent
+
+        return form
+
+    def find_close(self, open_point):
+        """Given the position of an open delimiter, return the position of the
+        close delimiter that closes it, or None if there is no such
+        delimiter."""
+        index = bisect_left(self.opens, open_point)
+
+        if index < len(self.opens) and self.opens[index] == open_point:
+            return self.collections[index].close
+
+    def container(self, point):
+        return self.innermost(point) or self.root
+
+    def find_next(self, point):
+        """Return the first Form that ends after the point in the innermost
+        collection that encloses the point, or None if there is no such
+        Form."""
+        container = self.container(point)
+        index = bisect_right(container.child_ends(), point)
+
+        if index < len(container.children):
+            return container.children[index]
+
+    def find_previous(self, point):
+        """Return the last Form that begins before the point in the innermost
+        collection that encloses the point, or None if there is no such
+        Form."""
+        container = self.container(point)
+        index = bisect_left(container.child_begins(), point) - 1
+
+        if index != -1:
+            return container.children[index]
@@ -138,7 +138,7 @@ class Client(edn_client.Client):
 
     def send(self, message):
         if isinstance(message, dict):
-            edn.write_line(self.buffer, message)
+            self.write_message(self.buffer, message)
         else:
             self.write_line(message)
 
@@ -199,12 +199,17 @@ class Client(edn_client.Client):
             message = self.register_handler(message, handler)
             self.sendq.put(message)
 
+    def uses_sentinels(self):
+        """Return True if this client marks stdout and stderr with invisible
+        Unicode characters instead of regions."""
+        return self.options.get("output_scopes", "sentinel") == "sentinel"
+
     def print(self, item):
-        self.printq.put(formatter.format(item))
+        self.printq.put(formatter.format(item, sentinels=self.uses_sentinels()))
 
     def recv(self):
         if self.mode == "rpc":
-            return edn.read_line(self.buffer)
+            return self.read_message(self.buffer)
         else:
             return self.socket.recv(io.DEFAULT_BUFFER_SIZE).decode("utf-8")
 
@@ -304,13 +309,14 @@ class JVMClient(Client):
 
         init = self.options.get("init") or "tutkain.rpc/default-init"
         add_tap = self.options.get("add_tap", False)
+        rpc_opts = f""":tap-buffer-size {self.options.get("tap_buffer_size", 1000)} :tap-rate-limit {self.options.get("tap_rate_limit", 20)} :timing? {"true" if self.options.get("server_timing") else "false"}"""
 
         if self.mode == "repl":
             backchannel_opts = self.options.get("backchannel", {})
             backchannel_port = backchannel_opts.get("port", 0)
             backchannel_bind_address = backchannel_opts.get("bind_address", "localhost")
             self.write_line(
-                f"""(tutkain.repl/repl {{:init `{init} :add-tap? {"true" if add_tap else "false"} :port {backchannel_port} :bind-address "{backchannel_bind_address}"}})"""
+                f"""(tutkain.repl/repl {{:init `{init} :add-tap? {"true" if add_tap else "false"} {rpc_opts} :port {backchannel_port} :bind-address "{backchannel_bind_address}"}})"""
             )
             line = self.buffer.readline()
 
@@ -321,14 +327,14 @@ class JVMClient(Client):
             elif (host := ret.get(edn.Keyword("host"))) and (
                 port := ret.get(edn.Keyword("port"))
             ):
-                self.backchannel = backchannel.Client(self.print).connect(
+                self.backchannel = backchannel.Client(self.print, self.metrics).connect(
                     self.id, host, port
                 )
             else:
                 self.print(ret)
         else:
             self.write_line(
-                f"""(tutkain.rpc/rpc {{:init `{init} :add-tap? {"true" if add_tap else "false"}}})"""
+                f"""(tutkain.rpc/rpc {{:init `{init} :add-tap? {"true" if add_tap else "false"} {rpc_opts}}})"""
             )
 
             line = self.buffer.readline()
@@ -3,7 +3,6 @@ from queue import Queue
 from threading import Thread
 from typing import IO
 
-from ...api import edn
 from ..log import log
 from . import edn_client
 
@@ -15,10 +14,11 @@ class Client(edn_client.Client):
     the server and register callbacks to be called on responses to those
     messages."""
 
-    def __init__(self, default_handler):
-        """Given a default response message handler function, initialize a new
+    def __init__(self, default_handler, metrics=None):
+        """Given a default response message handler function and, optionally,
+        a metrics instance to share with another client, initialize a new
         backchannel client."""
-        super().__init__(default_handler)
+        super().__init__(default_handler, metrics)
         self.sendq = Queue()
 
     def send_loop(self, sock: socket.SocketType, buffer: IO):
@@ -30,7 +30,7 @@ class Client(edn_client.Client):
         try:
             while message := self.sendq.get():
                 log.debug({"event": "backchannel/send", "message": message})
-                edn.write_line(buffer, message)
+                self.write_message(buffer, message)
         except OSError as error:
             log.error({"event": "send_error", "error": error})
         finally:
@@ -49,7 +49,7 @@ class Client(edn_client.Client):
         file object and calls the handler function of this backchannel client
         on every message."""
         try:
-            while message := edn.read_line(buffer):
+            while message := self.read_message(buffer):
                 log.debug({"event": "backchannel/recv", "message": message})
                 self.handle(message)
         except OSError as error:
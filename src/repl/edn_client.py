@@ -1,22 +1,26 @@
 from abc import ABC
+import io
 import itertools
 from threading import Lock
 
 from ...api import edn
 from ..log import log
+from .metrics import Metrics
 
 
 class Client(ABC):
-    def __init__(self, default_handler):
+    def __init__(self, default_handler, metrics=None):
         self.handlers = {}
         self.message_id = itertools.count(1)
         self.default_handler = default_handler
         self.lock = Lock()
+        self.metrics = metrics or Metrics()
 
     def register_handler(self, message, handler):
         message = edn.kwmap(message)
         message_id = next(self.message_id)
         message[edn.Keyword("id")] = message_id
+        self.metrics.register(message_id, message.get(edn.Keyword("op")))
 
         if handler:
             with self.lock:
@@ -24,6 +28,32 @@ class Client(ABC):
 
         return message
 
+    def write_message(self, buffer, message):
+        """Given a file object and a message (a dict), write the message as a
+        line of EDN into the file object."""
+        string = io.StringIO()
+        edn.write1(string, message)
+        string.write("\n")
+        line = string.getvalue()
+        buffer.write(line)
+        buffer.flush()
+        self.metrics.sent(message.get(edn.Keyword("id")), len(line.encode("utf-8")))
+
+    def read_message(self, buffer):
+        """Given a file object, read a line of EDN from the file object and
+        return the EDN value."""
+        if line := buffer.readline():
+            message = edn.read(line)
+
+            if isinstance(message, dict):
+                self.metrics.received(
+                    message.get(edn.Keyword("id")),
+                    len(line.encode("utf-8")),
+                    message.get(edn.Keyword("timing")),
+                )
+
+            return message
+
     def handle(self, message):
         """Given a message, call the handler function registered for the
         message in this backchannel instance.
@@ -46,5 +76,7 @@ class Client(ABC):
                 finally:
                     with self.lock:
                         self.handlers.pop(id, None)
+
+                    self.metrics.handled(id)
         except AttributeError:
             raise ValueError(f"Got invalid message: {message}")
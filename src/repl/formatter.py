@@ -20,7 +20,12 @@ def err_string(val):
     return "⁣⁣" + val + "⁣⁣"
 
 
-def format(item):
+def format(item, sentinels=True):
+    """Format an item for printing.
+
+    If `sentinels=False`, do not wrap stdout and stderr in invisible Unicode
+    characters. In that case, the printer is responsible for marking stdout
+    and stderr (see the `spans` module)."""
     if isinstance(item, str):
         return {TAG: RET, VAL: item.replace("\r", "")}
     elif isinstance(item, dict):
@@ -28,9 +33,9 @@ def format(item):
         val = item.get(VAL, "").replace("\r", "")
         item[VAL] = val
 
-        if tag == OUT:
+        if sentinels and tag == OUT:
             item[VAL] = out_string(val)
-        elif tag == ERR:
+        elif sentinels and tag == ERR:
             item[VAL] = err_string(val)
 
         return item
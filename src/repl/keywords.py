@@ -8,6 +8,8 @@ PROMPT = edn.Keyword("prompt")
 RET = edn.Keyword("ret")
 VAL = edn.Keyword("val")
 TAP = edn.Keyword("tap")
+TAP_ID = edn.Keyword("tap-id")
+DROPPED = edn.Keyword("dropped")
 PRINT = edn.Keyword("print")
 
 OUTPUT = edn.Keyword("output")
@@ -0,0 +1,151 @@
+import math
+import time
+from collections import defaultdict, deque
+from threading import Lock
+
+from ...api import edn
+
+# The maximum number of samples to keep per op and measurement.
+MAX_SAMPLES = 1000
+
+# The maximum number of in-flight messages to keep track of. Some ops (e.g.
+# :interrupt) never get a response.
+MAX_PENDING = 1000
+
+MEASUREMENTS = (
+    "queue_wait",
+    "latency",
+    "handler",
+    "total",
+    "server_queued",
+    "server_handle",
+    "server_print",
+    "network",
+)
+
+QUEUED_MS = edn.Keyword("queued-ms")
+HANDLE_MS = edn.Keyword("handle-ms")
+PRINT_MS = edn.Keyword("print-ms")
+
+
+def percentile(samples, p):
+    """Given a sequence of samples and a percentile (0–100), return the
+    nearest-rank percentile of the samples, or None if there are no samples."""
+    if samples:
+        ordered = sorted(samples)
+        rank = max(math.ceil(p / 100 * len(ordered)), 1)
+        return ordered[rank - 1]
+
+
+class OpStats:
+    def __init__(self):
+        self.count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.samples = {
+            measurement: deque([], MAX_SAMPLES) for measurement in MEASUREMENTS
+        }
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            **{
+                f"{measurement}_ms": {
+                    f"p{p}": percentile(samples, p) for p in (50, 95, 99)
+                }
+                for measurement, samples in self.samples.items()
+            },
+        }
+
+
+class Metrics:
+    """Per-op latency and throughput metrics for the messages an EDN client
+    sends and receives.
+
+    Records four timestamps for each message:
+
+    - registered: when the client registers a handler for the message
+    - sent: when the send loop writes the message into the socket
+    - received: when the client receives the response to the message
+    - handled: when the response handler returns
+
+    From these, derives the time the message spent in the send queue
+    (queue_wait), the round-trip time (latency), the time spent in the response
+    handler (handler), and the total time (total), all in milliseconds.
+
+    If the server attaches its own timings to the response (see the
+    `server_timing` setting), also records the time the message spent queued
+    on the server (server_queued), the time the server spent handling the
+    message (server_handle) and pretty-printing the result (server_print), and
+    what remains of the round-trip time after subtracting the server-side
+    timings (network): the time spent in transit and decoding."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.pending = {}
+        self.ops = defaultdict(OpStats)
+
+    def register(self, message_id, op):
+        with self.lock:
+            if len(self.pending) >= MAX_PENDING:
+                self.pending.pop(next(iter(self.pending)))
+
+            self.pending[message_id] = {
+                "op": op.name if isinstance(op, edn.Keyword) else str(op),
+                "registered": time.perf_counter(),
+            }
+
+    def sent(self, message_id, nbytes):
+        with self.lock:
+            if timings := self.pending.get(message_id):
+                timings["sent"] = time.perf_counter()
+                self.ops[timings["op"]].bytes_sent += nbytes
+
+    def received(self, message_id, nbytes, server_timing=None):
+        with self.lock:
+            if timings := self.pending.get(message_id):
+                timings.setdefault("received", time.perf_counter())
+                self.ops[timings["op"]].bytes_received += nbytes
+
+                if server_timing:
+                    timings.setdefault("server", server_timing)
+
+    def handled(self, message_id):
+        now = time.perf_counter()
+
+        with self.lock:
+            timings = self.pending.pop(message_id, None)
+
+            if timings and "received" in timings:
+                stats = self.ops[timings["op"]]
+                stats.count += 1
+                registered = timings["registered"]
+                sent = timings.get("sent", registered)
+                received = timings["received"]
+                stats.samples["queue_wait"].append((sent - registered) * 1000)
+                stats.samples["latency"].append((received - sent) * 1000)
+                stats.samples["handler"].append((now - received) * 1000)
+                stats.samples["total"].append((now - registered) * 1000)
+
+                if server := timings.get("server"):
+                    queued = server.get(QUEUED_MS, 0)
+                    handle = server.get(HANDLE_MS, 0)
+                    printing = server.get(PRINT_MS, 0)
+                    stats.samples["server_queued"].append(queued)
+                    stats.samples["server_handle"].append(handle)
+                    stats.samples["server_print"].append(printing)
+                    stats.samples["network"].append(
+                        max((received - sent) * 1000 - queued - handle - printing, 0)
+                    )
+
+    def snapshot(self):
+        """Return a dict of op name to the stats of the op."""
+        with self.lock:
+            return {op: stats.to_dict() for op, stats in sorted(self.ops.items())}
+
+    def reset(self):
+        with self.lock:
+            self.pending.clear()
+            self.ops.clear()
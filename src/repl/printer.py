@@ -2,8 +2,8 @@ import sublime
 
 from .. import settings, state
 from ..log import log
-from . import views
-from .keywords import ERR, RET, IN, TAG, TAP, VAL
+from . import sink, spans, taps, views
+from .keywords import DROPPED, ERR, RET, IN, OUT, TAG, TAP, TAP_ID, VAL
 
 
 def show_repl_panel(view):
@@ -30,22 +30,46 @@ def append_to_view(view, characters):
         view.run_command("move_to", {"to": "eof"})
 
 
-def append_to_tap_panel(view, val):
+def append_to_tap_panel(view, val, client=None, item=None):
+    item = item or {}
+
     if settings.load().get("tap_panel", False):
         window = view.window() or sublime.active_window()
         views.show_tap_panel(view)
         panel = window.find_output_panel(views.tap_panel_name(view))
+
+        if dropped := item.get(DROPPED):
+            append_to_view(panel, f";; Dropped {dropped} tapped value(s).\n")
+
         append_to_view(panel, val)
 
+        # The runtime only sends a summary of the tapped value. Remember where
+        # the summary is so that we can replace it with the full value later.
+        if panel and val and client and (tap_id := item.get(TAP_ID)) is not None:
+            begin = panel.size() - len(val)
+            region = sublime.Region(begin, begin + len(val.rstrip("\n")))
+            taps.add(panel, client.id, tap_id, region)
 
-def print_item(view, item):
+
+def print_item(view, item, client=None):
     characters = item.get(VAL)
+    tag = item.get(TAG)
 
-    if item.get(TAG) == TAP:
-        append_to_tap_panel(view, characters)
+    if tag == TAP:
+        append_to_tap_panel(view, characters, client, item)
     else:
         append_to_view(view, characters)
 
+        if (
+            view
+            and characters
+            and tag in {OUT, ERR}
+            and client
+            and not client.uses_sentinels()
+        ):
+            end = view.size()
+            spans.add(view, tag, end - len(characters), end)
+
 
 TAG_ICONS = {
     IN: "chevron-right",
@@ -87,15 +111,36 @@ def add_gutter_marks(view, client, item):
             )
 
 
+def add_log_link(view, path):
+    """Add a link for opening the given output log file at the end of the
+    given view."""
+    point = max(view.size() - 1, 0)
+    href = sublime.command_url("tutkain_open_output_log", args={"path": path})
+
+    view.add_phantom(
+        "tutkain/output_log",
+        sublime.Region(point, point),
+        f"""<a href="{href}">Open log</a>""",
+        sublime.LAYOUT_INLINE,
+    )
+
+
 def print_loop(view, client, options={"gutter_marks": True}):
+    output_sink = sink.make_sink(client)
+
     try:
         log.debug({"event": "thread/start"})
 
         while item := client.printq.get():
-            print_item(view, item)
+            for item in output_sink.process(item) if output_sink else [item]:
+                print_item(view, item, client)
+
+                if options.get("gutter_marks", True):
+                    add_gutter_marks(view, client, item)
 
-            if options.get("gutter_marks", True):
-                add_gutter_marks(view, client, item)
+                if view and (path := item.get(sink.LOG)):
+                    add_log_link(view, path)
 
     finally:
+        output_sink and output_sink.close()
         log.debug({"event": "thread/exit"})
@@ -0,0 +1,223 @@
+import mmap
+import os
+import re
+import time
+
+import sublime
+
+from ...api import edn
+from ..log import log
+from . import formatter
+from .keywords import ERR, OUT, RET, TAG, VAL
+
+LOG = edn.Keyword("log")
+
+# The amount of spilled output to keep in memory for showing the tail.
+TAIL_CHARS = 8192
+
+
+def log_dir():
+    return os.path.join(sublime.cache_path(), "Tutkain", "logs")
+
+
+def log_path(client_id):
+    """Given a client ID, return the path to the output log file of the
+    client."""
+    return os.path.join(log_dir(), f"{client_id}.log")
+
+
+def prune_logs(keep, directory=None):
+    """Given a number of log files to keep, delete every output log file in
+    the directory (by default, log_dir) but the most recently modified
+    ones."""
+    try:
+        entries = [
+            entry
+            for entry in os.scandir(directory or log_dir())
+            if entry.is_file() and entry.name.endswith(".log")
+        ]
+
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+
+        for entry in entries[keep:]:
+            os.remove(entry.path)
+    except FileNotFoundError:
+        pass
+    except OSError as error:
+        log.error({"event": "error", "error": error})
+
+
+class Sink:
+    """An output sink that redirects stdout and stderr into an append-only log
+    file when there's too much of it.
+
+    If the rate (characters per second) or the size (characters per
+    evaluation) of the output exceeds a threshold, the sink writes the output
+    into the log file instead of the REPL view. Once the evaluation finishes or
+    the output slows down, the sink prints the tail of the spilled output into
+    the REPL view."""
+
+    def __init__(
+        self,
+        path,
+        sentinels=True,
+        max_rate=1000000,
+        max_size=5000000,
+        tail_lines=20,
+    ):
+        self.path = path
+        self.sentinels = sentinels
+        self.max_rate = max_rate
+        self.max_size = max_size
+        self.tail_lines = tail_lines
+        self.file = None
+        self.size = 0
+        self.spilled = 0
+        self.tail = ""
+        self.window_start = time.monotonic()
+        self.window_size = 0
+
+    def is_spilling(self):
+        return self.file is not None
+
+    def rate_exceeded(self, n):
+        now = time.monotonic()
+
+        if now - self.window_start >= 1.0:
+            exceeded = self.window_size > self.max_rate
+            self.window_start = now
+            self.window_size = n
+            return exceeded
+        else:
+            self.window_size += n
+            return self.window_size > self.max_rate
+
+    def message(self, tag, val, log=None):
+        item = {TAG: tag, VAL: val}
+
+        if log:
+            item[LOG] = log
+
+        return formatter.format(item, self.sentinels)
+
+    def start(self, val):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.spilled = 0
+
+        return self.message(
+            ERR,
+            f"[Tutkain] Too much output; writing output into {self.path}\n",
+            log=self.path,
+        )
+
+    def stop(self):
+        self.file.close()
+        self.file = None
+        lines = self.tail.splitlines(keepends=True)[-self.tail_lines :]
+        self.tail = ""
+
+        return [
+            self.message(OUT, "".join(lines)),
+            self.message(
+                ERR,
+                f"[Tutkain] Wrote {self.spilled} characters into {self.path}\n",
+                log=self.path,
+            ),
+        ]
+
+    def spill(self, val):
+        self.file.write(val)
+        self.file.flush()
+        self.spilled += len(val)
+        self.tail = (self.tail + val)[-TAIL_CHARS:]
+
+    def process(self, item):
+        """Given an item from the print queue, return a list of items to print
+        into the REPL view."""
+        tag = item.get(TAG)
+
+        if tag in {OUT, ERR}:
+            val = item.get(VAL, "").replace("\u2063", "")
+            self.size += len(val)
+            rate_exceeded = self.rate_exceeded(len(val))
+
+            if self.is_spilling():
+                self.spill(val)
+
+                if not rate_exceeded and self.size <= self.max_size:
+                    return self.stop()
+                else:
+                    return []
+            elif rate_exceeded or self.size > self.max_size:
+                notice = self.start(val)
+                self.spill(val)
+                return [notice]
+            else:
+                return [item]
+        else:
+            items = self.stop() if self.is_spilling() else []
+
+            if tag == RET:
+                self.size = 0
+
+            return items + [item]
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def make_sink(client):
+    """Given a client, return an output sink for the client, or None if the
+    client prints all output into the REPL view."""
+    options = client.options.get("output_sink", {})
+
+    if options.get("mode", "view") == "file":
+        return Sink(
+            log_path(client.id),
+            sentinels=client.uses_sentinels(),
+            max_rate=options.get("max_rate", 1000000),
+            max_size=options.get("max_size", 5000000),
+            tail_lines=options.get("tail_lines", 20),
+        )
+
+
+def search(path, pattern, limit=1000):
+    """Given a path to a log file and a regular expression, return a list of
+    (line number, line) pairs for every line in the file that matches the
+    regular expression.
+
+    Memory-maps the file instead of reading it into memory."""
+    results = []
+
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return results
+
+    regex = re.compile(pattern.encode("utf-8"))
+
+    with open(path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buffer:
+        line_number = 0
+        position = 0
+
+        for match in regex.finditer(buffer):
+            begin = buffer.rfind(b"\n", 0, match.start()) + 1
+
+            if results and begin == position:
+                # Already found a match on this line.
+                continue
+
+            line_number += buffer[position:begin].count(b"\n")
+            end = buffer.find(b"\n", match.end())
+            end = len(buffer) if end == -1 else end
+            line = buffer[begin:end].decode("utf-8", errors="replace")
+            results.append((line_number + 1, line))
+            position = begin
+
+            if len(results) >= limit:
+                break
+
+    return results
@@ -0,0 +1,152 @@
+from array import array
+from threading import Lock
+
+import sublime
+
+from .keywords import ERR, OUT
+
+# Render at most once per frame (~60 FPS).
+FRAME_MS = 16
+
+STREAMS = {OUT: 0, ERR: 1}
+
+SCOPES = {
+    OUT: "tutkain.repl.stdout",
+    ERR: "tutkain.repl.stderr",
+}
+
+
+# The number of spans whose regions share a region key. Sublime Text
+# replaces every region of a key at once, so a flush only re-adds the regions
+# of the chunks of spans that have changed since the last flush.
+CHUNK_SIZE = 256
+
+
+def region_key(tag, chunk):
+    return f"tutkain_output/{tag.name}/{chunk}"
+
+
+class SpanIndex:
+    """An append-only index of the spans of stdout and stderr output in a REPL
+    view.
+
+    Stores the spans in flat arrays and merges adjacent spans that belong to
+    the same stream, so that a long stream of output only takes up a single
+    span."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.begins = array("q")
+        self.ends = array("q")
+        self.streams = array("b")
+        self.dirty = set()
+        # The index of the first span that has changed since the last flush.
+        self.changed = 0
+        self.scheduled = False
+
+    def __len__(self):
+        return len(self.begins)
+
+    def add(self, tag, begin, end):
+        """Given a tag (:out or :err) and the begin and end points of a span,
+        add the span into this index."""
+        if begin < end and (stream := STREAMS.get(tag)) is not None:
+            with self.lock:
+                if (
+                    self.streams
+                    and self.streams[-1] == stream
+                    and self.ends[-1] == begin
+                ):
+                    self.ends[-1] = end
+                    self.changed = min(self.changed, len(self.begins) - 1)
+                else:
+                    self.changed = min(self.changed, len(self.begins))
+                    self.begins.append(begin)
+                    self.ends.append(end)
+                    self.streams.append(stream)
+
+                self.dirty.add(tag)
+
+    def chunks(self):
+        """Return the number of chunks of spans in this index (see
+        CHUNK_SIZE)."""
+        with self.lock:
+            return -(-len(self.begins) // CHUNK_SIZE)
+
+    def regions(self, tag, chunk=None):
+        """Given a tag and, optionally, the number of a chunk of spans, return
+        a list of Regions for every span of that tag, or for every span of
+        that tag in the chunk."""
+        stream = STREAMS[tag]
+
+        if chunk is None:
+            first, last = 0, None
+        else:
+            first, last = chunk * CHUNK_SIZE, (chunk + 1) * CHUNK_SIZE
+
+        with self.lock:
+            return [
+                sublime.Region(begin, end)
+                for begin, end, s in zip(
+                    self.begins[first:last],
+                    self.ends[first:last],
+                    self.streams[first:last],
+                )
+                if s == stream
+            ]
+
+    def take_dirty(self):
+        """Return a tuple of the tags whose spans have changed since the last
+        call and the number of the first chunk of spans that has changed."""
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            changed, self.changed = self.changed, len(self.begins)
+            self.scheduled = False
+            return dirty, changed // CHUNK_SIZE
+
+
+__indices = {}
+
+
+def get(view):
+    return __indices.setdefault(view.id(), SpanIndex())
+
+
+def flush(view):
+    """Add a region for each span of output in the given view that has
+    changed since the last flush."""
+    if index := __indices.get(view.id()):
+        dirty, first = index.take_dirty()
+
+        for tag in dirty:
+            for chunk in range(first, index.chunks()):
+                view.add_regions(
+                    region_key(tag, chunk),
+                    index.regions(tag, chunk),
+                    scope=SCOPES[tag],
+                    flags=sublime.DRAW_NO_OUTLINE,
+                )
+
+
+def add(view, tag, begin, end):
+    """Given a view, a tag, and the begin and end points of a span of output,
+    add the span into the span index of the view and schedule a flush for the
+    next frame, unless one is already pending."""
+    index = get(view)
+    index.add(tag, begin, end)
+
+    with index.lock:
+        if index.scheduled:
+            return
+
+        index.scheduled = True
+
+    sublime.set_timeout(lambda: flush(view), FRAME_MS)
+
+
+def reset(view):
+    """Forget every span of output in the given view."""
+    if view and (index := __indices.pop(view.id(), None)):
+        for chunk in range(index.chunks()):
+            for tag in STREAMS:
+                view.erase_regions(region_key(tag, chunk))
@@ -0,0 +1,76 @@
+from collections import defaultdict, deque
+from typing import Tuple, Union
+
+import sublime
+from sublime import Region, View
+
+from ...api import edn
+from .keywords import ERR, TAG, VAL
+
+MAX_TAPS = 1000
+
+# A map of view ID to a deque of (client ID, tap ID) pairs, oldest first.
+__taps = defaultdict(lambda: deque([], MAX_TAPS))
+
+
+def region_key(client_id: str, tap_id: int) -> str:
+    return f"tutkain_tap/{client_id}/{tap_id}"
+
+
+def add(view: View, client_id: str, tap_id: int, region: Region) -> None:
+    """Given a tap panel, a client ID, a tap ID, and the Region of the summary
+    of the tapped value in the tap panel, remember the tap so that we can
+    fetch its full value later."""
+    taps = __taps[view.id()]
+
+    if len(taps) == taps.maxlen:
+        view.erase_regions(region_key(*taps[0]))
+
+    taps.append((client_id, tap_id))
+    view.add_regions(region_key(client_id, tap_id), [region], flags=sublime.HIDDEN)
+
+
+def find(view: View, point: int) -> Union[Tuple[str, int, Region], None]:
+    """Given a tap panel and a point, return a (client ID, tap ID, Region)
+    triple for the tap summary that contains the point, if any."""
+    for client_id, tap_id in reversed(__taps.get(view.id(), [])):
+        if (regions := view.get_regions(region_key(client_id, tap_id))) and regions[
+            0
+        ].contains(point):
+            return client_id, tap_id, regions[0]
+
+
+def forget(view: View, client_id: str, tap_id: int) -> None:
+    view.erase_regions(region_key(client_id, tap_id))
+
+    if (taps := __taps.get(view.id())) and (client_id, tap_id) in taps:
+        taps.remove((client_id, tap_id))
+
+
+def reset(view: View) -> None:
+    """Forget every tap in the given tap panel."""
+    if view and (taps := __taps.pop(view.id(), None)):
+        for client_id, tap_id in taps:
+            view.erase_regions(region_key(client_id, tap_id))
+
+
+def expand(view: View, client_id: str, tap_id: int, response: dict) -> None:
+    """Given a tap panel, a client ID, a tap ID, and a :tap-value op response,
+    replace the summary of the tapped value with the full value."""
+    if response.get(TAG) == ERR:
+        if window := view.window():
+            window.status_message(f"⚠ {response.get(VAL, '').strip()}")
+    elif (regions := view.get_regions(region_key(client_id, tap_id))) and (
+        val := response.get(VAL)
+    ):
+        view.set_read_only(False)
+        view.run_command(
+            "tutkain_replace_region_impl",
+            {"region": regions[0].to_tuple(), "string": val.rstrip("\n")},
+        )
+        view.set_read_only(True)
+        forget(view, client_id, tap_id)
+
+
+def value_op(tap_id: int) -> dict:
+    return {"op": edn.Keyword("tap-value"), "tap-id": tap_id}
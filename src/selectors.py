@@ -1,3 +1,10 @@
+import itertools
+import re
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Union
 
 import sublime
@@ -9,20 +16,388 @@ SEXP_END = "punctuation.section.parens.end | punctuation.section.brackets.end |
 
 
 def inside_string(view, point):
-    return view.match_selector(point, "string - punctuation.definition.string.begin")
+    return match_selector(view, point, "string - punctuation.definition.string.begin")
 
 
 def inside_comment(view, point):
-    return view.match_selector(point, "comment.line")
+    return match_selector(view, point, "comment.line")
 
 
 def ignore(view, point):
-    return view.match_selector(
+    return match_selector(
+        view,
         point,
         "string - punctuation.definition.string.begin | comment.line",
     )
 
 
+# The generation of the settings of each View, by View ID.
+__generations = {}
+__generation_counter = itertools.count()
+
+
+def bump_generation(key):
+    if key in __generations:
+        __generations[key] = next(__generation_counter)
+
+
+def generation(view: View) -> int:
+    """Given a View, return a number that changes whenever the settings of the
+    View change.
+
+    Assigning a syntax to a View changes its settings but not its change
+    count. The first call adds a callback to the settings of the View that
+    bumps the generation, so checking whether the syntax of a View has changed
+    costs a dictionary lookup instead of a call to the Sublime Text API."""
+    key = view.id()
+
+    if (n := __generations.get(key)) is None:
+        n = __generations[key] = next(__generation_counter)
+        view.settings().add_on_change(__name__, lambda: bump_generation(key))
+
+    return n
+
+
+# The number of characters of a View to read the tokens of at a time.
+PAGE_SIZE = 4096
+
+
+class Tokens:
+    """The scoped tokens of a View.
+
+    Reads the tokens of the View one page at a time with
+    View.extract_tokens_with_scopes, the first time something asks for a
+    token on the page. Every point in a token has the same scope, so
+    functions that look for points that match a selector can check one token
+    at a time instead of one point at a time.
+
+    Do not initialize directly; use tokens instead."""
+
+    def __init__(self, view: View):
+        self.change_count = view.change_count()
+        self.generation = generation(view)
+        self.size = view.size()
+        self.pages = {}
+
+    def is_current(self, view: View):
+        """Return True if the View has neither changed nor had its syntax
+        changed since these Tokens were read."""
+        stats.validations += 1
+        return self.change_count == view.change_count()
+
+    def page(self, view: View, n):
+        """Given a View and a page number, return a tuple of the begin
+        points, the end points, and the scopes of the tokens on the page."""
+        if (page := self.pages.get(n)) is None:
+            page_begin = n * PAGE_SIZE
+            page_end = min(page_begin + PAGE_SIZE, self.size)
+            begins = array("q")
+            ends = array("q")
+            scopes = []
+
+            for region, scope in view.extract_tokens_with_scopes(
+                Region(page_begin, page_end)
+            ):
+                # Clip tokens that cross the page boundary.
+                begin = max(region.begin(), page_begin)
+                end = min(region.end(), page_end)
+
+                if begin < end:
+                    begins.append(begin)
+                    ends.append(end)
+                    scopes.append(scope)
+
+            page = (begins, ends, scopes)
+            self.pages[n] = page
+            stats.host_calls += 1
+
+        return page
+
+    def scope_at(self, view: View, point):
+        """Given a View and a point, return the scope of the token that
+        contains the point, or None if the point is at the end of the View."""
+        if 0 <= point < self.size:
+            begins, _, scopes = self.page(view, point // PAGE_SIZE)
+            return scopes[bisect_right(begins, point) - 1]
+
+    def forward(self, view: View, point):
+        """Given a View and a point, yield a (begin, end, scope) tuple for the
+        token that contains the point and for every token after it."""
+        for n in range(point // PAGE_SIZE, (self.size - 1) // PAGE_SIZE + 1):
+            begins, ends, scopes = self.page(view, n)
+
+            for index in range(max(bisect_right(begins, point) - 1, 0), len(begins)):
+                if ends[index] > point:
+                    yield begins[index], ends[index], scopes[index]
+
+    def backward(self, view: View, point):
+        """Given a View and a point, yield a (begin, end, scope) tuple for the
+        token that contains the point and for every token before it."""
+        for n in range(min(point, self.size - 1) // PAGE_SIZE, -1, -1):
+            begins, ends, scopes = self.page(view, n)
+
+            for index in range(bisect_right(begins, point) - 1, -1, -1):
+                yield begins[index], ends[index], scopes[index]
+
+
+__tokens = {}
+
+# The IDs of the Views whose Tokens are pinned.
+__pinned = set()
+
+
+def tokens(view: View) -> Tokens:
+    """Given a View, return the Tokens of the View, discarding the tokens read
+    earlier if the View or its syntax has changed since."""
+    key = view.id()
+    cached = __tokens.get(key)
+
+    if (
+        cached is None
+        or cached.generation != generation(view)
+        or (key not in __pinned and not cached.is_current(view))
+    ):
+        cached = Tokens(view)
+        __tokens[key] = cached
+
+    return cached
+
+
+def is_pinned(view: View) -> bool:
+    """Given a View, return True if the Tokens of the View are pinned."""
+    return view.id() in __pinned
+
+
+@contextmanager
+def pinned(view: View):
+    """Given a View, check whether the View has changed once, at the start of
+    the block, instead of on every lookup within the block.
+
+    Only use around code that does not edit the View."""
+    key = view.id()
+
+    if key in __pinned:
+        yield
+    else:
+        tokens(view)
+        __pinned.add(key)
+
+        try:
+            yield
+        finally:
+            __pinned.discard(key)
+
+
+def forget(view: View):
+    """Given a View, discard the Tokens of the View."""
+    key = view.id()
+    __tokens.pop(key, None)
+
+    if __generations.pop(key, None) is not None:
+        view.settings().clear_on_change(__name__)
+
+
+SELECTOR_TOKEN = re.compile(r"\s*(?:([()|,&-])|([^\s()|,&-][^\s()|,&]*))")
+SELECTOR_OPERATORS = {"(", ")", "|", ",", "&", "-"}
+
+
+class Selector:
+    """A compiled scope selector.
+
+    Matches scopes in Python with the semantics of sublime.score_selector,
+    which saves a call to the Sublime Text API per match. Supports scope
+    paths (e.g. "source.clojure meta.sexp"), unions ("|" or ","),
+    intersections ("&"), differences ("-"), and grouping with parentheses.
+
+    Do not initialize directly; use compile_selector instead."""
+
+    def __init__(self, source):
+        self.source = source
+        self.tokens = [
+            match.group(1) or match.group(2)
+            for match in SELECTOR_TOKEN.finditer(source)
+            if match.group(1) or match.group(2)
+        ]
+        self.position = 0
+        # The selector as a tree of tuples whose first item is the operator.
+        self.tree = self.parse_union() if self.tokens else ("all",)
+
+        if self.position != len(self.tokens):
+            raise ValueError(f"Invalid selector: {source}")
+
+    def __repr__(self):
+        return f"Selector({self.source!r})"
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+
+    def next(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse_union(self):
+        operands = [self.parse_operation()]
+
+        while self.peek() in {"|", ","}:
+            self.next()
+            operands.append(self.parse_operation())
+
+        return ("or", operands) if len(operands) > 1 else operands[0]
+
+    def parse_operation(self):
+        left = ("all",) if self.peek() == "-" else self.parse_operand()
+
+        while (operator := self.peek()) in {"&", "-"}:
+            self.next()
+            left = ("and" if operator == "&" else "minus", left, self.parse_operand())
+
+        return left
+
+    def parse_operand(self):
+        if self.peek() == "-":
+            self.next()
+            return ("minus", ("all",), self.parse_operand())
+        elif self.peek() == "(":
+            self.next()
+            operand = self.parse_union()
+
+            if self.next() != ")":
+                raise ValueError(f"Unbalanced parentheses in selector: {self.source}")
+
+            return operand
+
+        atoms = []
+
+        while (token := self.peek()) is not None and token not in SELECTOR_OPERATORS:
+            atoms.append(token)
+            self.next()
+
+        if not atoms:
+            raise ValueError(f"Invalid selector: {self.source}")
+
+        return ("path", atoms)
+
+    def match(self, scope):
+        """Given a scope, return True if this selector matches the scope."""
+        return evaluate(self.tree, scope.split())
+
+
+def evaluate(tree, names):
+    operator = tree[0]
+
+    if operator == "path":
+        return match_path(tree[1], names)
+    elif operator == "or":
+        return any(evaluate(operand, names) for operand in tree[1])
+    elif operator == "and":
+        return evaluate(tree[1], names) and evaluate(tree[2], names)
+    elif operator == "minus":
+        return evaluate(tree[1], names) and not evaluate(tree[2], names)
+    else:
+        return True
+
+
+def match_atom(atom, name):
+    return name == atom or (name.startswith(atom) and name[len(atom)] == ".")
+
+
+def match_path(atoms, names):
+    """Given a list of scope selector atoms and a list of scope names, return
+    True if the atoms match the names in order."""
+    index = 0
+
+    for name in names:
+        if match_atom(atoms[index], name):
+            index += 1
+
+            if index == len(atoms):
+                return True
+
+    return False
+
+
+@lru_cache(maxsize=512)
+def compile_selector(selector) -> Selector:
+    """Given a scope selector, return a compiled Selector."""
+    return Selector(selector)
+
+
+__matches = {}
+
+
+def matches(scope, selector):
+    """Given a scope and a selector, return True if the selector matches the
+    scope."""
+    key = (scope, selector)
+
+    if (match := __matches.get(key)) is None:
+        if len(__matches) >= 65536:
+            __matches.clear()
+
+        match = compile_selector(selector).match(scope)
+        __matches[key] = match
+
+    return match
+
+
+@dataclass
+class Stats:
+    """Counts of the scope lookups selectors.match_selector answers and the
+    calls to the Sublime Text API it makes to answer them: the calls that read
+    scopes and the calls that check whether the View has changed."""
+
+    lookups: int = 0
+    host_calls: int = 0
+    validations: int = 0
+
+    def saved(self):
+        """Return the number of calls to the Sublime Text API the cache has
+        saved."""
+        return self.lookups - self.host_calls - self.validations
+
+    def to_dict(self):
+        return {
+            "lookups": self.lookups,
+            "host_calls": self.host_calls,
+            "validations": self.validations,
+            "saved": self.saved(),
+        }
+
+
+stats = Stats()
+
+
+def reset_stats():
+    stats.lookups = 0
+    stats.host_calls = 0
+    stats.validations = 0
+
+
+def scope_name(view: View, point: int) -> str:
+    """Like View.scope_name, but read the scope from the Tokens of the View."""
+    stats.lookups += 1
+
+    if (scope := tokens(view).scope_at(view, point)) is None:
+        stats.host_calls += 1
+        scope = view.scope_name(point)
+
+    return scope
+
+
+def match_selector(view: View, point: int, selector: str) -> bool:
+    """Like View.match_selector, but read the scope from the Tokens of the View
+    and match the selector against it in Python."""
+    stats.lookups += 1
+
+    if (scope := tokens(view).scope_at(view, point)) is None:
+        stats.host_calls += 1
+        return view.match_selector(point, selector)
+
+    return matches(scope, selector)
+
+
 def find(view, start_point, selector, forward=True, stop_at=None):
     """Given a View, a start point, and a selector, return the first point
     to the right of the start point that matches the selector.
@@ -34,17 +409,38 @@ def find(view, start_point, selector, forward=True, stop_at=None):
     point = start_point if forward else start_point - 1
     max_size = view.size()
 
-    while point >= 0 and point <= max_size:
+    if point < 0 or point > max_size:
+        return -1
+
+    # The end of the View isn't part of any token.
+    if not forward and point == max_size:
         if stop_at and view.match_selector(point, stop_at):
             return None
 
         if view.match_selector(point, selector):
             return point
 
-        if forward:
-            point += 1
-        else:
-            point -= 1
+        point -= 1
+
+    view_tokens = tokens(view)
+
+    for begin, end, scope in (
+        view_tokens.forward(view, point)
+        if forward
+        else view_tokens.backward(view, point)
+    ):
+        if stop_at and matches(scope, stop_at):
+            return None
+
+        if matches(scope, selector):
+            return max(begin, point) if forward else min(end - 1, point)
+
+    if forward:
+        if stop_at and view.match_selector(max_size, stop_at):
+            return None
+
+        if view.match_selector(max_size, selector):
+            return max_size
 
     return -1
 
@@ -59,31 +455,25 @@ def expand_by_selector(view, start_point, selector):
     if int(sublime.version()) >= 4131:
         return view.expand_to_scope(start_point, selector)
     else:
-        if not view.match_selector(start_point, selector):
-            return None
+        view_tokens = tokens(view)
+        begin = end = None
 
-        point = start_point
-        max_point = view.size()
-        begin = 0
-        end = max_point
-
-        while point > 0:
-            if view.match_selector(point, selector) and not view.match_selector(
-                point - 1, selector
-            ):
-                begin = point
+        for token_begin, token_end, scope in view_tokens.forward(view, start_point):
+            if not matches(scope, selector):
                 break
-            else:
-                point -= 1
+            elif begin is None:
+                begin = token_begin
 
-        while point < max_point:
-            if view.match_selector(point - 1, selector) and not view.match_selector(
-                point, selector
-            ):
-                end = point
+            end = token_end
+
+        if begin is None:
+            return None
+
+        for token_begin, _, scope in view_tokens.backward(view, begin - 1):
+            if not matches(scope, selector):
                 break
-            else:
-                point += 1
+
+            begin = token_begin
 
         return Region(begin, end)
 
@@ -93,7 +483,7 @@ def match_many(view: View, point: int, *selectors: str):
     selector against the scope at the corresponding point. Return `True` iff
     each selector matches the point."""
     for index, selector in enumerate(selectors):
-        if not view.match_selector(point + index, selector):
+        if not match_selector(view, point + index, selector):
             return False
 
     return True
@@ -101,9 +491,23 @@ def match_many(view: View, point: int, *selectors: str):
 
 def filter_region(view: View, region: Region, selector: str) -> Union[Region, None]:
     """Given a View, a Region, and a selector, return a new Region that only
-    contains points that match the selector."""
-    points = range(region.begin(), region.end())
-    matching_points = list(filter(lambda n: view.match_selector(n, selector), points))
-    begin = matching_points[0]
-    end = matching_points[-1] + 1
-    return Region(begin, end)
+    contains points that match the selector.
+
+    If no point in the Region matches the selector, return None."""
+    begin = end = None
+
+    for token_begin, token_end, scope in tokens(view).forward(view, region.begin()):
+        token_begin = max(token_begin, region.begin())
+        token_end = min(token_end, region.end())
+
+        if token_begin >= token_end:
+            break
+
+        if matches(scope, selector):
+            if begin is None:
+                begin = token_begin
+
+            end = token_end
+
+    if begin is not None:
+        return Region(begin, end)
@@ -1,9 +1,12 @@
 import inspect
+import re
+from array import array
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
 
 from sublime import CLASS_WORD_START, Region, View
 
-from . import selectors
+from . import reader, selectors
 
 OPEN = {"(": ")", "[": "]", "{": "}"}
 CLOSE = {")": "(", "]": "[", "}": "{"}
@@ -75,7 +78,7 @@ def absorb_macro_characters(view: View, delimiter: Delimiter):
     precede the S-expression, if any."""
     begin = delimiter.region.begin()
 
-    if view.match_selector(begin - 1, ABSORB_SELECTOR):
+    if selectors.match_selector(view, begin - 1, ABSORB_SELECTOR):
         # Find the first point that contains a character other than a macro character or a
         # character that's part of a keyword
         boundary = (
@@ -95,31 +98,589 @@ def make_sexp(view: View, open_delim: Delimiter, close_delim: Delimiter):
     return Sexp(view, absorb_macro_characters(view, open_delim), close_delim)
 
 
+END_TO_BEGIN_SELECTOR = {v: k for k, v in BEGIN_TO_END_SELECTOR.items()}
+
+
+DELIMITER_SELECTORS = {
+    "(": "punctuation.section.parens.begin",
+    "[": "punctuation.section.brackets.begin",
+    "{": "punctuation.section.braces.begin",
+    ")": "punctuation.section.parens.end",
+    "]": "punctuation.section.brackets.end",
+    "}": "punctuation.section.braces.end",
+}
+
+DELIMITER_PATTERN = re.compile(r"[()\[\]{}]")
+
+
+class Pairs:
+    """Open delimiters paired with the close delimiters that close them."""
+
+    def __init__(self, delimiters):
+        """Given an iterable of (point, is_open, selector, in_string) tuples in
+        ascending order of point, pair every open delimiter with the close
+        delimiter that closes it."""
+        # The position of every open delimiter, in ascending order.
+        self.opens = array("q")
+        # The selector of every open delimiter.
+        self.selectors = []
+        # The position of the close delimiter that closes every open
+        # delimiter, or -1 if the open delimiter is unbalanced.
+        self.closes = array("q")
+        # The selector of the close delimiter that closes every open
+        # delimiter, or None if the open delimiter is unbalanced.
+        self.close_selectors = []
+        # The index of the open delimiter that encloses every open delimiter,
+        # or -1 if the open delimiter is at the top level.
+        self.parents = array("q")
+        # 1 if a delimiter of the same type closes every open delimiter and
+        # the open delimiter encloses only such pairs, -1 if it encloses a
+        # mismatched pair, 0 if it is unbalanced.
+        self.balanced = array("b")
+        # 1 if every open delimiter is inside a string (like the brackets of a
+        # character class in a regular expression), 0 otherwise.
+        self.strings = array("b")
+        # 1 if the close delimiter that closes every open delimiter is inside
+        # a string, 0 otherwise.
+        self.close_strings = array("b")
+        # The indices of the unbalanced open delimiters.
+        self.stack = []
+
+        for point, is_open, selector, in_string in delimiters:
+            if is_open:
+                index = len(self.opens)
+                self.opens.append(point)
+                self.selectors.append(selector)
+                self.strings.append(in_string)
+                self.closes.append(-1)
+                self.close_selectors.append(None)
+                self.close_strings.append(0)
+                self.parents.append(self.stack[-1] if self.stack else -1)
+                self.balanced.append(0)
+                self.stack.append(index)
+            elif self.stack:
+                index = self.stack.pop()
+                self.closes[index] = point
+                self.close_selectors[index] = selector
+                self.close_strings[index] = in_string
+
+                if END_TO_BEGIN_SELECTOR[selector] == self.selectors[index]:
+                    if self.balanced[index] != -1:
+                        self.balanced[index] = 1
+                else:
+                    # A mismatched pair taints every delimiter that encloses
+                    # it.
+                    for enclosing in (index, *self.stack):
+                        self.balanced[enclosing] = -1
+
+
+def find_delimiters(view: View):
+    """Given a View, return a list of (point, is_open, selector, in_string)
+    tuples for every delimiter in the View, in ascending order of point.
+
+    in_string is 1 if the delimiter is inside a string, 0 otherwise."""
+    delimiters = []
+    strings = view.find_by_selector("string")
+    string_begins = [region.begin() for region in strings]
+
+    for begin_selector, end_selector in BEGIN_TO_END_SELECTOR.items():
+        for selector, is_open in ((begin_selector, True), (end_selector, False)):
+            for region in view.find_by_selector(selector):
+                # find_by_selector merges adjacent delimiters of the same type
+                # into a single region.
+                for point in range(region.begin(), region.end()):
+                    n = bisect_right(string_begins, point) - 1
+                    in_string = int(n != -1 and point < strings[n].end())
+                    delimiters.append((point, is_open, selector, in_string))
+
+    delimiters.sort()
+    return delimiters
+
+
+def scan_delimiters(view: View, region: Region):
+    """Given a View and a Region, return a list of (point, is_open, selector,
+    in_string) tuples for every delimiter in the region, in ascending order of
+    point (see find_delimiters)."""
+    begin = region.begin()
+    delimiters = []
+
+    for match in DELIMITER_PATTERN.finditer(view.substr(region)):
+        point = begin + match.start()
+        char = match.group()
+        selector = DELIMITER_SELECTORS[char]
+
+        if selectors.match_selector(view, point, selector):
+            in_string = int(selectors.match_selector(view, point, "string"))
+            delimiters.append((point, char in OPEN, selector, in_string))
+
+    return delimiters
+
+
+def envelope(changes):
+    """Given a list of (begin, end, length) tuples, each of which describes
+    replacing the text between begin and end with length characters, in the
+    order the replacements happened, return a tuple (begin, end, delta).
+
+    begin and end delimit the part of the original text the replacements
+    touch. delta is the difference between the length of the text after the
+    replacements and the length of the original text."""
+    begin = end = None
+
+    for n, (a, b, length) in enumerate(changes):
+        # Map the positions of this replacement back to the original text.
+        for prev_a, prev_b, prev_length in reversed(changes[:n]):
+            prev_delta = prev_length - (prev_b - prev_a)
+
+            if a > prev_a:
+                a = a - prev_delta if a >= prev_a + prev_length else prev_a
+
+            if b > prev_a:
+                b = b - prev_delta if b >= prev_a + prev_length else prev_b
+
+        begin = a if begin is None else min(begin, a)
+        end = b if end is None else max(end, b)
+
+    delta = sum(length - (b - a) for a, b, length in changes)
+    return begin, end, delta
+
+
+class DelimiterIndex:
+    """An index of the open and close delimiters (parens, brackets, and
+    braces) in a View.
+
+    Pairs every open delimiter with the close delimiter that closes it and
+    keeps the pairs in arrays sorted by the position of the open delimiter,
+    which allows finding the delimiters that enclose a point with a binary
+    search instead of walking the View one point at a time. Open delimiters
+    without a parent delimit the top-level forms in the View.
+
+    Do not initialize directly; use delimiter_index instead."""
+
+    def __init__(self, view: View):
+        self.change_count = view.change_count()
+        self.generation = selectors.generation(view)
+        self.size = view.size()
+        self.set_pairs(Pairs(find_delimiters(view)))
+        # The TopLevelForms of the View, built on demand (see
+        # top_level_forms).
+        self.top_level_forms = None
+
+    def set_pairs(self, pairs):
+        self.opens = pairs.opens
+        self.selectors = pairs.selectors
+        self.closes = pairs.closes
+        self.close_selectors = pairs.close_selectors
+        self.parents = pairs.parents
+        self.balanced = pairs.balanced
+        self.strings = pairs.strings
+        self.close_strings = pairs.close_strings
+
+    def is_current(self, view: View):
+        """Return True if the View has neither changed nor had its syntax
+        changed since this index was last built or updated.
+
+        Within a selectors.pinned block, only check the syntax."""
+        if self.generation != selectors.generation(view):
+            return False
+        elif selectors.is_pinned(view):
+            return True
+        else:
+            selectors.stats.validations += 1
+            return self.change_count == view.change_count()
+
+    def root(self, index):
+        """Given the index of an open delimiter, return the index of the
+        top-level open delimiter that encloses it."""
+        while (parent := self.parents[index]) != -1:
+            index = parent
+
+        return index
+
+    def enclosing(self, point):
+        """Given a point, return the index of the innermost open delimiter to
+        the left of the point that the point does not close, or -1 if there is
+        no such delimiter."""
+        index = bisect_left(self.opens, point) - 1
+
+        while index >= 0:
+            close = self.closes[index]
+
+            if close == -1 or close >= point:
+                return index
+
+            index = self.parents[index]
+
+        return -1
+
+    def find_open(self, point):
+        if (index := self.enclosing(point)) != -1:
+            begin = self.opens[index]
+            return Delimiter(self.selectors[index], Region(begin, begin + 1))
+
+    def find_close(self, open_delim):
+        """Given an open Delimiter, return the Delimiter that closes it.
+
+        If the index has no record of the open delimiter, if the open
+        delimiter is unbalanced, or if a delimiter of a different type closes
+        it, return None."""
+        begin = open_delim.region.begin()
+        index = bisect_left(self.opens, begin)
+
+        if (
+            index < len(self.opens)
+            and self.opens[index] == begin
+            and self.selectors[index] == open_delim.selector
+            and self.balanced[index] == 1
+        ):
+            end = self.closes[index]
+            return Delimiter(self.close_selectors[index], Region(end, end + 1))
+
+    def update(self, view: View, changes):
+        """Given a View and a list of (begin, end, length) tuples that
+        describe the replacements that brought the View from the state this
+        index describes into its current state, update the index to describe
+        the current state of the View.
+
+        Only re-scans the top-level forms the replacements touch and shifts
+        the positions of the delimiters that follow them.
+
+        Return False if the index can't be updated (for example, because a
+        replacement unbalances the delimiters in the View) and must be rebuilt
+        instead."""
+        begin, end, delta = envelope(changes)
+
+        # Sublime Text lexes one line at a time, so a replacement can change
+        # the tokens before it on the same line, like the character literal
+        # \{ becoming \ and an open brace.
+        begin = view.line(begin).begin()
+
+        # Extend the region to re-scan to the top-level forms the
+        # replacements touch.
+        if (index := bisect_right(self.opens, begin) - 1) != -1:
+            root = self.root(index)
+
+            if self.closes[root] == -1:
+                return False
+            elif self.closes[root] >= begin:
+                begin = self.opens[root]
+            else:
+                begin = self.closes[root] + 1
+        else:
+            begin = 0
+
+        after = bisect_left(self.opens, end)
+        root = self.root(after - 1) if after > 0 else -1
+
+        if root != -1 and self.closes[root] == -1:
+            return False
+        elif root != -1 and self.closes[root] >= end:
+            end = self.closes[root] + 1
+            after = bisect_left(self.opens, end, lo=after)
+            # The replacements must leave the close delimiter of the last
+            # top-level form they touch in place, in the same lexical state:
+            # inside a string or not. Otherwise, opening or closing a string
+            # changes what the rest of the View means.
+            boundary = (end - 1 + delta, False, self.close_strings[root])
+        elif after < len(self.opens):
+            end = self.opens[after]
+            # The replacements must leave the open delimiter of the first
+            # top-level form after the ones they touch in place, in the same
+            # lexical state.
+            if not selectors.match_selector(
+                view, end + delta, self.selectors[after]
+            ) or selectors.match_selector(view, end + delta, "string") != bool(
+                self.strings[after]
+            ):
+                return False
+
+            boundary = None
+        else:
+            end = self.size
+            boundary = None
+
+        delimiters = scan_delimiters(view, Region(begin, end + delta))
+        pairs = Pairs(delimiters)
+
+        if pairs.stack or (
+            boundary
+            and (
+                not delimiters
+                or (delimiters[-1][0], delimiters[-1][1], delimiters[-1][3]) != boundary
+            )
+        ):
+            return False
+
+        before = bisect_left(self.opens, begin)
+        shift = len(pairs.opens) - (after - before)
+
+        self.opens = (
+            self.opens[:before]
+            + pairs.opens
+            + array("q", [point + delta for point in self.opens[after:]])
+        )
+
+        self.closes = (
+            self.closes[:before]
+            + pairs.closes
+            + array(
+                "q",
+                [-1 if point == -1 else point + delta for point in self.closes[after:]],
+            )
+        )
+
+        self.parents = (
+            self.parents[:before]
+            + array(
+                "q",
+                [-1 if parent == -1 else parent + before for parent in pairs.parents],
+            )
+            + array(
+                "q",
+                [
+                    -1 if parent == -1 else parent + shift
+                    for parent in self.parents[after:]
+                ],
+            )
+        )
+
+        self.selectors[before:after] = pairs.selectors
+        self.close_selectors[before:after] = pairs.close_selectors
+        self.balanced[before:after] = pairs.balanced
+        self.strings[before:after] = pairs.strings
+        self.close_strings[before:after] = pairs.close_strings
+        self.change_count = view.change_count()
+        self.size = view.size()
+
+        if self.top_level_forms:
+            self.top_level_forms.update(
+                view, before, after, shift, Region(begin, end + delta)
+            )
+
+        return True
+
+
+__indexes = {}
+
+
+def delimiter_index(view: View) -> DelimiterIndex:
+    """Given a View, return the DelimiterIndex of the View, building it first
+    if the View has changed since the index was last built."""
+    key = view.id()
+    index = __indexes.get(key)
+
+    if index is None or not index.is_current(view):
+        index = DelimiterIndex(view)
+        __indexes[key] = index
+
+    return index
+
+
+def update_delimiter_index(view: View, changes):
+    """Given a View and a list of the sublime.TextChange objects that describe
+    the latest changes to the View, update the DelimiterIndex of the View, if
+    any, to reflect the changes."""
+    key = view.id()
+
+    if (index := __indexes.get(key)) and not index.is_current(view):
+        # Only update the index if it describes the state of the View right
+        # before the changes. Otherwise, rebuild it when it's next needed.
+        if not (
+            index.change_count == view.change_count() - len(changes)
+            and index.generation == selectors.generation(view)
+            and index.update(
+                view,
+                [(change.a.pt, change.b.pt, len(change.str)) for change in changes],
+            )
+        ):
+            __indexes.pop(key, None)
+
+
+class TopLevelForms:
+    """A table of the top-level S-expressions in a View.
+
+    An S-expression is top-level if no other S-expression encloses it, or if
+    its open delimiter is in the first column of a line. The latter keeps the
+    S-expressions that follow an unbalanced S-expression usable.
+
+    Keeps the open delimiters of the top-level S-expressions in an array
+    sorted by position, which allows finding the top-level S-expression that
+    encloses a point with a binary search.
+
+    Do not initialize directly; use top_level_forms instead."""
+
+    def __init__(self, view: View, index: DelimiterIndex):
+        self.index = index
+
+        members = {n for n, parent in enumerate(index.parents) if parent == -1}
+
+        for region in view.find_all(r"^[(\[{]"):
+            n = bisect_left(index.opens, region.begin())
+
+            if n < len(index.opens) and index.opens[n] == region.begin():
+                members.add(n)
+
+        # The indices of the open delimiters of the top-level S-expressions
+        # in the DelimiterIndex, in ascending order.
+        self.members = array("q", sorted(members))
+        self.opens = array("q", [index.opens[n] for n in self.members])
+        # The position in this table of the top-level S-expression that
+        # encloses every top-level S-expression, or -1 if there is none.
+        self.parents = self.find_parents(self.members, 0)
+
+    def find_parents(self, members, offset):
+        """Given a sorted array of the indices of the open delimiters of
+        top-level S-expressions and the position of the first of them in this
+        table, return an array of the positions of their parents in this
+        table."""
+        parents = array("q")
+        member_set = set(members)
+
+        for n in members:
+            parent = self.index.parents[n]
+
+            while parent != -1 and parent not in member_set:
+                parent = self.index.parents[parent]
+
+            parents.append(
+                -1 if parent == -1 else offset + bisect_left(members, parent)
+            )
+
+        return parents
+
+    def update(self, view: View, before, after, shift, region):
+        """Given a View, the indices of the first open delimiter
+        DelimiterIndex.update re-scanned and of the first open delimiter after
+        the ones it re-scanned, the number of open delimiters it added, and
+        the Region of the View it re-scanned, update the table to describe the
+        updated DelimiterIndex.
+
+        The re-scanned Region starts and ends between top-level
+        S-expressions, so only the rows for the open delimiters in the Region
+        change; the rest only shift."""
+        index = self.index
+        low = bisect_left(self.members, before)
+        high = bisect_left(self.members, after)
+        begin = region.begin()
+        # Prefix the text with the character before the Region, to find the
+        # open delimiters in the first column.
+        text = (
+            "\n" + view.substr(region)
+            if begin == 0
+            else view.substr(Region(begin - 1, region.end()))
+        )
+
+        members = array(
+            "q",
+            [
+                n
+                for n in range(before, after + shift)
+                if index.parents[n] == -1
+                or (
+                    text[index.opens[n] - begin] == "\n"
+                    and text[index.opens[n] - begin + 1] in "([{"
+                )
+            ],
+        )
+
+        position_shift = len(members) - (high - low)
+
+        self.members = (
+            self.members[:low]
+            + members
+            + array("q", [n + shift for n in self.members[high:]])
+        )
+
+        self.opens = (
+            self.opens[:low]
+            + array("q", [index.opens[n] for n in members])
+            + array("q", [index.opens[n] for n in self.members[low + len(members) :]])
+        )
+
+        self.parents = (
+            self.parents[:low]
+            + self.find_parents(members, low)
+            + array(
+                "q",
+                [
+                    parent if parent < low else parent + position_shift
+                    for parent in self.parents[high:]
+                ],
+            )
+        )
+
+    def is_member(self, n):
+        """Given the index of an open delimiter in the DelimiterIndex, return
+        True if the open delimiter opens a top-level S-expression."""
+        position = bisect_left(self.members, n)
+        return position < len(self.members) and self.members[position] == n
+
+    def enclosing(self, point):
+        """Given a point, return the index in the DelimiterIndex of the open
+        delimiter of the innermost top-level S-expression whose delimiters
+        enclose the point, or -1 if there is no such S-expression."""
+        position = bisect_left(self.opens, point) - 1
+
+        while position != -1:
+            n = self.members[position]
+            close = self.index.closes[n]
+
+            if close == -1 or close >= point:
+                return n
+
+            position = self.parents[position]
+
+        return -1
+
+
+def top_level_forms(view: View) -> TopLevelForms:
+    """Given a View, return the TopLevelForms of the View, building the table
+    first if the DelimiterIndex of the View has none.
+
+    DelimiterIndex.update keeps the table up to date as the View changes."""
+    index = delimiter_index(view)
+
+    if index.top_level_forms is None:
+        index.top_level_forms = TopLevelForms(view, index)
+
+    return index.top_level_forms
+
+
+__documents = {}
+
+
+def document(view: View) -> reader.Document:
+    """Given a View, return a reader.Document of the contents of the View,
+    reading the contents first if the View has changed since they were last
+    read.
+
+    Unlike the DelimiterIndex, which relies on the scopes of the View, the
+    Document is safe to query from any thread."""
+    key = view.buffer_id()
+    change_count = view.change_count()
+    cached = __documents.get(key)
+
+    if cached is None or cached[0] != change_count:
+        cached = (change_count, reader.Document(view.substr(Region(0, view.size()))))
+        __documents[key] = cached
+
+    return cached[1]
+
+
+def forget(view: View):
+    """Given a View, discard the DelimiterIndex, the TopLevelForms, and the
+    Document of the View."""
+    __indexes.pop(view.id(), None)
+    __documents.pop(view.buffer_id(), None)
+
+
 def find_open(view, start_point):
     """Given a View and a start point, find the first point to the left of the
     start point that opens an S-expression, and return a Region that encloses
     that point."""
-    point = start_point - 1
-    stack = 0
-
-    if view.match_selector(start_point, "-meta.sexp"):
+    if selectors.match_selector(view, start_point, "-meta.sexp"):
         return None
 
-    while point >= 0:
-        if stack == 0 and view.match_selector(point, BEGIN_SELECTORS):
-            char = view.substr(point)
-            region = Region(point, point + 1)
-            return Delimiter(CHAR_TO_SELECTOR[char], region)
-        elif stack > 0 and view.match_selector(point, BEGIN_SELECTORS):
-            stack -= 1
-            point -= 1
-        elif view.match_selector(point, END_SELECTORS):
-            stack += 1
-            point -= 1
-        else:
-            point -= 1
-
-    return None
+    return delimiter_index(view).find_open(start_point)
 
 
 def find_close(view, open_delim):
@@ -128,6 +689,19 @@ def find_close(view, open_delim):
     if open_delim is None:
         return None
 
+    return delimiter_index(view).find_close(open_delim) or scan_close(view, open_delim)
+
+
+def scan_close(view, open_delim):
+    """Like find_close, but walk the View one point at a time instead of using
+    the DelimiterIndex of the View.
+
+    find_close falls back to this if the DelimiterIndex doesn't know the close
+    delimiter, like when the delimiters around the open delimiter don't
+    match."""
+    if open_delim is None:
+        return None
+
     point = open_delim.region.end()
     stack = 0
     max_point = view.size()
@@ -147,13 +721,42 @@ def find_close(view, open_delim):
             point += 1
 
 
+def from_open(view, point):
+    """Given a View and a point that contains an open delimiter, return the
+    S-expression the delimiter opens, or None if the point doesn't contain the
+    open delimiter of a balanced S-expression."""
+    index = delimiter_index(view)
+    n = bisect_left(index.opens, point)
+
+    if n < len(index.opens) and index.opens[n] == point:
+        open_delim = Delimiter(index.selectors[n], Region(point, point + 1))
+
+        if close_delim := index.find_close(open_delim):
+            return make_sexp(view, open_delim, close_delim)
+
+
+def parent(view, sexp):
+    """Given a View and an S-expression, return the S-expression that
+    immediately encloses it, or None if there is no such S-expression."""
+    index = delimiter_index(view)
+    begin = sexp.open.region.begin()
+    n = bisect_left(index.opens, begin)
+
+    if (
+        n < len(index.opens)
+        and index.opens[n] == begin
+        and (enclosing := index.parents[n]) != -1
+    ):
+        return from_open(view, index.opens[enclosing])
+
+
 def move_inside(view, point, edge):
     if not edge or selectors.inside_string(view, point):
         return point
     elif (
         (
             (edge is True or edge == "forward")
-            and view.match_selector(point, selectors.SEXP_BEGIN)
+            and selectors.match_selector(view, point, selectors.SEXP_BEGIN)
         )
         or (
             selectors.match_many(
@@ -200,8 +803,8 @@ def move_inside(view, point, edge):
         )
     ):
         return view.find(r"[\(\[\{\"]", point).end()
-    elif (edge is True or edge == "backward") and view.match_selector(
-        point - 1, selectors.SEXP_END
+    elif (edge is True or edge == "backward") and selectors.match_selector(
+        view, point - 1, selectors.SEXP_END
     ):
         return point - 1
     else:
@@ -261,6 +864,9 @@ def outermost(view, point, edge=True, ignore={}):
     """Given a View and a point, return the outermost S-expression surrounding
     the point.
 
+    The outermost S-expression is the innermost top-level S-expression (see
+    TopLevelForms) that surrounds the point.
+
     If `point` immediately precedes or follows a point whose character opens or
     closes an S-expression, move inside that S-expression before beginning the
     search, unless `edge=False`.
@@ -270,22 +876,29 @@ def outermost(view, point, edge=True, ignore={}):
     when determining the outermost S-expression and use the previous
     S-expression instead. Useful when ignoring things like Clojure `comment`
     forms, for example."""
-    previous = find_open(view, move_inside(view, point, edge))
+    point = move_inside(view, point, edge)
 
-    while previous and point >= 0:
-        if previous.region and view.rowcol(previous.region.begin())[1] == 0:
-            return make_sexp(view, previous, find_close(view, previous))
+    if selectors.match_selector(view, point, "-meta.sexp"):
+        return None
 
-        current = find_open(view, point)
+    index = delimiter_index(view)
+    table = top_level_forms(view)
 
-        if previous and (
-            not current
-            or (ignore and head_word(view, current.region.begin()) in ignore)
-        ):
-            return make_sexp(view, previous, find_close(view, previous))
-        else:
-            point = previous.region.begin()
-            previous = current
+    if ignore:
+        n = index.enclosing(point)
+
+        while n != -1 and (parent := index.parents[n]) != -1:
+            if table.is_member(n) or head_word(view, index.opens[parent]) in ignore:
+                break
+
+            n = parent
+    else:
+        n = table.enclosing(point)
+
+    if n != -1:
+        begin = index.opens[n]
+        open_delim = Delimiter(index.selectors[n], Region(begin, begin + 1))
+        return make_sexp(view, open_delim, find_close(view, open_delim))
 
 
 CYCLE_ORDER = {"(": "[", "[": "{", "{": "#{", "#{": "("}
@@ -296,9 +909,9 @@ def cycle_collection_type(view, edit):
         point = region.begin()
 
         if not selectors.ignore(view, point):
-            if view.match_selector(point, "string") or view.match_selector(
-                point - 1, "string"
-            ):
+            if selectors.match_selector(
+                view, point, "string"
+            ) or selectors.match_selector(view, point - 1, "string"):
                 edge = False
             else:
                 edge = True
@@ -313,66 +926,3 @@ def cycle_collection_type(view, edit):
                     new_close_bracket = OPEN[new_open_bracket[-1:]]
                     view.replace(edit, sexp.close.region, new_close_bracket)
                     view.replace(edit, sexp.open.region, new_open_bracket)
-
-
-def crude_find_open(view, point):
-    while point >= 0:
-        line = view.line(point)
-        begin = line.begin()
-
-        if view.match_selector(begin, BEGIN_SELECTORS):
-            return begin
-        else:
-            point = begin - 1
-
-
-def seems_like_end_point(view, point):
-    return view.match_selector(point - 1, "punctuation.section.parens.end") and (
-        view.substr(Region(point, point + 2)) == "\n("
-        or view.substr(Region(point, point + 3)) == "\n\n("
-        or view.substr(Region(point, point + 4)) == "\n\n\n("
-        or view.substr(point + 1) == "\x00"
-    )
-
-
-def crude_find_close(view, point):
-    max_point = view.size()
-
-    while point < max_point:
-        line = view.line(point)
-        end = line.end()
-
-        if seems_like_end_point(view, end):
-            return end
-        else:
-            point = end + 1
-
-
-def crude_outermost(view, point):
-    """Given a View and a point, return the outermost S-expression at point.
-
-    Like sexp.outermost, but faster and more inaccurate. Relies on the
-    heuristic that ~99% of outermost S-expressions have their open parens
-    on the first column.
-
-    This function therefore returns the incorrect result e.g. when there are
-    two outermost S-expressions on the same line, or when the S-expression that
-    follows the outermost S-expression does not have its open parenthesis in
-    the first column.
-
-    Only finds S-expressions surrounded by parentheses, not brackets or braces."""
-    begin = crude_find_open(view, point)
-
-    if begin is not None:
-        end = crude_find_close(view, point)
-
-        if end is not None:
-            begin_delim = Delimiter(
-                "punctuation.section.parens.begin", Region(begin, begin + 1)
-            )
-
-            end_delim = Delimiter(
-                "punctuation.section.parens.end", Region(end - 1, end)
-            )
-
-            return make_sexp(view, begin_delim, end_delim)
@@ -0,0 +1,121 @@
+from unittest import TestCase
+
+from Tutkain.src import cleanup
+
+from .util import ViewTestCase
+
+
+def clean_up(text, kinds=cleanup.DEFAULT_KINDS):
+    chunks = []
+    end = 0
+
+    for begin, batch_end, string in cleanup.batch(text, cleanup.edits(text, kinds)):
+        chunks.append(text[end:begin])
+        chunks.append(string)
+        end = batch_end
+
+    chunks.append(text[end:])
+    return "".join(chunks)
+
+
+class TestCleanup(TestCase):
+    def test_commas(self):
+        kinds = [cleanup.COMMAS]
+        self.assertEquals("{:a 1 :b 2}", clean_up("{:a 1, :b 2}", kinds))
+        self.assertEquals("[a b]", clean_up("[a,b]", kinds))
+        self.assertEquals("[a b]", clean_up("[,a ,,b,]", kinds))
+        self.assertEquals(
+            '["a, b" \\, ; c, d\n e]', clean_up('["a, b" \\, ; c, d\n e]', kinds)
+        )
+
+    def test_trailing_whitespace(self):
+        kinds = [cleanup.TRAILING_WHITESPACE]
+        self.assertEquals("(a\n b) ; c\n(d)", clean_up("(a  \n b) ; c \t\n(d)", kinds))
+        self.assertEquals('"a  \n b"', clean_up('"a  \n b"', kinds))
+        self.assertEquals("a\n\n\nb\n", clean_up("a \n  \n\t\nb  \n", kinds))
+
+    def test_blank_lines(self):
+        kinds = [cleanup.BLANK_LINES]
+        self.assertEquals("a\n\n  b", clean_up("a\n\n\n\n  b", kinds))
+        self.assertEquals("a\n\nb", clean_up("a\n\nb", kinds))
+        self.assertEquals("a\n", clean_up("a\n\n\n", kinds))
+        self.assertEquals('"a\n\n\nb"', clean_up('"a\n\n\nb"', kinds))
+        self.assertEquals("a \n \n b", clean_up("a \n \n \n b", kinds))
+
+    def test_discards(self):
+        kinds = [cleanup.DISCARDS]
+        self.assertEquals("(a c)", clean_up("(a #_b c)", kinds))
+        self.assertEquals("(a c)", clean_up("(a #_ (b [d]) c)", kinds))
+        self.assertEquals("(a)", clean_up("(a #_b)", kinds))
+        self.assertEquals("(a d)", clean_up("(a #_#_ b c d)", kinds))
+        self.assertEquals("(a d)", clean_up("(a #_ ^:m [b] d)", kinds))
+        self.assertEquals("(a\n c)", clean_up("(a\n #_b\n c)", kinds))
+        self.assertEquals("(a (c))", clean_up("(a (#_b c))", kinds))
+        self.assertEquals("(a)", clean_up("(a #_(b #_c))", kinds))
+        self.assertEquals('(a "#_b")', clean_up('(a "#_b")', kinds))
+
+    def test_default_kinds(self):
+        self.assertEquals(
+            "(a #_b c d)\n\n(e)\n", clean_up("(a #_b c, d)  \n\n\n\n(e)\n\n")
+        )
+
+    def test_commas_are_whitespace(self):
+        self.assertEquals("(a\n b)", clean_up("(a ,  \n b)"))
+        self.assertEquals("(a\n\n b)", clean_up("(a\n ,\n\n\n b)"))
+        self.assertEquals("a\n", clean_up("a,\n,\n"))
+
+    def test_idempotent(self):
+        for text in [
+            "(a ,  \n b)",
+            "(a\n ,\n\n\n b)",
+            "{:a 1 ,, \n\n , \n\n :b 2} , \n ;; c  \n\n\n",
+            "(a #_ b , \n\n\n #_c\n d)  ",
+        ]:
+            for kinds in [cleanup.DEFAULT_KINDS, [cleanup.COMMAS], [cleanup.DISCARDS]]:
+                once = clean_up(text, kinds)
+                self.assertEquals([], cleanup.edits(once, kinds), (text, kinds))
+
+    def test_within(self):
+        edits = [(1, 2, ""), (5, 6, ""), (9, 12, ""), (14, 15, "")]
+        self.assertEquals(
+            [(1, 2, ""), (5, 6, ""), (9, 12, "")],
+            cleanup.within(edits, [(0, 5), (5, 13)]),
+        )
+        self.assertEquals([], cleanup.within(edits, [(10, 14)]))
+        self.assertEquals([], cleanup.within(edits, []))
+
+    def test_batch(self):
+        text = "a,\nb,\n\nc,\nd"
+        self.assertEquals(
+            [(0, 5, "a\nb"), (7, 9, "c")],
+            cleanup.batch(text, [(1, 2, ""), (4, 5, ""), (8, 9, "")]),
+        )
+
+    def test_shift(self):
+        edits = [(1, 2, ""), (4, 6, "x"), (8, 9, "")]
+        self.assertEquals(0, cleanup.shift(0, edits))
+        self.assertEquals(3, cleanup.shift(4, edits))
+        self.assertEquals(3, cleanup.shift(5, edits))
+        self.assertEquals(5, cleanup.shift(7, edits))
+        self.assertEquals(7, cleanup.shift(10, edits))
+
+
+class TestCleanUpCommand(ViewTestCase):
+    def test_clean_up(self):
+        self.set_view_content("(a, b)  \n\n\n\n(c #_d)")
+        self.set_selections((12, 12))
+        self.view.run_command("tutkain_clean_up")
+        self.assertEquals("(a b)\n\n(c #_d)", self.view_content())
+        self.assertEquals([(7, 7)], self.selections())
+
+    def test_selections(self):
+        self.set_view_content("(a, b)  \n(c, d)  \n(e, f)  \n")
+        self.set_selections((0, 6), (18, 26))
+        self.view.run_command("tutkain_clean_up")
+        self.assertEquals("(a b)  \n(c, d)  \n(e f)\n", self.view_content())
+
+    def test_discards(self):
+        self.set_view_content("(a #_b c)\n#_(d)\n(e)")
+        self.set_selections((0, 0))
+        self.view.run_command("tutkain_clean_up", {"kinds": ["discards"]})
+        self.assertEquals("(a c)\n(e)", self.view_content())
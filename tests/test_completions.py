@@ -0,0 +1,26 @@
+from sublime import Region
+
+from Tutkain.src import completions
+
+from .util import ViewTestCase
+
+
+class TestCompletions(ViewTestCase):
+    def test_intuit_outermost(self):
+        self.set_view_content("(ns foo)\n\n(defn f [x]\n  (str/jo x))")
+        outermost = completions.intuit_outermost(self.view, 30)
+        self.assertEquals(Region(10, 35), outermost.extent())
+
+        self.assertEquals(
+            "(defn f [x]\n  (str/ x))",
+            completions.enclosing_sexp_sans_prefix(
+                self.view, outermost, Region(29, 31)
+            ),
+        )
+
+    def test_intuit_outermost_unterminated(self):
+        self.set_view_content("(ns foo)\n\n(defn f [x]\n  (str/jo")
+        self.assertIsNone(completions.intuit_outermost(self.view, 31))
+
+        self.set_view_content("(comment\n  (str/jo")
+        self.assertIsNone(completions.intuit_outermost(self.view, 18))
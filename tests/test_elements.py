@@ -0,0 +1,175 @@
+from unittest import TestCase
+
+from Tutkain.src import elements, reader
+
+
+def read(text):
+    return reader.Document(text).collections
+
+
+class TestElements(TestCase):
+    def test_is_pairwise(self):
+        text = "(let [a {:b 1} c #{d}] [e f] (g [h i]))"
+        let, bindings, b, d, vector, g, h = read(text)
+
+        self.assertTrue(elements.is_pairwise(text, bindings))
+        self.assertTrue(elements.is_pairwise(text, b))
+        self.assertFalse(elements.is_pairwise(text, let))
+        self.assertFalse(elements.is_pairwise(text, d))
+        self.assertFalse(elements.is_pairwise(text, vector))
+        self.assertFalse(elements.is_pairwise(text, h))
+
+        text = "(clojure.core/loop ^:m [a 1] a)"
+        self.assertTrue(elements.is_pairwise(text, read(text)[1]))
+
+    def test_elements(self):
+        text = "{:a 1 #_:b #_2 :c ^:m [3] :d}"
+        collection = read(text)[0]
+        items = elements.elements(text, collection)
+
+        self.assertEquals(
+            [":a 1", ":c ^:m [3]", ":d"],
+            [text[item.begin : item.end] for item in items],
+        )
+
+        self.assertEquals(
+            [":a", ":c"],
+            [text[item.forms[0].begin : item.forms[0].end] for item in items[:2]],
+        )
+        self.assertEquals(0, elements.element_at(items, 0))
+        self.assertEquals(0, elements.element_at(items, 5))
+        self.assertEquals(1, elements.element_at(items, 6))
+        self.assertEquals(2, elements.element_at(items, 28))
+        self.assertEquals(None, elements.element_at(items, 29))
+
+    def test_reorder(self):
+        text = "[a ;; one\n bb, ccc]"
+        (collection,) = read(text)
+        items = elements.elements(text, collection)
+
+        rewrite = elements.reorder(text, items, [2, 0, 1])
+        self.assertEquals("ccc ;; one\n a, bb", rewrite.string)
+        self.assertEquals((1, 18), (rewrite.begin, rewrite.end))
+        self.assertEquals([13, 16, 1], rewrite.begins)
+
+        rewrite = elements.reorder(text, items, [0, 2, 1])
+        self.assertEquals("ccc, bb", rewrite.string)
+        self.assertEquals((11, 18), (rewrite.begin, rewrite.end))
+        self.assertEquals([1, 16, 11], rewrite.begins)
+
+        self.assertEquals(None, elements.reorder(text, items, [0, 1, 2]))
+
+        self.assertEquals([1, 2, 0], elements.moved(3, 0, -1))
+        self.assertEquals([2, 0, 1], elements.moved(3, 2, -5))
+        self.assertEquals([0, 2, 1], elements.moved(3, 1, 2))
+
+    def test_sorted_order(self):
+        text = '[b "a" 10 :c 2 0x1 1N]'
+        (collection,) = read(text)
+        items = elements.elements(text, collection)
+
+        self.assertEquals(
+            ["0x1", "1N", "2", "10", '"a"', ":c", "b"],
+            [
+                text[items[n].begin : items[n].end]
+                for n in elements.sorted_order(text, items)
+            ],
+        )
+
+    def test_number_value(self):
+        for string, value in [
+            ("10", 10),
+            ("-1.5M", -1.5),
+            ("1e3", 1000),
+            ("7N", 7),
+            ("0x10", 16),
+            ("-0XffN", -255),
+            ("010", 8),
+            ("2r101", 5),
+            ("36rZZ", 1295),
+            ("1/2", 0.5),
+            ("-3/4", -0.75),
+            ("1/0", None),
+            ("08", None),
+            ("1x", None),
+        ]:
+            self.assertEquals(value, elements.number_value(string), string)
+
+        text = "[2 0x10 1/2 -1 010]"
+        (collection,) = read(text)
+        items = elements.elements(text, collection)
+
+        self.assertEquals(
+            ["-1", "1/2", "2", "010", "0x10"],
+            [
+                text[items[n].begin : items[n].end]
+                for n in elements.sorted_order(text, items)
+            ],
+        )
+
+    def test_deduplicate(self):
+        text = "#{a b\n  a ;; c\n  c b}"
+        (collection,) = read(text)
+        items = elements.elements(text, collection)
+        rewrite = elements.deduplicate(text, items)
+
+        self.assertEquals("a b ;; c\n  c", rewrite.string)
+        self.assertEquals([2, 4, None, 13, None], rewrite.begins)
+
+        # Comments and discarded forms stay.
+        for text, expected in [
+            ("{:a 1 ;; note\n :a 1}", "{:a 1 ;; note\n}"),
+            ("{:a 1 ;; note\n :a 1 :b 2}", "{:a 1 ;; note\n :b 2}"),
+            ("[a, #_ b a, c]", "[a, #_ b, c]"),
+            ("[a a #_a a]", "[a #_a]"),
+        ]:
+            (collection,) = read(text)
+            rewrite = elements.deduplicate(text, elements.elements(text, collection))
+
+            self.assertEquals(
+                expected,
+                text[: rewrite.begin] + rewrite.string + text[rewrite.end :],
+            )
+
+        text = "[a b c]"
+        (collection,) = read(text)
+        self.assertEquals(
+            None, elements.deduplicate(text, elements.elements(text, collection))
+        )
+
+    def test_align(self):
+        text = "(def m\n  {:a 1\n   :bbb 2 :c 3\n   :dd\n   4})"
+        collection = read(text)[1]
+        items = elements.elements(text, collection)
+        rewrite = elements.align(text, items)
+
+        self.assertEquals(":a   1\n   :bbb 2 :c 3\n   :dd\n   4", rewrite.string)
+        self.assertEquals([10, 20, 27, 35], rewrite.begins)
+        self.assertEquals(None, elements.align(rewrite.string, items[:0]))
+
+        text = "{:a  1\n :bb 2}"
+        (collection,) = read(text)
+        self.assertEquals(
+            None, elements.align(text, elements.elements(text, collection))
+        )
+
+    def test_convert_pairs(self):
+        text = "{:a 1, #_:b :c ^:m [2]}"
+        map_ = read(text)[0]
+        rewrite = elements.convert_pairs(text, map_, elements.elements(text, map_))
+        self.assertEquals("[[:a 1], #_:b [:c ^:m [2]]]", rewrite.string)
+        self.assertEquals([1, 14], rewrite.begins)
+
+        text = rewrite.string
+        vector = read(text)[0]
+        rewrite = elements.convert_pairs(text, vector, elements.elements(text, vector))
+        self.assertEquals("{:a 1, #_:b :c ^:m [2]}", rewrite.string)
+
+        for text in ["#:a{:b 1}", "{:a}", "[[:a 1] [:b]]", "[[:a 1] :b]", "#{[:a 1]}"]:
+            collection = read(text)[0]
+            self.assertEquals(
+                None,
+                elements.convert_pairs(
+                    text, collection, elements.elements(text, collection)
+                ),
+            )
@@ -560,3 +560,30 @@ class TestExpandSelectionCommand(unittesting.DeferrableTestCase):
             yield lambda: """\\return""" == self.selection(0)
             self.expand()
             yield lambda: """\\return""" == self.selection(0)
+
+    def selections(self):
+        return [self.view.substr(region) for region in self.view.sel()]
+
+    def test_multiple_cursors(self):
+        self.set_view_content("(a (b) c)\n(d (e) f)")
+        self.set_selections((4, 4), (14, 14))
+        self.expand()
+        yield lambda: ["b", "e"] == self.selections()
+        self.expand()
+        yield lambda: ["(b)", "(e)"] == self.selections()
+        self.expand()
+        yield lambda: ["(a (b) c)", "(d (e) f)"] == self.selections()
+
+    def test_deeply_nested(self):
+        depth = 30
+        self.set_view_content("(a " * depth + "x" + ")" * depth)
+        self.set_selections((3 * depth, 3 * depth))
+        self.expand()
+        yield lambda: "x" == self.selection(0)
+        self.expand()
+        yield lambda: "a x" == self.selection(0)
+
+        # One level per expansion from here on.
+        for level in range(1, 19):
+            self.expand()
+            yield lambda: "(a " * level + "x" + ")" * level == self.selection(0)
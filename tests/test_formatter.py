@@ -0,0 +1,209 @@
+from inspect import cleandoc
+from unittest import TestCase
+
+from Tutkain.src import formatter
+
+from .util import ViewTestCase
+
+
+class TestFormatter(TestCase):
+    def becomes(self, a, b, **kwargs):
+        self.assertEquals(cleandoc(b), formatter.format_code(cleandoc(a), **kwargs))
+
+    def test_list(self):
+        self.becomes(
+            """
+            (foo bar
+            baz)
+            (foo
+            bar)
+            """,
+            """
+            (foo bar
+                 baz)
+            (foo
+             bar)
+            """,
+        )
+
+    def test_collection(self):
+        self.becomes(
+            """
+            {:a 1
+            :b 2}
+            [a
+               b]
+            #{a
+            b}
+            #?(:clj
+            a
+            :cljs b)
+            """,
+            """
+            {:a 1
+             :b 2}
+            [a
+             b]
+            #{a
+              b}
+            #?(:clj
+               a
+               :cljs b)
+            """,
+        )
+
+    def test_block(self):
+        self.becomes(
+            """
+            (let [a 1]
+            a)
+            (if a
+            b
+            c)
+            (if
+            a
+            b)
+            (foo/when a
+            b)
+            """,
+            """
+            (let [a 1]
+              a)
+            (if a
+              b
+              c)
+            (if
+             a
+              b)
+            (foo/when a
+              b)
+            """,
+        )
+
+    def test_inner(self):
+        self.becomes(
+            """
+            (defn f
+            [x]
+            x)
+            (letfn [(f [x]
+            x)]
+            (f 1))
+            (defrecord R [a]
+            P
+            (f [_]
+            a))
+            """,
+            """
+            (defn f
+              [x]
+              x)
+            (letfn [(f [x]
+                      x)]
+              (f 1))
+            (defrecord R [a]
+              P
+              (f [_]
+                a))
+            """,
+        )
+
+    def test_indents(self):
+        self.becomes(
+            """
+            (my-macro a
+            b)
+            (let [a 1]
+            a)
+            """,
+            """
+            (my-macro a
+              b)
+            (let [a 1]
+                 a)
+            """,
+            indents={"my-macro": [["block", 1]]},
+        )
+
+    def test_prune(self):
+        self.becomes(
+            """
+            ( foo  bar  ;  comment\x20\x20
+            baz
+            )
+            """,
+            """
+            (foo bar  ;  comment
+                 baz)
+            """,
+        )
+
+        self.becomes(
+            """
+            (foo  bar
+            baz)
+            """,
+            """
+            (foo  bar
+                  baz)
+            """,
+            prune=False,
+        )
+
+    def test_blank_lines(self):
+        self.becomes("(a)\n\n\n\n(b)  \n\n", "(a)\n\n(b)\n")
+        self.becomes("(a)\n\n\n\n(b)", "(a)\n\n\n(b)", blank_lines=2)
+
+    def test_string(self):
+        self.assertEquals(
+            '(defn f\n  "a\n    b"\n  [x]\n  (str "c\nd" x))',
+            formatter.format_code('(defn f\n"a\n    b"\n   [x]\n(str "c\nd"   x))'),
+        )
+
+    def test_idempotent(self):
+        code = cleandoc(
+            """
+            (ns foo.bar
+              (:require [a.b :as b]
+                        [c.d :as d]))
+
+            (defn f
+              [x]
+              #_(g x)
+              (cond-> x
+                (pos? x) inc
+                :else (-> dec
+                          (* 2))))
+            """
+        )
+
+        self.assertEquals(code, formatter.format_code(code))
+        self.assertEquals([], formatter.format_edits(code))
+
+
+class TestFormatBufferCommand(ViewTestCase):
+    def test_format_buffer(self):
+        self.set_view_content("(defn f\n[x]\n   (inc  x))")
+        self.set_selections((19, 19))
+        self.view.run_command("tutkain_format_buffer")
+        self.assertEquals("(defn f\n  [x]\n  (inc x))", self.view_content())
+        self.assertEquals(self.selections(), [(20, 20)])
+
+    def test_apply_edits(self):
+        self.set_view_content("(a\nb)")
+        change_count = self.view.change_count()
+        edits = [[3, 3, " "]]
+
+        self.set_selections((0, 0))
+        self.view.run_command("insert", {"characters": " "})
+        self.view.run_command(
+            "tutkain_apply_edits", {"edits": edits, "change_count": change_count}
+        )
+        self.assertEquals(" (a\nb)", self.view_content())
+
+        self.set_view_content("(a\nb)")
+        self.view.run_command(
+            "tutkain_apply_edits",
+            {"edits": edits, "change_count": self.view.change_count()},
+        )
+        self.assertEquals("(a\n b)", self.view_content())
@@ -0,0 +1,56 @@
+from Tutkain.headless import syntax
+
+from .util import ViewTestCase
+
+CORPUS = [
+    """(ns foo.bar
+  "Docstring"
+  (:require [clojure.string :as str]))
+
+(defn f
+  [x]
+  ;; comment (
+  (let [y #{1 2}
+        z {:a [x y] ::b 'c}]
+    #_(discarded [form])
+    (str/join \\( [\\) \\space \\u0041])))""",
+    """#?(:clj (a) :cljs [b])
+^{:meta true} (c #"[a-z&&[^b]](?<name>\\d+)")
+#inst "2020-01-01" #foo/bar {:a 1} #:x{:y 2}
+'(x) `(y ~z ~@w) @(d) #'e #(inc %1) ##Inf 1/2 0x1F 1.5M 2N""",
+    """(comment
+  (a ] b)
+  [c}
+  (d""",
+    "(clojure.test/deftest t (is (= a/b (c/d e/f))))",
+    "; unterminated comment",
+    '"unterminated string',
+]
+
+
+class TestHeadless(ViewTestCase):
+    def assertScopesEqual(self, buffer, content):
+        for point in range(len(content) + 1):
+            self.assertEquals(
+                self.view.scope_name(point),
+                buffer.scope_at(point),
+                (content, point),
+            )
+
+    def test_scopes(self):
+        definition = syntax.load(self.view.syntax().path)
+
+        for content in CORPUS:
+            self.set_view_content(content)
+            self.assertScopesEqual(syntax.Buffer(definition, content), content)
+
+    def test_replace(self):
+        definition = syntax.load(self.view.syntax().path)
+        content = CORPUS[0]
+        buffer = syntax.Buffer(definition, content)
+
+        for begin, end, text in [(0, 0, '"'), (30, 30, "(a\n"), (1, 60, "")]:
+            content = content[:begin] + text + content[end:]
+            buffer.replace(begin, end, text)
+            self.set_view_content(content)
+            self.assertScopesEqual(buffer, content)
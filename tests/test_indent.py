@@ -15,6 +15,18 @@ class TestPruneRegion(ViewTestCase):
             indent.prune_region(self.view, sublime.Region(0, self.view.size())),
         )
 
+    def test_classify_region(self):
+        self.set_view_content('( a "b" ; c\n d)')
+        self.assertEquals(
+            [
+                (True, sublime.Region(2, 4)),
+                (False, sublime.Region(4, 7)),
+                (True, sublime.Region(7, 8)),
+                (False, sublime.Region(8, 10)),
+            ],
+            indent.classify_region(self.view, sublime.Region(2, 10)),
+        )
+
 
 class TestIndentInsertNewLineCommand(ViewTestCase):
     def becomes(
@@ -552,6 +564,52 @@ class TestIndentRegionCommand(ViewTestCase):
          {:f :g}]""",
         )
 
+    def test_nested(self):
+        self.becomes(
+            """
+            (defn f
+                  [x]
+                (let [y (inc
+                     x)
+              z (dec (inc
+            y))]
+            (+ y
+            z)))
+            """,
+            """
+            (defn f
+              [x]
+              (let [y (inc
+                        x)
+                    z (dec (inc
+                             y))]
+                (+ y
+                  z)))
+            """,
+            selections=[(0, 0)],
+        )
+
+    def test_indent_lines(self):
+        self.set_view_content("[1\n 2\n    3\n 4\n   5]")
+        region = sublime.Region(0, self.view.size())
+
+        self.assertEquals(
+            [(sublime.Region(6, 11), " 3"), (sublime.Region(15, 20), " 5]")],
+            indent.indent_lines(self.view, region),
+        )
+
+        self.set_view_content("[ 1  [2\n 3]\n 4 ]")
+        region = sublime.Region(0, self.view.size())
+
+        self.assertEquals(
+            [
+                (sublime.Region(0, 7), "[1 [2"),
+                (sublime.Region(8, 11), "    3]"),
+                (sublime.Region(12, 16), " 4]"),
+            ],
+            indent.indent_lines(self.view, region, prune=True),
+        )
+
     def test_reindent(self):
         self.assertEquals("(inc 1)", indent.reindent("(inc 1)", 0))
         self.assertEquals(
@@ -604,6 +662,33 @@ class TestIndentRegionCommand(ViewTestCase):
         )
 
 
+class TestIndentPastedCommand(ViewTestCase):
+    def paste(self, content, point, text):
+        self.set_view_content(content[:point] + text + content[point:])
+        self.set_selections((point + len(text), point + len(text)))
+        sublime.set_clipboard(text)
+        self.view.run_command("tutkain_indent_pasted")
+
+    def test_indent_pasted(self):
+        self.paste("(defn f\n  [x]\n  )", 16, "(foo\n  bar\nbaz)")
+        self.assertEquals(
+            "(defn f\n  [x]\n  (foo\n    bar\n    baz))", self.view_content()
+        )
+        self.assertEquals([(37, 37)], self.selections())
+
+    def test_string(self):
+        self.paste('(defn f\n  "")', 11, "a\nb")
+        self.assertEquals('(defn f\n  "a\nb")', self.view_content())
+        self.assertEquals([(14, 14)], self.selections())
+
+    def test_not_pasted(self):
+        self.set_view_content("(a\nb)")
+        self.set_selections((5, 5))
+        sublime.set_clipboard("(c\nd)")
+        self.view.run_command("tutkain_indent_pasted")
+        self.assertEquals("(a\nb)", self.view_content())
+
+
 class TestHardWrapCommand(ViewTestCase):
     def wraps_to(self, input, expected, width=0, start_at=0):
         self.set_view_content(input)
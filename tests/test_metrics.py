@@ -0,0 +1,69 @@
+from unittest import TestCase
+
+from Tutkain.api import edn
+from Tutkain.src.repl import metrics
+
+
+class TestMetrics(TestCase):
+    def test_percentile(self):
+        self.assertIsNone(metrics.percentile([], 50))
+        self.assertEqual(1, metrics.percentile([1], 99))
+        samples = list(range(1, 101))
+        self.assertEqual(50, metrics.percentile(samples, 50))
+        self.assertEqual(95, metrics.percentile(samples, 95))
+        self.assertEqual(99, metrics.percentile(samples, 99))
+        self.assertEqual(3, metrics.percentile([3, 1, 2], 100))
+
+    def test_lifecycle(self):
+        m = metrics.Metrics()
+        m.register(1, edn.Keyword("eval"))
+        m.sent(1, 10)
+        m.received(1, 20)
+        m.received(1, 5)
+        m.handled(1)
+
+        # Responses to messages that are no longer pending are not counted.
+        m.received(1, 100)
+        m.handled(1)
+
+        snapshot = m.snapshot()
+        self.assertEqual(["eval"], list(snapshot.keys()))
+        stats = snapshot["eval"]
+        self.assertEqual(1, stats["count"])
+        self.assertEqual(10, stats["bytes_sent"])
+        self.assertEqual(25, stats["bytes_received"])
+
+        for measurement in ("queue_wait", "latency", "handler", "total"):
+            self.assertGreaterEqual(stats[f"{measurement}_ms"]["p50"], 0)
+
+        self.assertIsNone(stats["server_handle_ms"]["p50"])
+
+    def test_server_timing(self):
+        m = metrics.Metrics()
+        m.register(1, edn.Keyword("completions"))
+        m.sent(1, 10)
+        m.received(
+            1,
+            20,
+            {
+                metrics.QUEUED_MS: 1.0,
+                metrics.HANDLE_MS: 2.0,
+                metrics.PRINT_MS: 0.5,
+            },
+        )
+        m.handled(1)
+
+        stats = m.snapshot()["completions"]
+        self.assertEqual(1.0, stats["server_queued_ms"]["p50"])
+        self.assertEqual(2.0, stats["server_handle_ms"]["p50"])
+        self.assertEqual(0.5, stats["server_print_ms"]["p99"])
+        self.assertGreaterEqual(stats["network_ms"]["p50"], 0)
+
+    def test_pending_is_bounded(self):
+        m = metrics.Metrics()
+
+        for message_id in range(metrics.MAX_PENDING + 10):
+            m.register(message_id, edn.Keyword("interrupt"))
+
+        self.assertEqual(metrics.MAX_PENDING, len(m.pending))
+        self.assertNotIn(0, m.pending)
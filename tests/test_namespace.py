@@ -1,3 +1,5 @@
+from sublime import Region
+
 from Tutkain.src import namespace
 
 from .util import ViewTestCase
@@ -36,3 +38,32 @@ class TestFindDeclaration(ViewTestCase):
 
         self.set_view_content("""(do (ns foo.bar))""")
         self.assertEquals(None, namespace.name(self.view))
+
+    def test_forms(self):
+        self.set_view_content("(ns foo.bar)\n(a)\n(ns baz.quux (:require [a.b]))")
+        self.assertEquals(
+            [Region(0, 12), Region(17, 47)], list(namespace.forms(self.view))
+        )
+
+        self.set_view_content("(a)")
+        self.assertEquals([], list(namespace.forms(self.view)))
+
+    def test_cache(self):
+        self.set_view_content("(ns foo.bar)")
+        declaration = namespace.declaration(self.view)
+        self.assertIs(declaration, namespace.declaration(self.view))
+
+        self.view.run_command("append", {"characters": "\n(a)"})
+        self.assertIsNot(declaration, namespace.declaration(self.view))
+        self.assertEquals([Region(0, 12)], namespace.forms(self.view))
+
+        self.set_view_content("(ns baz.quux)")
+        self.assertEquals("baz.quux", namespace.name(self.view))
+
+        try:
+            self.view.assign_syntax("Packages/Tutkain/EDN (Tutkain).sublime-syntax")
+            self.assertEquals(None, namespace.name(self.view))
+        finally:
+            self.view.assign_syntax("Packages/Tutkain/Clojure (Tutkain).sublime-syntax")
+
+        self.assertEquals("baz.quux", namespace.name(self.view))
@@ -403,6 +403,31 @@ class TestParedit(ViewTestCase):
         self.assertEquals("(a (b c)) (d (e f))", self.view_content())
         self.assertEquals(self.selections(), [(5, 5), (15, 15)])
 
+    def test_forward_slurp_multiple_cursors_on_separate_lines(self):
+        self.set_view_content("(a (b) c)\n(d (e) f)\n[(h) i]\n(g)")
+        self.set_selections((5, 5), (15, 15), (23, 23), (29, 29))
+        self.view.run_command("tutkain_paredit_forward_slurp")
+        self.assertEquals("(a (b c))\n(d (e f))\n[(h i)]\n(g)", self.view_content())
+        self.assertEquals(self.selections(), [(5, 5), (15, 15), (23, 23)])
+
+        # (g) slurps the [(h) i] on the next line, which overlaps the line of
+        # the last cursor, so the command handles one selection at a time.
+        self.set_view_content("(a (b) c)\n(d (e) f)\n(g)\n[(h) i]")
+        self.set_selections((5, 5), (15, 15), (21, 21), (27, 27))
+        self.view.run_command("tutkain_paredit_forward_slurp")
+        self.assertEquals("(a (b c))\n(d (e f))\n(g\n  [(h i)])", self.view_content())
+        self.assertEquals(self.selections(), [(5, 5), (15, 15), (21, 21), (28, 28)])
+
+        content = "\n".join(f"(a{n} (b{n}) c{n})" for n in range(100))
+        self.set_view_content(content)
+        points = [content.index(f"b{n})") + len(f"b{n}") for n in range(100)]
+        self.set_selections(*[(point, point) for point in points])
+        self.view.run_command("tutkain_paredit_forward_slurp")
+        self.assertEquals(
+            "\n".join(f"(a{n} (b{n} c{n}))" for n in range(100)), self.view_content()
+        )
+        self.assertEquals(self.selections(), [(point, point) for point in points])
+
     def test_backward_slurp_word(self):
         self.set_view_content("(a #{b} c)")
         self.set_selections((5, 5))
@@ -1095,6 +1120,19 @@ class TestParedit(ViewTestCase):
         self.view.run_command("tutkain_paredit_splice_sexp_killing_backward")
         self.assertEquals("()", self.view_content())
 
+    def test_kill_form_multiple_cursors(self):
+        self.set_view_content("(foo bar baz)\n(foo bar baz)\n(foo bar baz)")
+        self.set_selections((4, 4), (18, 18), (32, 32))
+        self.view.run_command("tutkain_paredit_forward_kill_form")
+        self.assertEquals("(foo baz)\n(foo baz)\n(foo baz)", self.view_content())
+        self.assertEquals([(4, 4), (14, 14), (24, 24)], self.selections())
+
+        self.set_view_content('(foo bar baz)\n"foo bar baz"\n(foo bar baz)')
+        self.set_selections((8, 8), (22, 22), (36, 36))
+        self.view.run_command("tutkain_paredit_backward_kill_form")
+        self.assertEquals('(foo  baz)\n"foo  baz"\n(foo  baz)', self.view_content())
+        self.assertEquals([(5, 5), (16, 16), (27, 27)], self.selections())
+
     def test_backward_kill_form(self):
         self.set_view_content("(foo ::bar baz)")
         self.set_selections((8, 8))
@@ -1289,6 +1327,57 @@ class TestParedit(ViewTestCase):
         self.assertEquals("(->\n  (foo)\n  (bar)\n  (baz))", self.view_content())
         self.assertEquals([(22, 22)], self.selections())
 
+    def test_move_form_to(self):
+        self.set_view_content('(foo (bar) baz "qux")')
+        self.set_selections((5, 5))
+        self.view.run_command("tutkain_paredit_move_form_to", {"index": -1})
+        self.assertEquals('(foo baz "qux" (bar))', self.view_content())
+        self.assertEquals([(15, 15)], self.selections())
+        self.view.run_command("tutkain_paredit_move_form_to", {"index": 1})
+        self.assertEquals('(foo (bar) baz "qux")', self.view_content())
+        self.assertEquals([(5, 5)], self.selections())
+        self.view.run_command("tutkain_paredit_move_form_to", {"index": 1})
+        self.assertEquals('(foo (bar) baz "qux")', self.view_content())
+        self.assertEquals([(5, 5)], self.selections())
+
+        self.set_view_content("{:a 1, :b 2\n :c 3}")
+        self.set_selections((8, 8))
+        self.view.run_command("tutkain_paredit_move_form_to", {"index": 0})
+        self.assertEquals("{:b 2, :a 1\n :c 3}", self.view_content())
+        self.assertEquals([(2, 2)], self.selections())
+
+        self.set_view_content("(let [b 2 a 1] (+ a b))")
+        self.set_selections((6, 6))
+        self.view.run_command("tutkain_paredit_move_form_to", {"index": 100})
+        self.assertEquals("(let [a 1 b 2] (+ a b))", self.view_content())
+        self.assertEquals([(10, 10)], self.selections())
+
+        # Each collection moves once, for the first caret in it.
+        self.set_view_content("(a b c) (d e f)")
+        self.set_selections((1, 1), (3, 3), (11, 11))
+        self.view.run_command("tutkain_paredit_move_form_to", {"index": -1})
+        self.assertEquals("(b c a) (d f e)", self.view_content())
+        self.assertEquals([(1, 1), (5, 5), (13, 13)], self.selections())
+
+    def test_sort_collection(self):
+        self.set_view_content("{:c 3, :a 1\n :b 2}")
+        self.set_selections((1, 1))
+        self.view.run_command("tutkain_paredit_sort_collection")
+        self.assertEquals("{:a 1, :b 2\n :c 3}", self.view_content())
+        self.assertEquals([(13, 13)], self.selections())
+
+        self.set_view_content("[10 9 #_x 1.5 b a]")
+        self.set_selections((1, 1))
+        self.view.run_command("tutkain_paredit_sort_collection")
+        self.assertEquals("[1.5 9 #_x 10 a b]", self.view_content())
+        self.assertEquals([(11, 11)], self.selections())
+
+        self.set_view_content("(foo (bar) baz)")
+        self.set_selections((5, 5))
+        self.view.run_command("tutkain_paredit_sort_collection")
+        self.assertEquals("((bar) baz foo)", self.view_content())
+        self.assertEquals([(1, 1)], self.selections())
+
         # Existing selection
         self.set_view_content("{:foo :bar :baz :quux}")
         self.set_selections((11, 21))
@@ -1528,6 +1617,46 @@ class TestParedit(ViewTestCase):
         self.view.run_command("tutkain_paredit_forward_move_form")
         self.assertEquals("{:a [[:c] [:b] [:d] [:e]]}", self.view_content())
 
+    def test_dedupe_collection(self):
+        self.set_view_content("(f #{:a :b :a} [1 2 1 3 2])")
+        self.set_selections((13, 13), (19, 19))
+        self.view.run_command("tutkain_paredit_dedupe_collection")
+        self.assertEquals("(f #{:a :b} [1 2 3])", self.view_content())
+        self.assertEquals([(10, 10), (16, 16)], self.selections())
+
+        self.set_view_content("(let [x 1 x (inc x) x 1] x)")
+        self.set_selections((7, 7))
+        self.view.run_command("tutkain_paredit_dedupe_collection")
+        self.assertEquals("(let [x 1 x (inc x) x 1] x)", self.view_content())
+
+    def test_align_collection(self):
+        self.set_view_content("(def m\n  {:a 1\n   :bbb {:c 2\n         :d 3}})")
+        self.set_selections((10, 10))
+        self.view.run_command("tutkain_paredit_align_collection")
+        self.assertEquals(
+            "(def m\n  {:a   1\n   :bbb {:c 2\n         :d 3}})",
+            self.view_content(),
+        )
+        self.assertEquals([(10, 10)], self.selections())
+
+        self.set_view_content("(let [a 1\n      bb {:c 2\n          :d 3}]\n  a)")
+        self.set_selections((17, 17))
+        self.view.run_command("tutkain_paredit_align_collection")
+        self.assertEquals(
+            "(let [a  1\n      bb {:c 2\n          :d 3}]\n  a)",
+            self.view_content(),
+        )
+
+    def test_convert_pairs(self):
+        self.set_view_content("{:a 1\n :b {:c\n     2}}")
+        self.set_selections((7, 7))
+        self.view.run_command("tutkain_paredit_convert_pairs")
+        self.assertEquals("[[:a 1]\n [:b {:c\n      2}]]", self.view_content())
+        self.assertEquals([(9, 9)], self.selections())
+        self.view.run_command("tutkain_paredit_convert_pairs")
+        self.assertEquals("{:a 1\n :b {:c\n     2}}", self.view_content())
+        self.assertEquals([(7, 7)], self.selections())
+
     def test_thread_first(self):
         self.set_view_content("(inc (dec (* 2 (/ 4 10))))")
         self.set_selections((18, 18))
@@ -1585,6 +1714,41 @@ class TestParedit(ViewTestCase):
         self.view.run_command("tutkain_paredit_unthread")
         self.assertEquals("(* 2 (inc (dec 1)))", self.view_content())
 
+    def test_thread_some(self):
+        self.set_view_content("(:b (:a (f x)))")
+        self.set_selections((11, 11))
+        self.view.run_command("tutkain_paredit_thread_first", {"arrow": "some->"})
+        self.assertEquals("(:b (:a (some-> x (f))))", self.view_content())
+        self.view.run_command("tutkain_paredit_thread_first", {"arrow": "some->"})
+        self.assertEquals("(:b (some-> x (f) (:a)))", self.view_content())
+        self.view.run_command("tutkain_paredit_unthread")
+        self.assertEquals("(:b (some-> x (f) (:a)))", self.view_content())
+
+        self.set_view_content("(str (get m :k))")
+        self.set_selections((12, 12))
+        self.view.run_command("tutkain_paredit_thread_last", {"arrow": "some->>"})
+        self.assertEquals("(str (some->> :k (get m)))", self.view_content())
+        self.view.run_command("tutkain_paredit_thread_last", {"arrow": "some->>"})
+        self.assertEquals("(some->> :k (get m) (str))", self.view_content())
+        self.view.run_command("tutkain_paredit_unthread")
+        self.assertEquals("(some->> :k (get m) (str))", self.view_content())
+
+    def test_thread_cond(self):
+        self.set_view_content("(inc (dec x))")
+        self.set_selections((10, 10))
+        self.view.run_command("tutkain_paredit_thread_first", {"arrow": "cond->"})
+        self.assertEquals("(inc (cond-> x true (dec)))", self.view_content())
+        self.view.run_command("tutkain_paredit_thread_first", {"arrow": "cond->"})
+        self.assertEquals("(cond-> x true (dec) true (inc))", self.view_content())
+
+    def test_thread_multiline(self):
+        self.set_view_content("(f\n  (g\n    (h\n      x)))")
+        self.set_selections((20, 20))
+        self.view.run_command("tutkain_paredit_thread_last")
+        self.assertEquals("(f\n  (g\n    (->> x (h))))", self.view_content())
+        self.view.run_command("tutkain_paredit_thread_last")
+        self.assertEquals("(f\n  (->> x (h) (g)))", self.view_content())
+
     def test_forward_up(self):
         self.set_view_content("""({[#{a} b] c} d)""")
         self.set_selections((6, 6))
@@ -0,0 +1,270 @@
+from unittest import TestCase
+
+from sublime import Region
+
+from Tutkain.src import forms, reader, sexp
+
+from .util import ViewTestCase
+
+
+def kinds(text):
+    return [token.kind for token in reader.tokenize(text)]
+
+
+class TestReader(TestCase):
+    def test_tokenize(self):
+        self.assertEquals(
+            kinds('(a :b 1, "c")'),
+            [
+                reader.OPEN,
+                reader.SYMBOL,
+                reader.WHITESPACE,
+                reader.KEYWORD,
+                reader.WHITESPACE,
+                reader.NUMBER,
+                reader.COMMA,
+                reader.WHITESPACE,
+                reader.STRING,
+                reader.CLOSE,
+            ],
+        )
+
+        self.assertEquals(
+            kinds("\\( \\) \\space"),
+            [
+                reader.CHARACTER,
+                reader.WHITESPACE,
+                reader.CHARACTER,
+                reader.WHITESPACE,
+                reader.CHARACTER,
+            ],
+        )
+        self.assertEquals(kinds('#"(\\d+)"'), [reader.REGEX])
+        self.assertEquals(kinds('"a (b"'), [reader.STRING])
+        self.assertEquals(kinds("; (a"), [reader.COMMENT])
+        self.assertEquals(kinds("##Inf"), [reader.SYMBOLIC])
+        self.assertEquals(kinds("-1"), [reader.NUMBER])
+        self.assertEquals(kinds("-"), [reader.SYMBOL])
+        self.assertEquals(kinds("#_"), [reader.MACRO])
+        self.assertEquals(kinds("#?@"), [reader.MACRO])
+        self.assertEquals(kinds("#::foo"), [reader.MACRO])
+        self.assertEquals(kinds("#inst"), [reader.TAG])
+
+    def test_read(self):
+        document = reader.Document("(a [b] #{c}) #(d) ^:e 'f #_{:g 1}")
+        self.assertEquals(
+            [form.kind for form in document.forms],
+            [reader.LIST, reader.FN, reader.KEYWORD, reader.SYMBOL, reader.MAP],
+        )
+
+        # Like the forms module, the reader treats metadata as a form of its
+        # own.
+        a, fn, e, f, m = document.forms
+        self.assertEquals((a.begin, a.end, a.open, a.close), (0, 12, 0, 11))
+        self.assertEquals(
+            [child.kind for child in a.children],
+            [reader.SYMBOL, reader.VECTOR, reader.SET],
+        )
+        self.assertEquals((fn.begin, fn.open), (13, 14))
+        self.assertEquals((e.begin, e.end), (18, 21))
+        self.assertEquals((f.begin, f.end), (22, 24))
+        self.assertEquals([prefix.text for prefix in f.prefixes], ["'"])
+        self.assertEquals(f.discarded, False)
+        self.assertTrue(m.discarded)
+        self.assertEquals(a.children[1].parent, a)
+
+    def test_read_discards(self):
+        # Each discard macro discards one more form, and metadata belongs to
+        # the form after it.
+        text = "(c #_ #_ (b) d a #_ ^:m e #_ #_ f ^g h i) #_ #_ j"
+
+        for forms in [
+            reader.Document(text).forms[0].children,
+            reader.read_level(text, 1, text.index(") #_")),
+        ]:
+            self.assertEquals(
+                [(text[form.begin : form.end], form.discarded) for form in forms],
+                [
+                    ("c", False),
+                    ("#_ #_ (b)", True),
+                    ("d", True),
+                    ("a", False),
+                    ("#_ ^:m", True),
+                    ("e", True),
+                    ("#_ #_ f", True),
+                    ("^g", True),
+                    ("h", True),
+                    ("i", False),
+                ],
+            )
+
+        # Discard macros don't discard forms past the end of their collection.
+        self.assertEquals(
+            [form.discarded for form in reader.Document("(#_ #_ a) b").forms],
+            [False, False],
+        )
+
+    def test_read_unbalanced(self):
+        document = reader.Document("(a ] (b")
+        self.assertEquals([token.begin for token in document.stray], [3])
+        self.assertEquals(document.find_close(0), None)
+        self.assertEquals(document.collections[0].end, 7)
+        self.assertEquals(document.innermost(7).open, 5)
+
+        document = reader.Document("a) (b)")
+        self.assertEquals([token.begin for token in document.stray], [1])
+        self.assertEquals(document.find_close(3), 5)
+
+    def test_read_level(self):
+        text = "(a [b] #{c}) #(d) ^:e 'f #_{:g 1}"
+        document = reader.Document(text)
+
+        for forms in [reader.read_level(text), reader.read_level(text, 1, 11)]:
+            expected = document.forms if len(forms) == 5 else document.forms[0].children
+
+            self.assertEquals(
+                [
+                    (form.kind, form.begin, form.end, form.open, form.close)
+                    for form in forms
+                ],
+                [
+                    (form.kind, form.begin, form.end, form.open, form.close)
+                    for form in expected
+                ],
+            )
+
+            self.assertEquals(
+                [form.discarded for form in forms],
+                [form.discarded for form in expected],
+            )
+
+        self.assertEquals(reader.read_level(text)[0].children, [])
+        self.assertEquals(reader.read_level("(a ] [b")[0].end, 7)
+        self.assertEquals(
+            [(form.end, form.close) for form in reader.read_level("a) (b")],
+            [(1, None), (5, None)],
+        )
+
+    def test_innermost(self):
+        document = reader.Document("(a (b) c)")
+        self.assertEquals(document.innermost(0), None)
+        self.assertEquals(document.innermost(1).open, 0)
+        self.assertEquals(document.innermost(3).open, 0)
+        self.assertEquals(document.innermost(4).open, 3)
+        self.assertEquals(document.innermost(5).open, 3)
+        self.assertEquals(document.innermost(6).open, 0)
+        self.assertEquals(document.innermost(8).open, 0)
+        self.assertEquals(document.innermost(9), None)
+        self.assertEquals(document.outermost(4).open, 0)
+
+    def test_token_at(self):
+        document = reader.Document('(a "b c")')
+        self.assertEquals(document.token_at(5).kind, reader.STRING)
+        self.assertEquals(document.token_at(9), None)
+
+    def test_find_next_previous(self):
+        document = reader.Document("(a (b) c)")
+        self.assertEquals(document.find_next(2).begin, 3)
+        self.assertEquals(document.find_next(6).begin, 7)
+        self.assertEquals(document.find_next(8), None)
+        self.assertEquals(document.find_previous(6).begin, 3)
+        self.assertEquals(document.find_previous(1), None)
+
+
+CORPUS = [
+    """(ns foo.bar
+  (:require [clojure.string :as str]))
+
+(defn f
+  "Docstring (with parens)"
+  [x]
+  ;; comment (
+  (let [y #{1 2}
+        z {:a [x y]}]
+    #_(discarded [form])
+    (str/join \\( [\\) \\space])))""",
+    """#?(:clj (a) :cljs [b])
+^{:meta true} (c #"\\d+")
+#inst "2020-01-01" #foo/bar {:a 1}
+'(x) `(y ~z ~@w) @(d) #'e #(inc %)""",
+    """(a ] b)
+[c}
+(d
+""",
+]
+
+
+class TestReaderParity(ViewTestCase):
+    """Check that the reader agrees with the scope-based sexp and forms
+    modules.
+
+    Deliberate differences not covered here: the reader does not treat
+    capturing groups in regular expressions as structure, and does not treat
+    the words in comments as forms."""
+
+    def test_find_open_find_close(self):
+        for content in CORPUS:
+            self.set_view_content(content)
+            document = sexp.document(self.view)
+
+            for point in range(len(content)):
+                open_delim = sexp.find_open(self.view, point)
+                form = document.innermost(point)
+
+                self.assertEquals(
+                    open_delim and open_delim.region.begin(),
+                    form and form.open,
+                    (content, point),
+                )
+
+                if open_delim:
+                    close_delim = sexp.find_close(self.view, open_delim)
+
+                    self.assertEquals(
+                        close_delim and close_delim.region.begin(),
+                        document.find_close(form.open),
+                        (content, point),
+                    )
+
+    def test_find_next_previous(self):
+        for content, point in [
+            ("a", 0),
+            ("(a)", 0),
+            ("(a)", 3),
+            ("(a)", 1),
+            ("(identity 1/2)", 10),
+            ("(a (b) c)", 2),
+            ("(a (b) c)", 3),
+            ("(a (b) c)", 6),
+            ("(ns ^:foo bar.baz)", 3),
+            ("(foo 'bar baz)", 4),
+            ("(foo #'bar baz)", 4),
+            ("(foo #_(bar) baz)", 4),
+            ("(foo #?(:cljs bar) baz)", 4),
+            ("(foo #bar/baz [:quux 2])", 4),
+            ('"a b"', 1),
+            ("'(foo (bar) baz)", 11),
+            ("^{:foo 1}", 6),
+            ("(foo)(bar)", 5),
+            ("{:a 1, :b 2}", 5),
+        ]:
+            self.set_view_content(content)
+            document = sexp.document(self.view)
+
+            for expected, form in (
+                (forms.find_next(self.view, point), document.find_next(point)),
+                (forms.find_previous(self.view, point), document.find_previous(point)),
+            ):
+                self.assertEquals(
+                    expected,
+                    form and Region(form.begin, form.end),
+                    (content, point),
+                )
+
+    def test_document_cache(self):
+        self.set_view_content("(a)")
+        document = sexp.document(self.view)
+        self.assertIs(sexp.document(self.view), document)
+        self.set_view_content("(a b)")
+        self.assertIsNot(sexp.document(self.view), document)
+        self.assertEquals(sexp.document(self.view).find_close(0), 4)
@@ -1,10 +1,32 @@
+import sublime
 from sublime import Region
 
-from Tutkain.src import selectors
+from Tutkain.src import selectors, sexp
 
 from .util import ViewTestCase
 
 
+def scan(view, start_point, selector, forward=True, stop_at=None):
+    """Like selectors.find, but walk the View one point at a time instead of
+    one token at a time."""
+    point = start_point if forward else start_point - 1
+    max_size = view.size()
+
+    while point >= 0 and point <= max_size:
+        if stop_at and view.match_selector(point, stop_at):
+            return None
+
+        if view.match_selector(point, selector):
+            return point
+
+        if forward:
+            point += 1
+        else:
+            point -= 1
+
+    return -1
+
+
 class TestSelectors(ViewTestCase):
     def test_expand(self):
         self.set_view_content("a")
@@ -25,3 +47,154 @@ class TestSelectors(ViewTestCase):
             ),
             Region(4, 7),
         )
+
+    def test_find(self):
+        content = """(defn f
+  "Docstring with \\"escaped quotes\\""
+  [x]
+  ;; A comment
+  (str x #"\\d+" \\a))"""
+
+        self.set_view_content(content)
+
+        for selector, stop_at in (
+            ("string", None),
+            ("comment", None),
+            ("punctuation.definition.string.end", None),
+            (selectors.SEXP_BEGIN, None),
+            (selectors.SEXP_END, "comment"),
+            ("constant.character", "string"),
+        ):
+            for point in range(len(content) + 1):
+                for forward in (True, False):
+                    self.assertEquals(
+                        selectors.find(self.view, point, selector, forward, stop_at),
+                        scan(self.view, point, selector, forward, stop_at),
+                        (selector, stop_at, point, forward),
+                    )
+
+    def test_tokens_syntax_change(self):
+        self.set_view_content("(a)")
+        self.assertTrue(selectors.match_selector(self.view, 1, "source.clojure"))
+
+        try:
+            self.view.assign_syntax("Packages/Tutkain/EDN (Tutkain).sublime-syntax")
+            self.assertTrue(selectors.match_selector(self.view, 1, "source.edn"))
+        finally:
+            self.view.assign_syntax("Packages/Tutkain/Clojure (Tutkain).sublime-syntax")
+
+        self.assertTrue(selectors.match_selector(self.view, 1, "source.clojure"))
+
+    def test_filter_region(self):
+        self.set_view_content("(foo #'bar/baz)")
+        self.assertEquals(
+            selectors.filter_region(self.view, Region(5, 14), "meta.symbol"),
+            Region(7, 14),
+        )
+
+        self.assertEquals(
+            selectors.filter_region(self.view, Region(0, 4), "string"), None
+        )
+
+    def test_find_long_string(self):
+        content = '(a "' + "x" * 20000 + '")\n;; ' + "y" * 20000 + "\n(b)"
+        self.set_view_content(content)
+
+        point = selectors.find(self.view, 4, "punctuation.definition.string.end")
+        self.assertEquals(point, 20004)
+        self.assertEquals(
+            scan(self.view, 4, "punctuation.definition.string.end"), point
+        )
+
+        point = selectors.find(self.view, len(content), "comment", forward=False)
+        self.assertGreater(point, 20010)
+        self.assertEquals(
+            scan(self.view, len(content), "comment", forward=False), point
+        )
+
+    def test_selector(self):
+        self.set_view_content(
+            """(ns foo.bar
+  (:require [clojure.string :as str]))
+
+(defn f
+  "Docstring"
+  [x]
+  ;; A comment
+  #_(discarded)
+  (let [{:keys [a]} x
+        y #inst "2020-01-01"]
+    (str/join \\a [::b :c/d @x 'y #'z 1/2 ##Inf #"\\d+"])))"""
+        )
+
+        scopes = {
+            scope
+            for _, scope in self.view.extract_tokens_with_scopes(
+                Region(0, self.view.size())
+            )
+        }
+
+        for selector in (
+            "string",
+            "-meta.sexp",
+            "-punctuation",
+            "comment.line",
+            "meta.mapping.value meta.sexp",
+            "meta.statement.require | meta.statement.import",
+            "constant.character - invalid.illegal",
+            "string - punctuation.definition.string.begin | comment.line",
+            "source.clojure & (meta.symbol | constant.other.keyword.qualified)",
+            "meta.sexp meta.sexp",
+            "(meta.sexp - string) & keyword",
+            "string & -comment",
+            selectors.SEXP_BEGIN,
+            sexp.ABSORB_SELECTOR,
+        ):
+            for scope in scopes:
+                self.assertEquals(
+                    selectors.compile_selector(selector).match(scope),
+                    sublime.score_selector(scope, selector) > 0,
+                    (selector, scope),
+                )
+
+    def test_match_selector(self):
+        content = '(a "b" ;; c\n #_[d] \\e)'
+        self.set_view_content(content)
+
+        for selector in ("string", "comment", "-meta.sexp", selectors.SEXP_BEGIN):
+            for point in range(-1, len(content) + 2):
+                self.assertEquals(
+                    selectors.match_selector(self.view, point, selector),
+                    self.view.match_selector(point, selector),
+                    (selector, point),
+                )
+
+                self.assertEquals(
+                    selectors.scope_name(self.view, point).split(),
+                    self.view.scope_name(point).split(),
+                    point,
+                )
+
+    def test_stats(self):
+        self.set_view_content("(a b c)")
+        selectors.reset_stats()
+
+        for point in range(7):
+            selectors.match_selector(self.view, point, "meta.symbol")
+
+        self.assertEquals(selectors.stats.lookups, 7)
+        self.assertEquals(selectors.stats.host_calls, 1)
+        self.assertEquals(selectors.stats.validations, 7)
+
+    def test_pinned(self):
+        self.set_view_content("(a b c)")
+        selectors.reset_stats()
+
+        with selectors.pinned(self.view):
+            for point in range(7):
+                selectors.match_selector(self.view, point, "meta.symbol")
+
+        self.assertEquals(selectors.stats.lookups, 7)
+        self.assertEquals(selectors.stats.host_calls, 1)
+        self.assertEquals(selectors.stats.validations, 1)
+        self.assertEquals(selectors.stats.saved(), 5)
@@ -1,3 +1,4 @@
+import random
 from unittest import skip
 
 from sublime import Region
@@ -7,6 +8,32 @@ from Tutkain.src import selectors, sexp
 from .util import ViewTestCase
 
 
+def scan_open(view, start_point):
+    """Like sexp.find_open, but walk the View one point at a time instead of
+    using the DelimiterIndex of the View."""
+    point = start_point - 1
+    stack = 0
+
+    if view.match_selector(start_point, "-meta.sexp"):
+        return None
+
+    while point >= 0:
+        if stack == 0 and view.match_selector(point, sexp.BEGIN_SELECTORS):
+            char = view.substr(point)
+            region = Region(point, point + 1)
+            return sexp.Delimiter(sexp.CHAR_TO_SELECTOR[char], region)
+        elif stack > 0 and view.match_selector(point, sexp.BEGIN_SELECTORS):
+            stack -= 1
+            point -= 1
+        elif view.match_selector(point, sexp.END_SELECTORS):
+            stack += 1
+            point -= 1
+        else:
+            point -= 1
+
+    return None
+
+
 class TestSexp(ViewTestCase):
     def test_find_open(self):
         self.set_view_content("(a)")
@@ -60,6 +87,129 @@ class TestSexp(ViewTestCase):
             ),
         )
 
+    def test_delimiter_index(self):
+        self.set_view_content("(a [(b)] {c ((d))})")
+        index = sexp.delimiter_index(self.view)
+        self.assertEquals([0, 3, 4, 9, 12, 13], list(index.opens))
+        self.assertEquals([18, 7, 6, 17, 16, 15], list(index.closes))
+        self.assertEquals([-1, 0, 1, 0, 3, 4], list(index.parents))
+        self.assertIs(index, sexp.delimiter_index(self.view))
+
+        self.set_view_content("(a)")
+        self.assertEquals([2], list(sexp.delimiter_index(self.view).closes))
+
+    def assertIndexEquals(self, expected, actual):
+        for name in ["opens", "closes", "parents", "strings", "close_strings"]:
+            self.assertEquals(
+                list(getattr(expected, name)), list(getattr(actual, name)), name
+            )
+
+        self.assertEquals(expected.selectors, actual.selectors)
+
+        expected_table = sexp.TopLevelForms(self.view, expected)
+
+        for name in ["members", "opens", "parents"]:
+            self.assertEquals(
+                list(getattr(expected_table, name)),
+                list(getattr(actual.top_level_forms, name)),
+                name,
+            )
+
+    def replace(self, begin, end, characters):
+        """Replace the text between begin and end with the characters, and
+        return an index of the View before the change that update updated, or
+        None if update couldn't update it."""
+        index = sexp.DelimiterIndex(self.view)
+        index.top_level_forms = sexp.TopLevelForms(self.view, index)
+        self.set_selections((begin, end))
+
+        if characters:
+            self.view.run_command("insert", {"characters": characters})
+        else:
+            self.view.run_command("right_delete")
+
+        if index.update(self.view, [(begin, end, len(characters))]):
+            return index
+
+    def test_delimiter_index_update_lexical_state(self):
+        for content, begin, end, characters in [
+            # Opening a regex swallows the rest of the View.
+            ('""[{}]', 2, 2, '#"'),
+            # Commenting out the start of a regex unswallows it.
+            ('\n#"\n[ \\(x{', 1, 1, " ;"),
+            # Closing a string.
+            ('(a)\n"b [c]\n(d)', 4, 4, '"'),
+            # Changing a character literal before the replacement.
+            ("\\{[a]x\\{", 2, 5, ""),
+        ]:
+            self.set_view_content(content)
+
+            if index := self.replace(begin, end, characters):
+                self.assertIndexEquals(sexp.DelimiterIndex(self.view), index)
+
+    def test_delimiter_index_update_fuzz(self):
+        rng = random.Random(0)
+        pieces = ["(", ")", "[", "]", "{", "}", '"', '#"', "\\", ";", "\n", "x", " "]
+
+        for _ in range(300):
+            content = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+            begin = rng.randint(0, len(content))
+            end = rng.randint(begin, min(len(content), begin + 3))
+            characters = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 2)))
+
+            if begin == end and not characters:
+                continue
+
+            self.set_view_content(content)
+
+            if index := self.replace(begin, end, characters):
+                self.assertIndexEquals(sexp.DelimiterIndex(self.view), index)
+
+    def test_delimiter_index_update(self):
+        for content, point, characters in [
+            ("(a [b] c)\n\n(d {:e f})", 4, "x "),
+            ("(a [b] c)\n\n(d {:e f})", 10, "y"),
+            ("(a [b] c)\n\n(d {:e f})", 0, "z\n"),
+            ("(a [b] c)\n\n(d {:e f})", 20, " g"),
+            ("(a [b] c)\n\n(d {:e f})", 5, " [h] "),
+            ("(a)\n(b)\n(c)", 4, "(x)\n"),
+            ("(a)\n(b [c\n(d)])\n(e)", 13, "\n"),
+        ]:
+            self.set_view_content(content)
+            index = self.replace(point, point, characters)
+            self.assertIsNotNone(index)
+            self.assertIndexEquals(sexp.DelimiterIndex(self.view), index)
+
+    def test_delimiter_index_update_unbalanced(self):
+        self.set_view_content("(a [b] c)\n\n(d {:e f})")
+        index = sexp.DelimiterIndex(self.view)
+        self.set_selections((10, 10))
+        self.view.run_command("insert", {"characters": "("})
+        self.assertFalse(index.update(self.view, [(10, 10, 1)]))
+
+    def test_envelope(self):
+        self.assertEquals((3, 3, 2), sexp.envelope([(3, 3, 2)]))
+        self.assertEquals((1, 9, 0), sexp.envelope([(1, 2, 2), (8, 10, 1)]))
+        self.assertEquals((1, 8, 0), sexp.envelope([(7, 8, 0), (1, 1, 1)]))
+
+    def test_find_open_find_close_match_scan(self):
+        for content in [
+            "(a [(b)] {c ((d))})",
+            "(a [b) c]",
+            "(a (b c)",
+            "a) (b [c]",
+            "(a {b [c} d] e)",
+        ]:
+            self.set_view_content(content)
+
+            for point in range(len(content) + 1):
+                open_delim = sexp.find_open(self.view, point)
+                self.assertEquals(scan_open(self.view, point), open_delim)
+                self.assertEquals(
+                    sexp.scan_close(self.view, open_delim),
+                    sexp.find_close(self.view, open_delim),
+                )
+
     def test_inside_string(self):
         content = ' "x" '
         self.set_view_content(content)
@@ -292,82 +442,64 @@ class TestSexp(ViewTestCase):
 
         self.assertEquals(sexp.outermost(self.view, 9).extent(), Region(8, 29))
 
-    def test_crude_outermost(self):
+    def test_outermost_top_level(self):
         self.set_view_content("")
-        outermost = sexp.crude_outermost(self.view, 0)
-        self.assertEquals(outermost, None)
-
-        form = "(a (b))"
-        self.set_view_content(form)
-
-        for n in range(len(form)):
-            outermost = sexp.crude_outermost(self.view, n)
-            self.assertEquals(outermost.extent(), Region(0, 7))
+        self.assertEquals(sexp.outermost(self.view, 0), None)
 
         form = "(a (b))\n\n(c (d))\n\n(e (f))"
         self.set_view_content(form)
 
         for n in range(0, 7):
-            outermost = sexp.crude_outermost(self.view, n)
-            self.assertEquals(outermost.extent(), Region(0, 7))
+            self.assertEquals(sexp.outermost(self.view, n).extent(), Region(0, 7))
 
         for n in range(9, 16):
-            outermost = sexp.crude_outermost(self.view, n)
-            self.assertEquals(outermost.extent(), Region(9, 16))
+            self.assertEquals(sexp.outermost(self.view, n).extent(), Region(9, 16))
 
         for n in range(18, 25):
-            outermost = sexp.crude_outermost(self.view, n)
-            self.assertEquals(outermost.extent(), Region(18, 25))
-
-        form = "(a (b))\n(c (d))"
-        self.set_view_content(form)
-
-        for n in range(0, 7):
-            outermost = sexp.crude_outermost(self.view, n)
-            self.assertEquals(outermost.extent(), Region(0, 7))
-
-        for n in range(8, 15):
-            outermost = sexp.crude_outermost(self.view, n)
-            self.assertEquals(outermost.extent(), Region(8, 15))
-
-        form = "(a (b))\n\n\n(c (d))"
-        self.set_view_content(form)
-
-        for n in range(0, 7):
-            outermost = sexp.crude_outermost(self.view, n)
-            self.assertEquals(outermost.extent(), Region(0, 7))
+            self.assertEquals(sexp.outermost(self.view, n).extent(), Region(18, 25))
 
-        form = "(a (b))\n\n\n(c (d))"
-        self.set_view_content(form)
-
-        for n in range(10, 17):
-            outermost = sexp.crude_outermost(self.view, n)
-            self.assertEquals(outermost.extent(), Region(10, 17))
-
-        # Cases where the crude approach yields the wrong result
         form = "(a (b))(c (d))"
         self.set_view_content(form)
 
-        for n in range(0, 14):
-            outermost = sexp.crude_outermost(self.view, n)
-            self.assertEquals(outermost.extent(), Region(0, 14))
-
-        form = "(a (b)) (c (d))"
-        self.set_view_content(form)
+        for n in range(0, 7):
+            self.assertEquals(sexp.outermost(self.view, n).extent(), Region(0, 7))
 
-        for n in range(0, 15):
-            outermost = sexp.crude_outermost(self.view, n)
-            self.assertEquals(outermost.extent(), Region(0, 15))
+        for n in range(7, 15):
+            self.assertEquals(sexp.outermost(self.view, n).extent(), Region(7, 14))
 
         form = " (a (b)) (c (d))"
         self.set_view_content(form)
 
-        for n in range(0, 16):
-            outermost = sexp.crude_outermost(self.view, n)
-            self.assertEquals(outermost, None)
+        for n in range(1, 9):
+            self.assertEquals(sexp.outermost(self.view, n).extent(), Region(1, 8))
+
+        for n in range(9, 17):
+            self.assertEquals(sexp.outermost(self.view, n).extent(), Region(9, 16))
 
         form = "(ns x (:require []\n  [c.d]))\n(defn f [y] y)"
         self.set_view_content(form)
+        self.assertEquals(sexp.outermost(self.view, 17).extent(), Region(0, 28))
 
-        outermost = sexp.crude_outermost(self.view, 17)
-        self.assertEquals(outermost.extent(), Region(0, 28))
+        # An S-expression whose open delimiter is in the first column is
+        # top-level even if an unbalanced S-expression precedes it.
+        form = "(defn f [x]\n  (let [y\n(defn g [] 1)"
+        self.set_view_content(form)
+        self.assertEquals(sexp.outermost(self.view, 25).extent(), Region(22, 35))
+        self.assertEquals(sexp.outermost(self.view, 16).open.region, Region(0, 1))
+
+    def test_top_level_forms(self):
+        self.set_view_content("(a (b))\n[c\n(d {e})] #{f}")
+        table = sexp.top_level_forms(self.view)
+        self.assertEquals(list(table.opens), [0, 8, 11, 21])
+        self.assertIs(sexp.top_level_forms(self.view), table)
+
+        index = sexp.delimiter_index(self.view)
+        self.assertEquals(index.opens[table.enclosing(4)], 0)
+        self.assertEquals(index.opens[table.enclosing(10)], 8)
+        self.assertEquals(index.opens[table.enclosing(15)], 11)
+        self.assertEquals(index.opens[table.enclosing(18)], 8)
+        self.assertEquals(index.opens[table.enclosing(22)], 21)
+        self.assertEquals(table.enclosing(7), -1)
+
+        self.set_view_content("(a)\n[b\n(c)]")
+        self.assertEquals(list(sexp.top_level_forms(self.view).opens), [0, 4, 7])
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from Tutkain.src.repl import sink
+from Tutkain.src.repl.keywords import ERR, OUT, RET, TAG, VAL
+
+
+class TestSink(TestCase):
+    def setUp(self):
+        descriptor, self.path = tempfile.mkstemp(".log")
+        os.close(descriptor)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_process(self):
+        output = sink.Sink(
+            self.path, sentinels=False, max_rate=1000000, max_size=9, tail_lines=2
+        )
+
+        self.assertEquals(
+            [{TAG: OUT, VAL: "a\n"}], output.process({TAG: OUT, VAL: "a\n"})
+        )
+
+        [notice] = output.process({TAG: OUT, VAL: "b\nc\nd\ne\n"})
+        self.assertEquals(ERR, notice.get(TAG))
+        self.assertEquals(self.path, notice.get(sink.LOG))
+        self.assertEquals([], output.process({TAG: OUT, VAL: "f\n"}))
+
+        [tail, summary, ret] = output.process({TAG: RET, VAL: "nil\n"})
+        self.assertEquals({TAG: OUT, VAL: "e\nf\n"}, tail)
+        self.assertEquals(self.path, summary.get(sink.LOG))
+        self.assertEquals({TAG: RET, VAL: "nil\n"}, ret)
+
+        with open(self.path) as file:
+            self.assertEquals("b\nc\nd\ne\nf\n", file.read())
+
+        self.assertEquals(
+            [{TAG: OUT, VAL: "g\n"}], output.process({TAG: OUT, VAL: "g\n"})
+        )
+
+    def test_search(self):
+        self.assertEquals([], sink.search(self.path, "a"))
+
+        with open(self.path, "w") as file:
+            file.write("foo\nbar baz bar\nquux\nbar")
+
+        self.assertEquals(
+            [(2, "bar baz bar"), (4, "bar")], sink.search(self.path, "bar")
+        )
+
+        self.assertEquals([(2, "bar baz bar")], sink.search(self.path, "bar", limit=1))
+
+    def test_prune_logs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            now = time.time()
+
+            for n, name in enumerate(["a.log", "b.log", "c.log", "d.txt"]):
+                path = os.path.join(directory, name)
+
+                with open(path, "w") as file:
+                    file.write(name)
+
+                os.utime(path, (now + n, now + n))
+
+            sink.prune_logs(2, directory)
+            self.assertEquals(
+                ["b.log", "c.log", "d.txt"], sorted(os.listdir(directory))
+            )
+
+            sink.prune_logs(0, directory)
+            self.assertEquals(["d.txt"], os.listdir(directory))
+
+        # The directory no longer exists.
+        sink.prune_logs(2, directory)
@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+from sublime import Region
+
+from Tutkain.src.repl import spans
+from Tutkain.src.repl.keywords import ERR, OUT, RET
+
+
+class TestSpanIndex(TestCase):
+    def test_add(self):
+        index = spans.SpanIndex()
+        index.add(OUT, 0, 3)
+        index.add(OUT, 3, 6)
+        index.add(ERR, 6, 8)
+        index.add(OUT, 10, 12)
+        index.add(RET, 12, 14)
+        index.add(OUT, 14, 14)
+
+        self.assertEquals(3, len(index))
+        self.assertEquals([Region(0, 6), Region(10, 12)], index.regions(OUT))
+        self.assertEquals([Region(6, 8)], index.regions(ERR))
+
+    def test_take_dirty(self):
+        index = spans.SpanIndex()
+        self.assertEquals((set(), 0), index.take_dirty())
+        index.add(ERR, 0, 1)
+        self.assertEquals(({ERR}, 0), index.take_dirty())
+        self.assertEquals((set(), 0), index.take_dirty())
+
+        # ERR and OUT alternate, so every add makes a new span.
+        for n in range(spans.CHUNK_SIZE + 1):
+            index.add(ERR if n % 2 else OUT, n + 1, n + 2)
+
+        self.assertEquals(({ERR, OUT}, 0), index.take_dirty())
+        self.assertEquals(2, index.chunks())
+
+        # Extending the last span changes its chunk only.
+        end = spans.CHUNK_SIZE + 2
+        index.add(OUT, end, end + 3)
+        self.assertEquals(({OUT}, 1), index.take_dirty())
+        self.assertEquals([Region(end - 1, end + 3)], index.regions(OUT, 1))
+        self.assertEquals([Region(end - 2, end - 1)], index.regions(ERR, 1))
+        self.assertEquals(spans.CHUNK_SIZE // 2, len(index.regions(ERR, 0)))
@@ -167,6 +167,59 @@ class TestConnectDisconnect(TestCase):
         server.backchannel.stop()
         server.stop()
 
+    # @unittest.SkipTest
+    def test_view_tap_panel_expand(self):
+        window = self.make_window()
+        self.make_scratch_view(window)
+        settings.load().set("tap_panel", True)
+        server = self.connect(window, {"dialect": "clj", "output": "view"})
+
+        server.backchannel.send(
+            edn.kwmap(
+                {
+                    "tag": edn.Keyword("tap"),
+                    "tap-id": 0,
+                    "dropped": 2,
+                    "val": "{:a 1, :b 2}\n",
+                }
+            )
+        )
+
+        panel = window.find_output_panel("tutkain.tap_panel")
+
+        yield lambda: self.equals(
+            """;; Dropped 2 tapped value(s).\n{:a 1, :b 2}\n""", self.content(panel)
+        )
+
+        panel.sel().clear()
+        panel.sel().add(sublime.Region(32, 32))
+        panel.run_command("tutkain_expand_tap")
+
+        message = edn.read(server.backchannel.recv())
+        self.assertEquals(edn.Keyword("tap-value"), message.get(edn.Keyword("op")))
+        self.assertEquals(0, message.get(edn.Keyword("tap-id")))
+
+        server.backchannel.send(
+            edn.kwmap(
+                {
+                    "id": message.get(edn.Keyword("id")),
+                    "tag": edn.Keyword("ret"),
+                    "tap-id": 0,
+                    "val": "{:a 1\n :b 2}\n",
+                }
+            )
+        )
+
+        yield lambda: self.equals(
+            """;; Dropped 2 tapped value(s).\n{:a 1\n :b 2}\n""", self.content(panel)
+        )
+
+        self.disconnect(window)
+        self.assertEquals("{:op :quit}\n", server.recv())
+        self.close_window(window)
+        server.backchannel.stop()
+        server.stop()
+
     # @unittest.SkipTest
     def test_view_tap_panel_disabled(self):
         window = self.make_window()